@@ -1,27 +1,137 @@
 import click
 import os
-import inspect
-from tabulate import tabulate
-from radon.visitors import Class
-from astrix.features.code_quality import analyze_code_quality
-from astrix.features.code_quality import analyze_maintainability_index
-from astrix.features.callgraph import generate_call_graph
-from astrix.features.dependency import generate_dependency_info
-from astrix.features.class_heirarchy import generate_class_hierarchy
-from astrix.features.conflict_management import installTxt, installSetup, create_venv, delete_venv, list_venvs
-
-@click.group()
-def cli():
+from functools import partial
+from astrix.features.cache import ResultCache, DEFAULT_CACHE_DIR
+from astrix.features.metadata_store import DEFAULT_TTL
+from astrix.features.graph_export import GRAPH_FORMATS
+from astrix.features.output import OUTPUT_FORMATS
+
+# The feature modules pull in radon, networkx, matplotlib, requests and
+# friends. They are imported inside the commands that need them so that
+# `astrix --help` or `astrix delete` start instantly.
+
+# Analysis commands a running `astrix serve` answers, see --server
+FORWARDED_COMMANDS = ("analyze", "maintainability", "callgraph", "deps", "class-info", "report", "stats", "perf-lint")
+
+
+class AstrixGroup(click.Group):
+    """Command group sending the analysis commands to an `astrix serve` process when --server is given."""
+
+    def resolve_command(self, ctx, args):
+        name, command, rest = super().resolve_command(ctx, args)
+        serving = (ctx.obj or {}).get('serving')
+        if ctx.params.get('server') and name in FORWARDED_COMMANDS and not serving:
+            return name, forward, rest
+        return name, command, rest
+
+
+@click.command(context_settings={'ignore_unknown_options': True, 'allow_extra_args': True}, add_help_option=False)
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+@click.pass_context
+def forward(ctx, args):
+    """Send a command to the analysis server and replay its output."""
+    from astrix.features.server import send_request
+
+    group = ctx.parent.params
+    try:
+        response = send_request(group['server'], ctx.info_name, args, os.getcwd(), group['cache_dir'], group['no_cache'])
+    except (OSError, ValueError) as e:
+        click.secho(f"Error: Unable to reach the Astrix server at '{group['server']}'. {e}", fg='red', err=True)
+        raise click.Abort()
+    click.echo(response.get('stdout', ''), nl=False)
+    click.echo(response.get('stderr', ''), nl=False, err=True)
+    ctx.exit(response.get('exit_code', 1))
+
+
+@click.group(cls=AstrixGroup)
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=DEFAULT_CACHE_DIR, envvar='ASTRIX_CACHE_DIR', show_default=True, help='Directory of the persistent result cache')
+@click.option('--no-cache', is_flag=True, help='Analyze every file again instead of reusing cached results')
+@click.option('--server', type=click.Path(dir_okay=False), envvar='ASTRIX_SERVER', help='Socket of a running `astrix serve`, analysis commands are answered by it')
+@click.option('--profile', is_flag=True, help='Print the time spent per phase (read, parse, each analyzer, network, rendering, output) and the slowest files on stderr')
+@click.option('--profile-output', type=click.Path(dir_okay=False, writable=True), help='Also save cProfile statistics of the run to this .prof file (implies --profile)')
+@click.pass_context
+def cli(ctx, cache_dir, no_cache, server, profile, profile_output):
     """Astrix - Your All-in-One Python Project Analyzer"""
-    pass
+    ctx.ensure_object(dict)
+    if profile or profile_output:
+        # Registered first, so the summary is printed after every other close callback
+        start_profiling(ctx, profile_output)
+    if server and ctx.invoked_subcommand in FORWARDED_COMMANDS and not ctx.obj.get('serving'):
+        # The command is forwarded, the server owns the cache
+        ctx.obj['cache'] = None
+        ctx.obj['cache_dir'] = None
+        return
+    cache = None if no_cache else ctx.obj.get('cache_factory', ResultCache)(cache_dir)
+    ctx.obj['cache'] = cache
+    ctx.obj['cache_dir'] = None if no_cache else cache_dir
+    if cache is not None:
+        ctx.call_on_close(cache.prune_if_due)
+
+
+def start_profiling(ctx, profile_output=None):
+    """Time the phases of the run, printing the summary when the command is done."""
+    from astrix.features import profiling
+
+    profiler = profiling.enable()
+    stats = None
+    if profile_output:
+        import cProfile
+        stats = cProfile.Profile()
+        stats.enable()
+
+    def finish():
+        if stats is not None:
+            stats.disable()
+            stats.dump_stats(profile_output)
+        profiling.disable()
+        profiling.print_summary(profiler)
+        if stats is not None:
+            click.echo(f"cProfile statistics saved as {profile_output}", err=True)
+
+    ctx.call_on_close(finish)
+
+
+def get_cache():
+    """Return the result cache configured on the command group, if any."""
+    obj = click.get_current_context().find_object(dict) or {}
+    return obj.get('cache')
+
+
+def get_cache_dir():
+    """Return the cache directory configured on the command group, None when caching is disabled."""
+    obj = click.get_current_context().find_object(dict) or {}
+    return obj.get('cache_dir')
+
+
+def files_since(path, since):
+    """Return the Python files of path to analyze, only the ones changed since the git ref since when given."""
+    from astrix.features.project import find_python_files
+
+    if since is None:
+        return find_python_files(path)
+    from astrix.features.changes import git_changes
+
+    files, _ = git_changes(path, since)
+    if not files:
+        click.echo(f"No Python file changed since {since}.")
+    return files
 
 @cli.command()
-@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=False))
-@click.option('--path', '-p', type=click.Path(exists=True, file_okay=True, dir_okay=False), help='Path to the Python file')
-def analyze(path):
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--path', '-p', type=click.Path(exists=True, file_okay=True, dir_okay=True), help='Path to the Python file or project directory')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--format', '-f', 'fmt', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True, help='Output format, ndjson and csv rows are written as soon as they are computed')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag), uncommitted changes included')
+def analyze(path, jobs, fmt, since):
     """ 
     This command analyzes functions in a given Python file and returns details about them, including their name, location, and complexity.
 
+When a directory is given, every Python file below it is analyzed in parallel and the results are merged into one table with an extra `File` column.
+
+Use `--format ndjson|csv` for machine readable output, one row per function with the fields file, name, lineno, col_offset, endline, is_method, classname, closures (names joined with ';') and complexity. Rows are written as each file finishes.
+
+Use `--since REF` to only analyze the Python files changed, added or renamed since a git ref, e.g. `--since origin/main` in a pull request check.
+
 
 
 Output Details:
@@ -43,31 +153,65 @@ Example: astrix analyze example_file.py
     get_package_requirements     6              0                14        False       None     []         1
     parse_requirements           16             0                23        False       None     []         3
     """
-    results = analyze_code_quality(path)
+    from tabulate import tabulate
+    from astrix.features.code_quality import analyze_code_quality, code_quality_rows, function_rows, FunctionRecord, FileTable, FUNCTION_HEADERS, FUNCTION_FIELDS
+    from astrix.features.project import map_files, display_path
+    from astrix.features.output import RowWriter
+
+    files = files_since(path, since)
+    if since is not None and not files:
+        return
+    if os.path.isdir(path):
+        table = FileTable()
+        to_row = lambda record: [table[record.file_id], *function_rows([record])[0]]
+        writer = RowWriter(fmt, FUNCTION_FIELDS, ["File", *FUNCTION_HEADERS], to_row, missingval="None")
+        worker = partial(code_quality_rows, cache=get_cache())
+        for file, rows in zip(files, map_files(worker, files, jobs)):
+            file_id = table.add(display_path(file, path))
+            for row in rows or []:
+                writer.write(FunctionRecord(*row, file_id=file_id))
+        if fmt == 'table' and not writer.count:
+            click.secho("No functions found to analyze.", fg='yellow')
+            raise click.Abort()
+        writer.close()
+        return
+
+    results = analyze_code_quality(path, get_cache())
+    if fmt != 'table':
+        writer = RowWriter(fmt, FUNCTION_FIELDS)
+        for row in function_rows(results):
+            writer.write([path, *row])
+        writer.close()
+        return
+
     if not results:
         click.secho("No functions found to analyze.", fg='yellow')
         raise click.Abort()
     
 
     # name, lineno, col_offset, endline, is_method, classname, closures, complexity
-    data = []
-    for result in results:
-        if not isinstance(result, Class):
-            res = [result.name, result.lineno, result.col_offset, result.endline, result.is_method, result.classname, result.closures, result.complexity]
-            data.append(res)
-    
-    # print(data)
+    data = function_rows(results)
         
-    click.echo(tabulate(data, headers=["Name", "Line Number", "Column Offset", "Endline", "isMethod", "Class", "Closures", "Complexity"], 
+    click.echo(tabulate(data, headers=FUNCTION_HEADERS, 
                         missingval="None"))
+
 @cli.command()
-@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=False))
-@click.option('--path', '-p', type=click.Path(exists=True, file_okay=True, dir_okay=False), help='Path to the Python file')
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--path', '-p', type=click.Path(exists=True, file_okay=True, dir_okay=True), help='Path to the Python file or project directory')
 @click.option('--multi', is_flag=True, help='Include multi-line strings in maintainability index calculation')
-def maintainability(path, multi):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--format', '-f', 'fmt', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True, help='Output format, ndjson and csv rows are written as soon as they are computed')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag), uncommitted changes included')
+def maintainability(path, multi, jobs, fmt, since):
     """
 This command analyzes the Halstead metrics, complexity, and code structure for functions in a given Python file and returns detailed information about them.
 
+When a directory is given, every Python file below it is analyzed in parallel and reported on its own row of a single table.
+
+Use `--format ndjson|csv` for machine readable output, one row per file with the fields file, halstead_volume, complexity, lloc and comments_percent. Rows are written as each file finishes.
+
+Use `--since REF` to only analyze the Python files changed, added or renamed since a git ref.
+
 Output Details:
 
 - Halstead Volume: A software metric that represents the volume of the code based on the number of operators and operands in the program. It indicates the size of the implementation. \n
@@ -83,13 +227,44 @@ Example: $ astrix analyze-metrics sample.py
                     0             1       5                       220
 
     """
-    data = analyze_maintainability_index(path, multi)
-    click.echo(tabulate(data, headers=["Halstead Volume", "Complexity", "LLOC", "Percentage of comments"]))
+    from tabulate import tabulate
+    from astrix.features.code_quality import analyze_maintainability_index, maintainability_row, MAINTAINABILITY_HEADERS, MAINTAINABILITY_FIELDS
+    from astrix.features.project import map_files, display_path
+    from astrix.features.output import RowWriter
+
+    files = files_since(path, since)
+    if since is not None and not files:
+        return
+    if os.path.isdir(path):
+        writer = RowWriter(fmt, MAINTAINABILITY_FIELDS, ["File", *MAINTAINABILITY_HEADERS])
+        worker = partial(maintainability_row, multi=multi, cache=get_cache())
+        for file, row in zip(files, map_files(worker, files, jobs)):
+            if row is not None:
+                writer.write([display_path(file, path), *row])
+        writer.close()
+        return
+
+    data = analyze_maintainability_index(path, multi, get_cache())
+    if fmt != 'table':
+        writer = RowWriter(fmt, MAINTAINABILITY_FIELDS)
+        writer.write([path, *(data[key][0] for key in MAINTAINABILITY_HEADERS)])
+        writer.close()
+        return
+    click.echo(tabulate(data, headers=MAINTAINABILITY_HEADERS))
 
 
 @cli.command()
-@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=False))
-def callgraph(path):
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--format', '-f', 'fmt', type=click.Choice(GRAPH_FORMATS), default='png', show_default=True, help='Output format of the graph')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag) and the files importing them')
+@click.option('--from', 'source', metavar='FUNCTION', help='List the functions FUNCTION calls, directly or not, instead of drawing the whole graph')
+@click.option('--callers-of', metavar='FUNCTION', help='List the functions calling FUNCTION, directly or not, instead of drawing the whole graph')
+@click.option('--depth', type=click.IntRange(min=1), help='Maximum number of calls followed by --from and --callers-of  [default: unlimited]')
+@click.option('--path', 'call_path', nargs=2, metavar='FROM TO', help='Print the shortest chain of calls from a function to another')
+@click.option('--cycles', is_flag=True, help='List the recursive functions and call cycles, exit with status 1 if there are any')
+@click.pass_context
+def callgraph(ctx, path, jobs, fmt, since, source, callers_of, depth, call_path, cycles):
     """
 This command analyzes the specified Python file and generates a call graph that visually represents the function call hierarchy within the code. The call graph is saved as an image file in the same directory as the analyzed Python file.
 
@@ -104,17 +279,105 @@ Example: $ astrix callgraph sample.py \n
 
 This will generate `sample_callgraph.png` in the same directory as `sample.py`, representing the function call hierarchy.
 
+Use `--format dot|graphml|json` to write the graph as text instead of an image, e.g. `sample_callgraph.dot`. These formats are streamed straight from the graph without loading matplotlib and can be fed to dedicated layout tools such as Graphviz or Gephi.
+
+When a directory is given, a single call graph of the whole project is built (saved as `<directory>_callgraph.png`). Definitions of every module are indexed and calls are resolved across files through imports and aliases, including `module.func()` and `self.method()` calls. Nodes are named by their fully qualified name, e.g. `package.module.Class.method`.
+
+Use `--since REF` to only graph the calls of the files changed since a git ref and of their direct dependents (the files importing them), which keeps pull request checks fast on large projects. The modules they import are indexed to resolve their calls but their own calls are left out.
+
+Instead of drawing the whole graph, query it:
+
+- `--from FUNCTION`: the functions FUNCTION reaches, with the number of calls in between. \n
+- `--callers-of FUNCTION`: the functions reaching FUNCTION. \n
+- `--depth N`: only follow N calls, e.g. `--from handle_request --depth 3`. \n
+- `--path A B`: the shortest chain of calls from A to B. \n
+- `--cycles`: the groups of functions calling each other (mutual recursion) and the functions calling themselves, with their locations. The command exits with status 1 when there is any, so it can gate commits. \n
+
+FUNCTION is a fully qualified name or any unambiguous dotted suffix of one (`save`, `Model.save`). Results are listed as a table; pass `--format` explicitly to save the subgraph the query covers instead, as `<path>_callgraph_query.<format>` (`<path>_callgraph_cycles.<format>` for `--cycles`). The call index behind the queries is persisted in the cache directory and reused until a file of the project changes.
+
+Example: $ astrix callgraph myproject --callers-of models.Model.save --depth 2
 
     """
-    generate_call_graph(path)
+    if depth is not None and not (source or callers_of):
+        raise click.UsageError("--depth only applies to --from and --callers-of.", ctx)
+    if source or callers_of or call_path or cycles:
+        from tabulate import tabulate
+        from astrix.features.call_index import load_call_index, resolve_function_query, function_rows, cycle_rows
+
+        if sum(map(bool, (source, callers_of, call_path, cycles))) > 1:
+            click.secho("Error: Use only one of --from, --callers-of, --path and --cycles.", fg='red', err=True)
+            raise click.Abort()
+        if since is not None:
+            click.secho("Error: --since cannot be combined with call graph queries, which cover the whole project.", fg='red', err=True)
+            raise click.Abort()
+
+        index = load_call_index(path, jobs, get_cache(), get_cache_dir())
+        export = ctx.get_parameter_source('fmt') != click.core.ParameterSource.DEFAULT
+        if cycles:
+            found = index.cycles()
+            if export:
+                from astrix.features.callgraph import draw_call_graph
+                from astrix.features.graph_export import export_graph, graph_output_path
+
+                output_path = graph_output_path(os.path.normpath(str(path)), "_callgraph_cycles", fmt)
+                export_graph(index.cycle_graph(found), output_path, fmt, draw_call_graph, "Call Graph")
+                click.echo(f"Call graph of {len(found)} cycles saved as {output_path}")
+            elif not found:
+                click.echo("No call cycles found.")
+            else:
+                click.echo(tabulate(cycle_rows(index, found, path), headers=["Cycle", "Function", "File", "Line"], missingval=""))
+                click.echo(f"\n{len(found)} call cycles, {sum(map(len, found))} functions.")
+            if found:
+                ctx.exit(1)
+            return
+        if call_path:
+            start, end = (resolve_function_query(index, name, path) for name in call_path)
+            chain = index.path(start, end)
+            if chain is None:
+                click.echo(f"No call path from {start} to {end}.")
+                return
+            click.echo(tabulate(function_rows(index, {name: step for step, name in enumerate(chain)}, path), headers=["Function", "Step", "File", "Line"], missingval=""))
+            return
+
+        name = resolve_function_query(index, source or callers_of, path)
+        reverse = bool(callers_of)
+        distances = index.reachable(name, depth, reverse)
+        if export:
+            from astrix.features.callgraph import draw_call_graph
+            from astrix.features.graph_export import export_graph, graph_output_path
+
+            output_path = graph_output_path(os.path.normpath(str(path)), "_callgraph_query", fmt)
+            export_graph(index.subgraph(distances, depth, reverse), output_path, fmt, draw_call_graph, "Call Graph")
+            click.echo(f"Call graph of {len(distances)} functions saved as {output_path}")
+            return
+        del distances[name]
+        if not distances:
+            click.echo(f"No function {'calls' if reverse else 'is called by'} {name}.")
+            return
+        click.echo(tabulate(function_rows(index, distances, path), headers=["Function", "Depth", "File", "Line"], missingval=""))
+        return
+
+    from astrix.features.callgraph import generate_call_graph, generate_project_call_graph
+
+    if os.path.isdir(path):
+        generate_project_call_graph(path, jobs, get_cache(), fmt, since)
+    elif files_since(path, since):
+        generate_call_graph(path, get_cache(), fmt)
 
 
 @cli.command()
 @click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=False))
-def deps(path):
+@click.option('--offline', is_flag=True, help='Never use the network, serve package metadata from the local cache and snapshot only')
+@click.option('--snapshot-dir', type=click.Path(exists=True, file_okay=False, dir_okay=True), envvar='ASTRIX_METADATA_SNAPSHOT', help='Directory of <package>.json PyPI metadata documents to use before the network')
+@click.option('--ttl', type=click.FloatRange(min=0), default=DEFAULT_TTL / 3600, show_default=True, help='Hours a cached package metadata entry stays fresh')
+@click.option('--concurrency', type=click.IntRange(min=1), help='Maximum number of concurrent PyPI requests  [default: 8]')
+@click.option('--format', '-f', 'fmt', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True, help='Output format, ndjson and csv rows are written as soon as they are computed')
+def deps(path, offline, snapshot_dir, ttl, concurrency, fmt):
     """
 Analyze the specified Python file and return a table of dependencies used within the file, including module names, descriptions, documentation links, and GitHub URLs.
 
+Package metadata fetched from PyPI is kept in a local SQLite store (`pypi.sqlite` in the cache directory) and reused until its TTL expires. With `--offline` only the store and the snapshot directory are consulted, which makes the command usable without network access. The remaining packages are fetched concurrently (`--concurrency`) over a shared keep-alive connection pool, failed requests are retried with backoff.
+
 Output Details:
 
 - Module: The name of the imported module. \n
@@ -141,22 +404,44 @@ Example: $ astrix deps sample.py
 
 This command will analyze `sample.py` and return a formatted table of dependencies used in the script.
 
+Use `--format ndjson|csv` for machine readable output, one row per module with the fields module, description, documentation and github_url.
+
     """
-    table = generate_dependency_info(path)
+    from astrix.features.dependency import generate_dependency_info, MAX_CONCURRENCY, DEPENDENCY_FIELDS
+    from astrix.features.output import RowWriter
+    from astrix.features.metadata_store import MetadataStore, STORE_FILENAME
+    from astrix.features.distribution_index import load_distribution_index
+
+    cache_dir = get_cache_dir()
+    store = MetadataStore(os.path.join(cache_dir, STORE_FILENAME), ttl * 3600) if cache_dir else None
+    load_distribution_index(cache_dir)
+    try:
+        table = generate_dependency_info(path, store, offline, snapshot_dir, concurrency or MAX_CONCURRENCY)
+    finally:
+        if store is not None:
+            store.close()
     headers = ["Module", "Description", "Documentation", "GitHub URL"]
 
-    if len(table) == 0:
+    if len(table) == 0 and fmt == 'table':
         click.echo("No dependencies found in the given file")
     # print(table)
     else:
-        click.echo(tabulate(table, headers=headers, maxcolwidths=[10, 30, 40, 40], tablefmt="grid"))
+        writer = RowWriter(fmt, DEPENDENCY_FIELDS, headers, maxcolwidths=[10, 30, 40, 40], tablefmt="grid")
+        for row in table:
+            writer.write(row)
+        writer.close()
     
     
 
 
 @cli.command()
-@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=False))
-def class_info(path):
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--format', '-f', 'fmt', type=click.Choice(GRAPH_FORMATS), default='png', show_default=True, help='Output format of the graph')
+@click.option('--subclasses-of', metavar='CLASS', help='List every direct and indirect subclass of a class instead of drawing the graph')
+@click.option('--mro', metavar='CLASS', help='Print the method resolution order of a class instead of drawing the graph')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag) and the files importing them')
+def class_info(path, fmt, subclasses_of, mro, jobs, since):
     """
 Analyze the specified Python file and generate a class hierarchy graph that visually represents the relationships between classes defined within the file. The graph will be saved as `userProvidedpath_class_graph.png` in the same directory as the analyzed Python file.
 
@@ -168,8 +453,215 @@ Example: $ astrix class-info sample.py
 
 This command will analyze `sample.py` and generate `sample_class_graph.png` in the same directory, representing the class hierarchy within the file.
 
+Use `--format dot|graphml|json` to write the graph as text instead of an image, without loading matplotlib.
+
+When a directory is given, the inheritance graph of every class of the project is saved as `<directory>_class_graph.png`, with bases resolved across modules through imports.
+
+Use `--subclasses-of CLASS` or `--mro CLASS` to query the project class index instead of drawing anything. CLASS is a fully qualified name or any unambiguous dotted suffix of one (`Model`, `models.Model`). The index is persisted in the cache directory and reused until a file of the project changes.
+
+Example: $ astrix class-info myproject --mro myproject.views.DetailView
+
+Use `--since REF` to only graph the classes of the files changed since a git ref and of their direct dependents, bases being resolved through the modules they import.
+
+    """
+    if since is not None and (subclasses_of or mro):
+        click.secho("Error: --since cannot be combined with --subclasses-of or --mro, which query the whole project.", fg='red', err=True)
+        raise click.Abort()
+    if subclasses_of or mro:
+        from tabulate import tabulate
+        from astrix.features.class_index import load_class_index, resolve_class_query, class_rows
+
+        index = load_class_index(path, jobs, get_cache(), get_cache_dir())
+        headers = ["Class", "File", "Line"]
+        if mro:
+            name = resolve_class_query(index, mro, path)
+            click.echo(tabulate(class_rows(index, index.mro(name), path), headers=headers, missingval=""))
+        if subclasses_of:
+            name = resolve_class_query(index, subclasses_of, path)
+            subclasses = sorted(index.subclasses(name))
+            if not subclasses:
+                click.echo(f"No subclasses of {name} found.")
+            else:
+                click.echo(tabulate(class_rows(index, subclasses, path), headers=headers, missingval=""))
+        return
+
+    from astrix.features.class_heirarchy import generate_class_hierarchy, generate_project_class_hierarchy
+
+    if os.path.isdir(path):
+        generate_project_class_hierarchy(path, jobs, get_cache(), fmt, since)
+    elif files_since(path, since):
+        generate_class_hierarchy(path, get_cache(), fmt)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--multi', is_flag=True, help='Include multi-line strings in maintainability index calculation')
+@click.option('--graph-format', 'graph_fmt', type=click.Choice(GRAPH_FORMATS), default='dot', show_default=True, help='Output format of the call graph and class hierarchy')
+@click.option('--offline', is_flag=True, help='Never use the network, serve package metadata from the local cache only')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag) and the files importing them')
+def report(path, multi, graph_fmt, offline, jobs, since):
+    """
+Run every analyzer on a Python file or project directory at once: functions and complexity (`analyze`), maintainability, call graph, class hierarchy and dependencies.
+
+Each file is read and parsed a single time and all the per-file analyzers run on the same tree, in parallel across files. The call graph, class hierarchy and dependency list are then built from the collected symbols while package metadata is fetched in the background, so the whole report costs about as much as the slowest analyzer alone.
+
+Output Details:
+
+- Functions: one row per function, as `analyze`. \n
+- Maintainability: one row per file, as `maintainability`. \n
+- Dependencies: the third party and standard library modules imported by the files, as `deps`. Modules of the project itself are left out. \n
+- The call graph and class hierarchy are saved next to PATH, e.g. `sample_callgraph.dot` and `sample_class_graph.dot`. Nodes are fully qualified names, as for a directory given to `callgraph` and `class-info`. \n
+
+Use `--since REF` to report only on the files changed since a git ref: their functions, maintainability and imports, with the call graph and class hierarchy also covering their direct dependents.
+
+Example: $ astrix report myproject --graph-format json
+    """
+    from astrix.features.report import generate_report
+
+    generate_report(path, jobs, get_cache(), get_cache_dir(), multi, graph_fmt, offline, since)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--multi', is_flag=True, help='Include multi-line strings in maintainability index calculation')
+@click.option('--top', type=click.IntRange(min=0), default=10, show_default=True, help='Number of most complex functions listed')
+@click.option('--format', '-f', 'fmt', type=click.Choice(("table", "json")), default='table', show_default=True, help='Output format')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+def stats(path, multi, top, fmt, jobs):
+    """
+Summarize the metrics of a whole project: distributions rather than one row per function or file.
+
+The functions and files are analyzed as by `analyze` and `maintainability`, their metrics are stored in columnar NumPy arrays and aggregated with vectorized operations, so the statistics stay fast on millions of functions.
+
+Output Details:
+
+- Summary: number of files and functions, mean, percentiles (50, 75, 90, 95, 99) and maximum of the cyclomatic complexity, mean and minimum maintainability index. 
+
+- Complexity per package: functions, mean, 90th percentile and maximum complexity of every directory. 
+
+- Maintainability index per package: mean and minimum index of the files of every directory and their histogram (radon ranks files C below 10 and B below 20). 
+
+- Most complex functions: the `--top` functions with the highest complexity. 
+
+
+Use `--format json` for the same statistics as one JSON document.
+
+Example: $ astrix stats myproject --top 20
+    """
+    from astrix.features.stats import generate_stats
+
+    generate_stats(path, jobs, get_cache(), multi, top, fmt)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option('--min-severity', type=click.Choice(("low", "medium", "high")), default='low', show_default=True, help='Only report findings of this severity or higher')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for directories (default: number of CPUs)')
+@click.option('--format', '-f', 'fmt', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True, help='Output format, ndjson and csv rows are written as soon as they are computed')
+@click.option('--since', metavar='REF', help='Only analyze the Python files changed since a git ref (commit, branch or tag), uncommitted changes included')
+@click.pass_context
+def perf_lint(ctx, path, min_severity, jobs, fmt, since):
+    """
+Find code patterns that are slow at run time, in a Python file or every file of a project directory.
+
+Every file is parsed once and checked in a single walk of its tree, in parallel across files; findings are cached with the other results. The command exits with status 1 when something is found, so it can gate commits.
+
+Output Details:
+
+- PERF101 (medium): a string built with `+=` (or `s = s + ...`) in a loop, copied on every iteration. \n
+- PERF102 (high): an `in` / `not in` test against a list built at run time inside a loop, a linear scan per test. \n
+- PERF103 (low): a loop invariant global or attribute lookup, such as `math.sqrt` or `self.items.append`, repeated on every iteration. \n
+- PERF104 (medium): `re.compile` of a loop invariant pattern inside a loop. \n
+- PERF105 (high): `list.insert(0, ...)` or `list.pop(0)` in a loop, quadratic overall. \n
+
+Use `--format ndjson|csv` for machine readable output, one row per finding with the fields file, lineno, col_offset, code, severity and message.
+
+Example: $ astrix perf-lint myproject --min-severity medium
+    """
+    from astrix.features.perf_lint import generate_perf_lint
+
+    files = files_since(path, since)
+    if since is not None and not files:
+        return
+    if generate_perf_lint(path, files, jobs, get_cache(), fmt, min_severity):
+        ctx.exit(1)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option('--multi', is_flag=True, help='Include multi-line strings in maintainability index calculation')
+@click.option('--poll', is_flag=True, help='Poll modification times instead of using inotify')
+@click.option('--interval', type=click.FloatRange(min=0.05), default=1.0, show_default=True, help='Seconds between two scans when polling')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Number of worker processes used for the initial analysis (default: number of CPUs)')
+def watch(path, multi, poll, interval, jobs):
     """
-    generate_class_hierarchy(path)
+Watch a project directory and keep its metrics, call graph and class hierarchy up to date while files are edited.
+
+The whole project is analyzed once, then every saved, added or deleted Python file is analyzed again on its own and its results are patched into the in-memory state instead of recomputing the project. Changes are detected with inotify on Linux and by polling modification times elsewhere (or with `--poll`).
+
+Output Details:
+
+- One line per changed file: its number of functions, highest cyclomatic complexity and Halstead volume. \n
+- One line for the project: files, functions, call graph size and number of classes, with the time the update took. \n
+
+Example: $ astrix watch myproject
+
+Press Ctrl+C to stop watching.
+    """
+    from astrix.features.watch import ProjectState, create_watcher, watch_project
+
+    state = ProjectState(path, multi, get_cache())
+    state.load(jobs)
+    watcher = create_watcher(path, poll, interval)
+    click.echo(f"Watching {path} ({watcher.name}): {state.project_summary()}")
+    click.echo("Press Ctrl+C to stop.")
+    watch_project(state, watcher)
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Path of the Unix socket to listen on  [default: <cache-dir>/astrix.sock]')
+@click.pass_context
+def serve(ctx, socket_path):
+    """
+Run a long-lived analysis server answering `analyze`, `maintainability`, `callgraph`, `deps`, `class-info`, `report`, `stats` and `perf-lint` over a Unix socket.
+
+The server keeps the interpreter, its imports, recently parsed files and analysis results warm in memory, so repeated calls from editor integrations or pre-commit hooks skip the startup and parsing costs. Point the CLI at it with `--server` (or the `ASTRIX_SERVER` environment variable) and use the commands as usual:
+
+Example: 
+
+$ astrix serve --socket /tmp/astrix.sock
+
+$ astrix --server /tmp/astrix.sock analyze sample.py
+
+Requests and responses are JSON documents, one per line: `{"command": "analyze", "args": ["sample.py"], "cwd": "/project"}` is answered with `{"exit_code": 0, "stdout": "...", "stderr": ""}`.
+
+Press Ctrl+C to stop the server.
+    """
+    import socket
+    from astrix.features.server import AnalysisServer, SOCKET_FILENAME
+
+    if not hasattr(socket, 'AF_UNIX'):
+        click.secho("Error: Unix sockets are not supported on this platform.", fg='red')
+        raise click.Abort()
+
+    socket_path = socket_path or os.path.join(ctx.parent.params['cache_dir'], SOCKET_FILENAME)
+    try:
+        server = AnalysisServer(socket_path, cli, FORWARDED_COMMANDS)
+    except OSError as e:
+        click.secho(f"Error: Unable to listen on '{socket_path}'. {e}", fg='red')
+        raise click.Abort()
+
+    # Import the analyzers up front so that the first request is fast too
+    import astrix.features.code_quality, astrix.features.callgraph, astrix.features.class_heirarchy, astrix.features.dependency  # noqa: E401,F401
+
+    click.echo(f"Astrix server listening on {server.socket_path}. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("Server stopped.")
+    finally:
+        server.server_close()
 
 
 @cli.command()
@@ -194,6 +686,8 @@ $ astrix install
 This command will create a virtual environment without installing any packages, as no path was provided.
 
     """
+    from astrix.features.conflict_management import installTxt, installSetup, create_venv
+
     if path:
         if path.endswith('.txt'):
             deps = installTxt(path)
@@ -226,6 +720,8 @@ $ astrix delete /path/to/project/ \n
 
 This command will delete the virtual environment located in the `/path/to/project/` directory.
     """
+    from astrix.features.conflict_management import delete_venv
+
     #directory = os.path.dirname(os.path.abspath(path))
     delete_venv(f"{os.path.basename(path)}")
 
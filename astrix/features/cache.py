@@ -0,0 +1,216 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from astrix import __version__
+from astrix.features.profiling import phase
+
+
+DEFAULT_CACHE_DIR = ".astrix_cache"
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+# Seconds between two size checks of the on-disk cache by command line runs
+PRUNE_INTERVAL = 60 * 60
+PRUNE_STAMP = "last_prune"
+
+# Bumped whenever the layout of cached values changes.
+CACHE_FORMAT = 5
+
+MISSING = object()
+
+
+class ResultCache:
+    """On-disk cache of analyzer results keyed by file content.
+
+    Every entry is a pickle stored under ``<directory>/results``. Keys combine
+    the content hash of the analyzed file, the Astrix version, the analyzer
+    name and its options, so an entry can never be served for different code
+    or settings. Writes go through a temporary file followed by an atomic
+    rename, which makes the cache safe to share between worker processes.
+
+    The total size is capped: ``prune`` evicts the least recently used entries
+    (hits refresh the modification time of an entry) until the cache fits.
+    It walks every entry, so runs go through ``prune_if_due``, which prunes
+    at most once per PRUNE_INTERVAL seconds.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.directory = str(directory)
+        self.max_size = max_size
+        self.results_dir = os.path.join(self.directory, "results")
+
+    def key(self, analyzer, digest, options=()):
+        """Return the cache key of an analyzer run over content with the given digest."""
+        material = f"{__version__}\0{CACHE_FORMAT}\0{analyzer}\0{options!r}\0{digest}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.results_dir, key[:2], key)
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING."""
+        entry = self._entry_path(key)
+        try:
+            with open(entry, 'rb') as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return MISSING
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Corrupt or stale entry: drop it and recompute
+            self._remove(entry)
+            return MISSING
+
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """Store value under key."""
+        entry = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry)
+        except OSError:
+            # A read-only or full disk must never break the analysis itself
+            pass
+
+    def _remove(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def _entries(self):
+        if not os.path.isdir(self.results_dir):
+            return
+        for bucket in os.scandir(self.results_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def size(self):
+        """Return the total size in bytes of the cached entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def prune(self):
+        """Evict the least recently used entries until the cache fits its size cap."""
+        entries = list(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def prune_if_due(self, interval=PRUNE_INTERVAL):
+        """Prune when the last prune, by any process, is older than interval seconds.
+
+        The time of the last prune is the modification time of a stamp file
+        in the cache directory.
+        """
+        if not os.path.isdir(self.results_dir):
+            return 0
+        stamp = os.path.join(self.directory, PRUNE_STAMP)
+        try:
+            if time.time() - os.stat(stamp).st_mtime < interval:
+                return 0
+        except OSError:
+            pass
+        try:
+            with open(stamp, 'a'):
+                pass
+            os.utime(stamp)
+        except OSError:
+            pass
+        return self.prune()
+
+    def clear(self):
+        """Remove every cached entry."""
+        for _, _, path in list(self._entries()):
+            self._remove(path)
+
+
+class MemoryCache:
+    """In-memory layer over a ResultCache, for long running processes.
+
+    Hits are served from memory without touching the disk; misses fall back
+    to the backing cache and are remembered. Values are shared between
+    lookups and must not be mutated. Pruning the backing cache walks every
+    entry, so prune_if_due runs it at most once per prune_interval seconds.
+    """
+
+    def __init__(self, backing, max_entries=100_000, prune_interval=60):
+        self.backing = backing
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self.entries = OrderedDict()
+        self._last_prune = time.monotonic()
+
+    def key(self, analyzer, digest, options=()):
+        return self.backing.key(analyzer, digest, options)
+
+    def get(self, key):
+        value = self.entries.get(key, MISSING)
+        if value is not MISSING:
+            self.entries.move_to_end(key)
+            return value
+        value = self.backing.get(key)
+        if value is not MISSING:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        self.backing.set(key, value)
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def prune(self):
+        return self.backing.prune()
+
+    def prune_if_due(self):
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval:
+            return 0
+        self._last_prune = now
+        return self.backing.prune()
+
+
+def cached_result(cache, analyzer, source, options, compute):
+    """Return compute(), served from cache when the same file was analyzed before.
+
+    cache may be None, in which case compute is simply called.
+    """
+    if cache is None:
+        with phase(f"analyzer: {analyzer}", source.path):
+            return compute()
+
+    with phase("cache", source.path):
+        key = cache.key(analyzer, source.digest, options)
+        value = cache.get(key)
+    if value is MISSING:
+        with phase(f"analyzer: {analyzer}", source.path):
+            value = compute()
+        with phase("cache", source.path):
+            cache.set(key, value)
+    return value
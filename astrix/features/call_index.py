@@ -0,0 +1,280 @@
+import click
+from array import array
+from astrix.features.graph_store import StringTable, csr, index_stamp, open_store, save_store, store_path
+from astrix.features.project import display_path, find_python_files
+
+
+INDEX_DIRNAME = "call_index"
+
+
+class CallIndex:
+    """Adjacency index of a project call graph, answering reachability queries.
+
+    Functions are numbered in name order. The callees of function i are
+    callees[callee_offsets[i]:callee_offsets[i + 1]] and its callers are
+    stored the same way (compressed sparse rows), so a query only touches
+    the functions it reaches instead of the whole graph. Names and files are
+    interned in string tables and every column is a flat array, which lets
+    the index be saved as a graph file and mapped back without unpacking.
+    """
+
+    def __init__(self, names, files, node_files, lines, callee_offsets, callees, caller_offsets, callers):
+        self.names = names
+        self.files = files
+        # Position in files of the file defining each function, -1 if unknown
+        self.node_files = node_files
+        self.lines = lines
+        self.callee_offsets = callee_offsets
+        self.callees = callees
+        self.caller_offsets = caller_offsets
+        self.callers = callers
+
+    @classmethod
+    def from_edges(cls, names, files, lines, edges):
+        """Build the index of sorted function names, their files and lines and (caller, callee) id pairs."""
+        interned = {}
+        node_files = array('i', (interned.setdefault(file, len(interned)) if file else -1 for file in files))
+        return cls(StringTable.build(names), StringTable.build(interned), node_files, array('i', lines),
+                   *csr(len(names), edges), *csr(len(names), [(target, source) for source, target in edges]))
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Build the index of a call graph built by callgraph.project_call_graph."""
+        names = sorted(graph.nodes)
+        ids = {name: position for position, name in enumerate(names)}
+        files = [graph.nodes[name].get('file') for name in names]
+        lines = [graph.nodes[name].get('lineno') or 0 for name in names]
+        edges = sorted((ids[source], ids[target]) for source, target in graph.edges)
+        return cls.from_edges(names, files, lines, edges)
+
+    @classmethod
+    def open(cls, store):
+        """Return the index saved in a graph_store.GraphStore, reading its columns in place."""
+        return cls(store.strings('names'), store.strings('files'), store.array('node_files'), store.array('lines'),
+                   store.array('callee_offsets'), store.array('callees'), store.array('caller_offsets'), store.array('callers'))
+
+    def save(self, path, stamp):
+        """Save the index as a graph file."""
+        save_store(path, stamp, {
+            **self.names.sections('names'), **self.files.sections('files'),
+            'node_files': self.node_files, 'lines': self.lines,
+            'callee_offsets': self.callee_offsets, 'callees': self.callees,
+            'caller_offsets': self.caller_offsets, 'callers': self.callers,
+        })
+
+    @property
+    def edge_count(self):
+        return len(self.callees)
+
+    def find(self, query):
+        """Return the functions a query names: a fully qualified name or any dotted suffix of one."""
+        if query in self.names:
+            return [query]
+        return [self.names[position] for position in self.names.endswith('.' + query)]
+
+    def _neighbours(self, position, reverse):
+        if reverse:
+            return self.callers[self.caller_offsets[position]:self.caller_offsets[position + 1]]
+        return self.callees[self.callee_offsets[position]:self.callee_offsets[position + 1]]
+
+    def reachable(self, name, depth=None, reverse=False):
+        """Return {function: distance} of the functions name reaches within depth calls.
+
+        With reverse, the functions reaching name (its callers, theirs...) are
+        returned instead. name itself is at distance 0; depth None is unbounded.
+        """
+        start = self.names.index(name)
+        distances = {start: 0}
+        frontier = [start]
+        distance = 0
+        while frontier and (depth is None or distance < depth):
+            distance += 1
+            following = []
+            for position in frontier:
+                for neighbour in self._neighbours(position, reverse):
+                    if neighbour not in distances:
+                        distances[neighbour] = distance
+                        following.append(neighbour)
+            frontier = following
+        return {self.names[position]: found for position, found in distances.items()}
+
+    def subgraph(self, distances, depth=None, reverse=False):
+        """Return the call graph of reachable() functions, with the calls the query followed."""
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        positions = {self.names.index(name): name for name in distances}
+        for position, name in positions.items():
+            file, lineno = self._location(position)
+            graph.add_node(name, file=file, lineno=lineno)
+        for position, name in positions.items():
+            if depth is not None and distances[name] >= depth:
+                continue
+            for neighbour in self._neighbours(position, reverse):
+                other = positions.get(neighbour)
+                if other is not None:
+                    graph.add_edge(*((other, name) if reverse else (name, other)))
+        return graph
+
+    def path(self, source, target):
+        """Return the shortest chain of calls from source to target, both included, or None."""
+        start, goal = self.names.index(source), self.names.index(target)
+        parents = {start: None}
+        frontier = [start]
+        while frontier and goal not in parents:
+            following = []
+            for position in frontier:
+                for neighbour in self._neighbours(position, False):
+                    if neighbour not in parents:
+                        parents[neighbour] = position
+                        following.append(neighbour)
+            frontier = following
+        if goal not in parents:
+            return None
+        chain = []
+        position = goal
+        while position is not None:
+            chain.append(self.names[position])
+            position = parents[position]
+        return chain[::-1]
+
+    def cycles(self):
+        """Return the call cycles: the functions calling each other, directly or not, largest groups first.
+
+        Every group is a strongly connected component of several functions, or
+        a function calling itself, as a sorted list of names. Tarjan's algorithm
+        runs with an explicit stack, in linear time and without hitting the
+        recursion limit on long call chains.
+        """
+        count = len(self.names)
+        order = array('i', [-1]) * count
+        low = array('i', bytes(4 * count))
+        on_stack = bytearray(count)
+        stack = []
+        groups = []
+        visited = 0
+        for root in range(count):
+            if order[root] >= 0:
+                continue
+            order[root] = low[root] = visited
+            visited += 1
+            stack.append(root)
+            on_stack[root] = 1
+            # Functions being visited, with the position of their next callee
+            pending = [[root, self.callee_offsets[root]]]
+            while pending:
+                entry = pending[-1]
+                position, edge = entry
+                end = self.callee_offsets[position + 1]
+                while edge < end:
+                    callee = self.callees[edge]
+                    edge += 1
+                    if order[callee] < 0:
+                        entry[1] = edge
+                        order[callee] = low[callee] = visited
+                        visited += 1
+                        stack.append(callee)
+                        on_stack[callee] = 1
+                        pending.append([callee, self.callee_offsets[callee]])
+                        break
+                    if on_stack[callee] and order[callee] < low[position]:
+                        low[position] = order[callee]
+                else:
+                    pending.pop()
+                    if pending and low[position] < low[pending[-1][0]]:
+                        low[pending[-1][0]] = low[position]
+                    if low[position] == order[position]:
+                        group = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = 0
+                            group.append(member)
+                            if member == position:
+                                break
+                        if len(group) > 1 or position in self._neighbours(position, False):
+                            groups.append(sorted(self.names[member] for member in group))
+        return sorted(groups, key=lambda group: (-len(group), group[0]))
+
+    def cycle_graph(self, cycles):
+        """Return the call graph of cycles() functions, with the calls between functions of the same cycle."""
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        for group in cycles:
+            members = {self.names.index(name): name for name in group}
+            for position, name in members.items():
+                file, lineno = self._location(position)
+                graph.add_node(name, file=file, lineno=lineno)
+            for position, name in members.items():
+                for callee in self._neighbours(position, False):
+                    if callee in members:
+                        graph.add_edge(name, members[callee])
+        return graph
+
+    def _location(self, position):
+        file = self.node_files[position]
+        return (self.files[file] if file >= 0 else None), self.lines[position]
+
+    def location(self, name):
+        """Return the (file, lineno) of a function."""
+        return self._location(self.names.index(name))
+
+
+def build_call_index(path, jobs=None, cache=None):
+    """Index the call graph of every Python file below a directory (or of a single file)."""
+    from astrix.features.callgraph import build_project_call_graph
+
+    return CallIndex.from_graph(build_project_call_graph(path, jobs, cache))
+
+
+def load_call_index(path, jobs=None, cache=None, cache_dir=None):
+    """Return the call index of a project, mapping the one saved in cache_dir when still valid.
+
+    As for the class index, the saved index is checked against the
+    modification times of the project files, so queries on an unchanged
+    project skip parsing and call resolution altogether and only read the
+    pages of the graph file they touch.
+    """
+    if not cache_dir:
+        return build_call_index(path, jobs, cache)
+
+    stamp = index_stamp(find_python_files(path))
+    index_path = store_path(cache_dir, INDEX_DIRNAME, path)
+    store = open_store(index_path, stamp)
+    if store is not None:
+        return CallIndex.open(store)
+
+    index = build_call_index(path, jobs, cache)
+    index.save(index_path, stamp)
+    return index
+
+
+def resolve_function_query(index, query, path):
+    """Return the single function a query names, reporting missing or ambiguous names."""
+    matches = index.find(query)
+    if not matches:
+        click.secho(f"Error: No function named '{query}' found in '{path}'.", fg='red')
+        raise click.Abort()
+    if len(matches) > 1:
+        click.secho(f"Error: '{query}' matches several functions: {', '.join(sorted(matches))}", fg='red')
+        raise click.Abort()
+    return matches[0]
+
+
+def cycle_rows(index, cycles, root):
+    """Return [cycle, function, file, line] table rows, the cycle number on the first function of each cycle."""
+    rows = []
+    for number, group in enumerate(cycles, 1):
+        for position, name in enumerate(group):
+            file, lineno = index.location(name)
+            rows.append([number if position == 0 else None, name, display_path(file, root) if file else None, lineno])
+    return rows
+
+
+def function_rows(index, distances, root):
+    """Return [function, depth, file, line] table rows, nearest functions first."""
+    rows = []
+    for name, distance in sorted(distances.items(), key=lambda item: (item[1], item[0])):
+        file, lineno = index.location(name)
+        rows.append([name, distance, display_path(file, root) if file else None, lineno])
+    return rows
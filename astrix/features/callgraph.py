@@ -1,55 +1,154 @@
 import click
-import ast
 import networkx as nx
-import matplotlib.pyplot as plt
 import os
 import builtins
+from astrix.features.source import load_source
+from astrix.features.cache import cached_result
+from astrix.features.project import find_python_files, map_files
+from astrix.features.symbols import ProjectSymbols, SymbolVisitor, module_symbols
+from astrix.features.graph_export import export_graph, graph_output_path, pyplot
+from astrix.features.profiling import phase
+from functools import partial
 
 
-def generate_call_graph(path):
-    """Generate a call graph for the given Python script."""
+BUILTIN_FUNCTIONS = frozenset(func for func in dir(builtins) if callable(getattr(builtins, func)))
+
+
+def extract_call_edges(source):
+    """Return the nodes and edges of the call graph of a loaded source file.
+
+    The tree is walked once: every call is attributed to its innermost
+    enclosing function only, so nested functions are not scanned again for
+    each enclosing level.
+    """
+    visitor = SymbolVisitor('')
+    visitor.visit(source.tree)
+
+    nodes = {}
+    for qualname, _, kind, _ in visitor.definitions:
+        function_name = qualname.rpartition('.')[2]
+        if kind == 'function' and function_name not in BUILTIN_FUNCTIONS:
+            nodes[function_name] = None
+
+    edges = {}
+    for caller, parts, _ in visitor.calls:
+        function_name = caller.rpartition('.')[2]
+        if len(parts) == 1 and function_name in nodes:
+            called_function = parts[0]
+            if called_function not in BUILTIN_FUNCTIONS:
+                edges[(function_name, called_function)] = None
+
+    return list(nodes), list(edges)
+
+
+def generate_call_graph(path, cache=None, fmt="png"):
+    """Generate a call graph for the given Python script.
+
+    fmt is one of png, dot, graphml or json; only png needs matplotlib.
+    """
 
     if not os.path.isfile(path):
         click.secho(f"Error: The path '{path}' is not a file or does not exist.", fg='red')
         raise click.Abort()
     
-    try:
-        with open(path, 'r') as file:
-            code = file.read()
-    except Exception as e:
-        click.echo(f"Error reading file: {e}")
-        raise click.Abort()
+    source = load_source(path)
 
-    if not code.strip():
+    if source.is_empty():
         click.secho(f"Error: The path '{path}' is an empty python file", fg='yellow')
         raise click.Abort()
     
-    output_path = str(path).replace(".py", "_callgraph.png")
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        click.secho(f"Error: The python file '{path}' has Syntax Errors", fg='red')
-        raise click.Abort()
+    output_path = graph_output_path(path, "_callgraph", fmt)
+    nodes, edges = cached_result(cache, "callgraph", source, (), lambda: extract_call_edges(source))
     graph = nx.DiGraph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges)
 
-    builtin_functions = dir(builtins)
-    builtin_functions = [func for func in builtin_functions if callable(getattr(builtins, func))]
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            function_name = node.name
-            if function_name not in builtin_functions:
-                graph.add_node(function_name)
-                for child in ast.walk(node):
-                    if isinstance(child, ast.Call):
-                        if isinstance(child.func, ast.Name):
-                            called_function = child.func.id
-                            if called_function not in builtin_functions:
-                                graph.add_edge(function_name, called_function)
+    export_graph(graph, output_path, fmt, draw_call_graph, "Call Graph")
+    click.echo(f"Call graph saved as {output_path}")
 
+
+def draw_call_graph(graph, output_path):
+    """Render a call graph to a PNG image."""
+    plt = pyplot()
     plt.figure(figsize=(30, 21))
     pos = nx.shell_layout(graph, scale=7)
     nx.draw(graph, pos, with_labels=True, node_size=3000, node_color="lightblue", font_size=20, font_weight="bold", arrows=True)
     plt.title("Call Graph")
     plt.savefig(output_path)
-    click.echo(f"Call graph saved as {output_path}")
\ No newline at end of file
+    plt.close()
+
+
+def build_project_call_graph(path, jobs=None, cache=None, since=None):
+    """Build the call graph of every Python file below a directory.
+
+    Files are indexed in parallel, then calls are resolved across modules by
+    following imports and aliases: `module.func()`, `alias()` for
+    `from module import func as alias`, `self.method()` (including inherited
+    methods) and calls to nested functions. Nodes are fully qualified names
+    carrying the file and line of their definition; calls that cannot be
+    resolved to a definition of the project (builtins, third party code) are
+    left out.
+
+    With since (a git ref) only the files changed since then and their direct
+    dependents are analyzed, the modules they import being indexed to resolve
+    their calls.
+    """
+    if since is not None:
+        from astrix.features.changes import change_set_symbols
+
+        modules, context = change_set_symbols(path, since, cache, jobs)
+        return project_call_graph(ProjectSymbols([*context, *modules]), modules)
+    files = find_python_files(path)
+    modules = [symbols for symbols in map_files(partial(module_symbols, cache=cache, root=path), files, jobs) if symbols]
+    return project_call_graph(ProjectSymbols(modules), modules)
+
+
+def project_call_graph(project, modules):
+    """Build the call graph of the given modules, calls being resolved through the indexed project symbols."""
+    graph = nx.DiGraph()
+    modules = [symbols for symbols in modules if project.is_indexed(symbols)]
+    with phase("resolve calls"):
+        for symbols in modules:
+            module = symbols['module']
+            for qualname, lineno, kind, _ in symbols['definitions']:
+                if kind == 'function':
+                    graph.add_node(f"{module}.{qualname}" if module else qualname, file=symbols['path'], lineno=lineno)
+
+        for symbols in modules:
+            add_call_edges(graph, project, module_call_edges(project, symbols))
+    return graph
+
+
+def module_call_edges(project, symbols):
+    """Return the (caller, callee) edges of the calls of a module resolved to project definitions."""
+    module = symbols['module']
+    edges = []
+    for caller, parts, lineno in symbols['calls']:
+        callee = project.resolve_call(module, caller, parts)
+        if callee is not None:
+            edges.append((f"{module}.{caller}" if module else caller, callee))
+    return edges
+
+
+def add_call_edges(graph, project, edges):
+    """Add call edges to a project call graph, adding the callees that are not nodes yet (classes)."""
+    for caller, callee in edges:
+        if callee not in graph:
+            file, callee_line, _ = project.definitions[callee]
+            graph.add_node(callee, file=file, lineno=callee_line)
+        graph.add_edge(caller, callee)
+
+
+def generate_project_call_graph(path, jobs=None, cache=None, fmt="png", since=None):
+    """Generate the call graph of a whole project directory (or of its files changed since a git ref)."""
+    graph = build_project_call_graph(path, jobs, cache, since)
+    if graph.number_of_nodes() == 0:
+        if since is not None:
+            click.echo(f"No function changed since {since}.")
+            return graph
+        click.secho(f"Error: No functions found in '{path}'.", fg='yellow')
+        raise click.Abort()
+    output_path = graph_output_path(os.path.normpath(str(path)), "_callgraph", fmt)
+    export_graph(graph, output_path, fmt, draw_call_graph, "Call Graph")
+    click.echo(f"Call graph saved as {output_path}")
+    return graph
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import click
+from functools import partial
+from astrix.features.project import find_python_files, map_files
+from astrix.features.symbols import module_name_for, module_symbols
+
+
+def _git(directory, *args):
+    """Run a git command in directory and return its output, aborting with its error message."""
+    try:
+        result = subprocess.run(["git", "-C", directory, *args], capture_output=True, check=True)
+    except FileNotFoundError:
+        click.secho("Error: --since needs git, which was not found on the PATH.", fg='red', err=True)
+        raise click.Abort()
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode('utf-8', 'replace').strip()
+        click.secho(f"Error: git {args[0]} failed. {message}", fg='red', err=True)
+        raise click.Abort()
+    return result.stdout.decode('utf-8', 'surrogateescape')
+
+
+def git_changes(path, ref):
+    """Return the Python files below path changed since a git ref, and the ones deleted.
+
+    Runs `git diff --name-status` between ref and the working tree, so
+    uncommitted edits count as changes, and `git ls-files --others` for the
+    new files not added yet. Modified, added, copied and renamed files, and
+    untracked ones, are returned in the order find_python_files lists them; deleted
+    files, and the old name of renamed ones, are returned apart since they
+    can only matter to the files importing them.
+    """
+    directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    top = _git(directory, "rev-parse", "--show-toplevel").strip()
+    fields = _git(directory, "diff", "--name-status", "-M", "-z", ref, "--").split('\0')
+
+    changed = set()
+    deleted = []
+    position = 0
+    while position < len(fields) and fields[position]:
+        status = fields[position][0]
+        if status in 'RC':
+            old, new = fields[position + 1], fields[position + 2]
+            position += 3
+            if status == 'R':
+                deleted.append(os.path.join(top, old))
+            changed.add(os.path.join(top, new))
+            continue
+        name = fields[position + 1]
+        position += 2
+        if status == 'D':
+            deleted.append(os.path.join(top, name))
+        else:
+            changed.add(os.path.join(top, name))
+    # Untracked files below directory, ignored ones left out
+    untracked = _git(directory, "ls-files", "--others", "--exclude-standard", "--full-name", "-z").split('\0')
+    changed.update(os.path.join(top, name) for name in untracked if name)
+
+    changed = {os.path.realpath(file) for file in changed}
+    files = [file for file in find_python_files(path) if os.path.realpath(file) in changed]
+    root = os.path.realpath(path)
+    deleted = [file for file in deleted if file.endswith('.py') and os.path.commonpath([root, os.path.realpath(file)]) == root]
+    return files, deleted
+
+
+def _imported_names(symbols):
+    """Return every dotted name a module imports, relative imports resolved."""
+    return {*symbols['imports'].values(), *symbols['star_imports'], *symbols['imported_modules']}
+
+
+def _imports_any(symbols, modules):
+    for name in _imported_names(symbols):
+        parts = name.split('.')
+        for end in range(len(parts), 0, -1):
+            if '.'.join(parts[:end]) in modules:
+                return True
+    return False
+
+
+def direct_dependents(root, files, deleted=(), cache=None, jobs=None):
+    """Return the symbols of the files of root importing one of files or deleted.
+
+    Only the files mentioning the last part of a changed module name (or, for
+    a package, living inside it) are parsed to check their imports, so a small
+    change set does not cost a scan of the whole project.
+    """
+    modules = {module_name_for(file, root) for file in [*files, *deleted]}
+    tails = {module.rsplit('.', 1)[-1].encode('utf-8') for module in modules}
+    packages = [os.path.dirname(os.path.abspath(file)) + os.sep for file in [*files, *deleted] if os.path.basename(file) == '__init__.py']
+    skip = set(files)
+
+    candidates = []
+    for file in find_python_files(root):
+        if file in skip:
+            continue
+        if any(os.path.abspath(file).startswith(package) for package in packages):
+            candidates.append(file)
+            continue
+        try:
+            with open(file, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            continue
+        if any(tail in data for tail in tails):
+            candidates.append(file)
+
+    symbols = map_files(partial(module_symbols, cache=cache, root=root), candidates, jobs)
+    return [entry for entry in symbols if entry and _imports_any(entry, modules)]
+
+
+def context_symbols(root, modules, cache=None, jobs=None):
+    """Return the symbols of the project modules the given modules import.
+
+    They are indexed so that calls and bases of the analyzed modules resolve,
+    without being reported themselves.
+    """
+    known = {symbols['module'] for symbols in modules}
+    project = {}
+    for file in find_python_files(root):
+        project.setdefault(module_name_for(file, root), file)
+
+    wanted = {}
+    for symbols in modules:
+        for name in _imported_names(symbols):
+            parts = name.split('.')
+            for end in range(1, len(parts) + 1):
+                module = '.'.join(parts[:end])
+                if module in project and module not in known:
+                    wanted[project[module]] = None
+    files = list(wanted)
+    return [symbols for symbols in map_files(partial(module_symbols, cache=cache, root=root), files, jobs) if symbols]
+
+
+def change_set_symbols(root, ref, cache=None, jobs=None):
+    """Return the symbols the cross-file analyzers need for the files changed since ref.
+
+    Returns (modules, context): modules are the changed files and their direct
+    dependents, whose calls and classes are reported; context holds the
+    project modules they import, indexed for name resolution only.
+    """
+    files, deleted = git_changes(root, ref)
+    modules = [symbols for symbols in map_files(partial(module_symbols, cache=cache, root=root), files, jobs) if symbols]
+    modules.extend(direct_dependents(root, files, deleted, cache, jobs))
+    return modules, context_symbols(root, modules, cache, jobs)
@@ -1,66 +1,115 @@
 import click
 import networkx as nx
-import matplotlib.pyplot as plt
 import ast
+import os
+from astrix.features.source import load_source
+from astrix.features.cache import cached_result
+from astrix.features.graph_export import export_graph, graph_output_path, pyplot
+from astrix.features.symbols import base_parts
 
 
-def generate_class_hierarchy(path):
-    """Generate a class hierarchy for the given Python script."""
-    try:
-        with open(path, 'r') as file:
-            code = file.read()
-    except Exception as e:
-        click.echo(f"Error reading file: {e}")
-        raise click.Abort()
+def extract_class_hierarchy(source):
+    """Return the nodes and edges of the class hierarchy of a loaded source file.
 
-    if not code.strip():
-        click.secho(f"Error: The path '{path}' is an empty python file", fg='yellow')
-        raise click.Abort()
-    
-    output_path = str(path).replace(".py", "_class_graph.png")
-    # Parse the code
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        click.secho(f"Error: The python file '{path}' has Syntax Errors", fg='red')
-        raise click.Abort()
-    graph = nx.DiGraph()
-    classes_found = False
+    Nodes are (name, type) pairs where type is either 'class' or 'method'.
+    """
+    tree = source.tree
+    nodes = {}
+    edges = {}
 
     # Traverse the AST and build the class hierarchy
     for node in ast.walk(tree):
         if isinstance(node, ast.ClassDef):
-            classes_found = True
             class_name = node.name
-            graph.add_node(class_name, type='class')
+            nodes[class_name] = 'class'
             
             # Add methods as nodes
             for body_node in node.body:
                 if isinstance(body_node, ast.FunctionDef):
                     method_name = body_node.name
-                    graph.add_node(f"{class_name}.{method_name}", type='method')
-                    graph.add_edge(class_name, f"{class_name}.{method_name}")
+                    nodes[f"{class_name}.{method_name}"] = 'method'
+                    edges[(class_name, f"{class_name}.{method_name}")] = None
             
             # Add inheritance edges
-            if node.bases:
-                for base in node.bases:
-                    if isinstance(base, ast.Name):
-                        base_class = base.id
-                        graph.add_edge(base_class, class_name)
-                    elif isinstance(base, ast.Attribute):
-                        base_class = f"{base.value.id}.{base.attr}"
-                        graph.add_edge(base_class, class_name)
+            # Any dotted base works (`a.b.C`, `Generic[T]`); calls and other
+            # expressions cannot be named and are skipped
+            for base in node.bases:
+                parts = base_parts(base)
+                if parts is not None:
+                    edges[('.'.join(parts), class_name)] = None
+
+    return list(nodes.items()), list(edges)
+
 
+def generate_class_hierarchy(path, cache=None, fmt="png"):
+    """Generate a class hierarchy for the given Python script.
 
+    fmt is one of png, dot, graphml or json; only png needs matplotlib.
+    """
+    source = load_source(path)
 
-    if not classes_found:
+    if source.is_empty():
+        click.secho(f"Error: The path '{path}' is an empty python file", fg='yellow')
+        raise click.Abort()
+    
+    output_path = graph_output_path(path, "_class_graph", fmt)
+    nodes, edges = cached_result(cache, "class_hierarchy", source, (), lambda: extract_class_hierarchy(source))
+
+    if not nodes:
         click.secho(f"Error: The file '{path}' does not contain any class definitions.", fg='red')
         raise click.Abort()
-    # Draw the graph
+
+    graph = nx.DiGraph()
+    for name, node_type in nodes:
+        graph.add_node(name, type=node_type)
+    graph.add_edges_from(edges)
+
+    export_graph(graph, output_path, fmt, draw_class_hierarchy, "Class Hierarchy")
+    click.echo(f"Class hierarchy saved as {output_path}")
+
+
+def generate_project_class_hierarchy(path, jobs=None, cache=None, fmt="png", since=None):
+    """Generate the inheritance graph of every class of a project directory.
+
+    Nodes are fully qualified class names, bases are resolved across modules
+    through the class index; external bases are kept as nodes without a file.
+    """
+    from astrix.features.class_index import build_class_index
+
+    index = build_class_index(path, jobs, cache, since)
+    if not index.classes and since is not None:
+        click.echo(f"No class changed since {since}.")
+        return None
+    if not index.classes:
+        click.secho(f"Error: No class definitions found in '{path}'.", fg='red')
+        raise click.Abort()
+
+    graph = class_index_graph(index)
+    output_path = graph_output_path(os.path.normpath(str(path)), "_class_graph", fmt)
+    export_graph(graph, output_path, fmt, draw_class_hierarchy, "Class Hierarchy")
+    click.echo(f"Class hierarchy saved as {output_path}")
+    return graph
+
+
+def class_index_graph(index):
+    """Return the inheritance graph of a class index, edges going from base to subclass."""
+    graph = nx.DiGraph()
+    for name, (file, lineno) in index.classes.items():
+        graph.add_node(name, type='class', file=file, lineno=lineno)
+    for name, bases in index.bases.items():
+        for base in bases:
+            graph.add_edge(base, name)
+    return graph
+
+
+def draw_class_hierarchy(graph, output_path):
+    """Render a class hierarchy to a PNG image."""
+    plt = pyplot()
+    plt.figure()
     pos = nx.spring_layout(graph)  # Seed for reproducibility
-    node_colors = ['skyblue' if data['type'] == 'class' else 'lightgreen' for _, data in graph.nodes(data=True)]
+    # Base classes defined outside the file have no type, draw them as classes
+    node_colors = ['lightgreen' if data.get('type') == 'method' else 'skyblue' for _, data in graph.nodes(data=True)]
     nx.draw(graph, pos, with_labels=True, node_size=3000, node_color=node_colors, font_size=10, font_weight="bold", arrows=True)
     plt.title("Class Hierarchy")
     plt.savefig(output_path)
-    click.echo(f"Class hierarchy saved as {output_path}")
-
+    plt.close()
@@ -0,0 +1,289 @@
+import os
+import click
+from array import array
+from functools import partial
+from astrix.features.graph_store import StringTable, csr, index_stamp, open_store, save_store, store_path
+from astrix.features.profiling import phase
+from astrix.features.project import display_path, find_python_files, map_files
+from astrix.features.symbols import ProjectSymbols, module_symbols
+
+
+INDEX_DIRNAME = "class_index"
+
+
+class ClassIndex:
+    """Inheritance index of every class of a project.
+
+    Bases are resolved across modules when the index is built. The MRO of
+    every class and the direct subclasses of every class (project or external
+    base such as ``Exception``) are precomputed. Transitive subclasses are
+    walked from the direct ones on the first query and memoized: storing every
+    closure up front grows quadratically with the depth of a hierarchy.
+    """
+
+    def __init__(self, classes, bases):
+        # Fully qualified name -> (file, lineno) of the classes of the project
+        self.classes = classes
+        # Fully qualified name -> tuple of base names; external bases are leaves
+        self.bases = bases
+        self.children = {}
+        for name, class_bases in bases.items():
+            for base in class_bases:
+                self.children.setdefault(base, []).append(name)
+
+        self.names = {}
+        for name in dict.fromkeys([*classes, *self.children]):
+            self.names.setdefault(name.rsplit('.', 1)[-1], []).append(name)
+
+        order = self._topological_order()
+        self.mros = {}
+        for name in order:
+            self.mros[name] = self._linearize(name)
+        self.descendants = {}
+
+    @classmethod
+    def from_project(cls, project, modules=None):
+        """Build the index from the symbols of a project, limited to the classes of modules when given."""
+        with phase("class index"):
+            classes = {}
+            bases = {}
+            names = project.class_modules
+            if modules is not None:
+                names = [name for name, module in names.items() if module in modules]
+            for name in names:
+                file, lineno, _ = project.definitions[name]
+                classes[name] = (file, lineno)
+                bases[name] = tuple(project.resolve_bases(name))
+            return cls(classes, bases)
+
+    def _topological_order(self):
+        """Return the project classes, every class after its bases.
+
+        Iterative depth first search; a base that is still being visited
+        (an inheritance cycle) is skipped.
+        """
+        order = []
+        state = {}
+        for root in self.classes:
+            if root in state:
+                continue
+            state[root] = 'visiting'
+            pending = [(root, iter(self.bases[root]))]
+            while pending:
+                name, bases = pending[-1]
+                for base in bases:
+                    if base in self.classes and base not in state:
+                        state[base] = 'visiting'
+                        pending.append((base, iter(self.bases[base])))
+                        break
+                else:
+                    pending.pop()
+                    state[name] = 'done'
+                    order.append(name)
+        return order
+
+    def _linearize(self, name):
+        """Return the C3 linearization of a class whose bases are already linearized.
+
+        External bases count as leaves. When no consistent order exists (Python
+        would raise a TypeError), the remaining classes are appended in depth
+        first order instead of failing the whole index.
+        """
+        bases = [base for base in self.bases.get(name, ()) if base != 'object']
+        if len(bases) == 1:
+            # Single inheritance, by far the common case
+            return (name, *self.mros.get(bases[0], (bases[0], 'object')))
+        sequences = [list(self.mros.get(base, (base,))) for base in bases]
+        sequences = [[entry for entry in sequence if entry != 'object'] for sequence in sequences]
+        sequences.append(list(bases))
+
+        result = [name]
+        while True:
+            sequences = [sequence for sequence in sequences if sequence]
+            if not sequences:
+                break
+            for sequence in sequences:
+                head = sequence[0]
+                if not any(head in other[1:] for other in sequences):
+                    break
+            else:
+                for sequence in sequences:
+                    result.extend(entry for entry in sequence if entry not in result)
+                break
+            result.append(head)
+            for sequence in sequences:
+                if sequence[0] == head:
+                    del sequence[0]
+        result.append('object')
+        return tuple(result)
+
+    def find(self, query):
+        """Return the classes a query names: a fully qualified name or any dotted suffix of one."""
+        if query in self.classes or query in self.children:
+            return [query]
+        candidates = self.names.get(query.rsplit('.', 1)[-1], ())
+        return [name for name in candidates if name.endswith('.' + query)]
+
+    def mro(self, name):
+        """Return the method resolution order of a class, the class itself first."""
+        return self.mros.get(name, (name, 'object') if name != 'object' else ('object',))
+
+    def subclasses(self, name):
+        """Return every direct and indirect subclass of a class, breadth first."""
+        descendants = self.descendants.get(name)
+        if descendants is None:
+            seen = {name: None}
+            pending = [name]
+            for current in pending:
+                for child in self.children.get(current, ()):
+                    if child not in seen:
+                        seen[child] = None
+                        pending.append(child)
+            del seen[name]
+            descendants = self.descendants[name] = tuple(seen)
+        return descendants
+
+    def location(self, name):
+        """Return the (file, lineno) of a project class, or (None, None) for external classes."""
+        return self.classes.get(name, (None, None))
+
+    def save(self, path, stamp):
+        """Save the index as a graph file, read back by MappedClassIndex."""
+        names = sorted({*self.classes, *self.children, 'object'})
+        ids = {name: position for position, name in enumerate(names)}
+        files = {}
+        node_files = array('i', [-1]) * len(names)
+        lines = array('i', bytes(4 * len(names)))
+        for name, (file, lineno) in self.classes.items():
+            node_files[ids[name]] = files.setdefault(file, len(files))
+            lines[ids[name]] = lineno or 0
+        mro_offsets, mros = csr(len(names), [(ids[name], ids[entry]) for name, mro in self.mros.items() for entry in mro])
+        child_offsets, children = csr(len(names), [(ids[name], ids[child]) for name, class_children in self.children.items()
+                                                   for child in class_children])
+        save_store(path, stamp, {
+            **StringTable.build(names).sections('names'), **StringTable.build(files).sections('files'),
+            'node_files': node_files, 'lines': lines,
+            'mro_offsets': mro_offsets, 'mros': mros, 'child_offsets': child_offsets, 'children': children,
+        })
+
+
+class MappedClassIndex:
+    """The queries of a ClassIndex, answered from a graph file saved by ClassIndex.save.
+
+    Classes are numbered in name order; MROs and direct subclasses are stored
+    as compressed sparse rows of class numbers and read in place from the
+    mapped file, so opening the index costs the same for any project size.
+    """
+
+    def __init__(self, store):
+        self.names = store.strings('names')
+        self.files = store.strings('files')
+        self.node_files = store.array('node_files')
+        self.lines = store.array('lines')
+        self.mro_offsets = store.array('mro_offsets')
+        self.mros = store.array('mros')
+        self.child_offsets = store.array('child_offsets')
+        self.children = store.array('children')
+        self.descendants = {}
+
+    def find(self, query):
+        """Return the classes a query names: a fully qualified name or any dotted suffix of one."""
+        if query in self.names:
+            return [query]
+        return [self.names[position] for position in self.names.endswith('.' + query)]
+
+    def mro(self, name):
+        """Return the method resolution order of a class, the class itself first."""
+        if name in self.names:
+            position = self.names.index(name)
+            mro = self.mros[self.mro_offsets[position]:self.mro_offsets[position + 1]]
+            if len(mro):
+                return tuple(self.names[entry] for entry in mro)
+        return (name, 'object') if name != 'object' else ('object',)
+
+    def subclasses(self, name):
+        """Return every direct and indirect subclass of a class, breadth first."""
+        descendants = self.descendants.get(name)
+        if descendants is None:
+            if name not in self.names:
+                return ()
+            start = self.names.index(name)
+            seen = {start: None}
+            pending = [start]
+            for current in pending:
+                for child in self.children[self.child_offsets[current]:self.child_offsets[current + 1]]:
+                    if child not in seen:
+                        seen[child] = None
+                        pending.append(child)
+            del seen[start]
+            descendants = self.descendants[name] = tuple(self.names[position] for position in seen)
+        return descendants
+
+    def location(self, name):
+        """Return the (file, lineno) of a project class, or (None, None) for external classes."""
+        if name not in self.names:
+            return None, None
+        position = self.names.index(name)
+        file = self.node_files[position]
+        if file < 0:
+            return None, None
+        return self.files[file], self.lines[position]
+
+
+def build_class_index(path, jobs=None, cache=None, since=None):
+    """Index the classes of every Python file below a directory (or of a single file).
+
+    With since (a git ref) only the classes of the files changed since then
+    and of their direct dependents are indexed.
+    """
+    if since is not None:
+        from astrix.features.changes import change_set_symbols
+
+        modules, context = change_set_symbols(path, since, cache, jobs)
+        return ClassIndex.from_project(ProjectSymbols([*context, *modules]), {symbols['module'] for symbols in modules})
+    files = find_python_files(path) if os.path.isdir(path) else [str(path)]
+    modules = [symbols for symbols in map_files(partial(module_symbols, cache=cache, root=path), files, jobs) if symbols]
+    return ClassIndex.from_project(ProjectSymbols(modules))
+
+
+def load_class_index(path, jobs=None, cache=None, cache_dir=None):
+    """Return the class index of a project, mapping the one saved in cache_dir when still valid.
+
+    The saved index is keyed by the analyzed path and checked against the
+    modification times of the project files, so an unchanged project is
+    answered without parsing or resolving anything.
+    """
+    if not cache_dir:
+        return build_class_index(path, jobs, cache)
+
+    files = find_python_files(path) if os.path.isdir(path) else [str(path)]
+    stamp = index_stamp(files)
+    index_path = store_path(cache_dir, INDEX_DIRNAME, path)
+    store = open_store(index_path, stamp)
+    if store is not None:
+        return MappedClassIndex(store)
+
+    index = build_class_index(path, jobs, cache)
+    index.save(index_path, stamp)
+    return index
+
+
+def resolve_class_query(index, query, path):
+    """Return the single class a query names, reporting missing or ambiguous names."""
+    matches = index.find(query)
+    if not matches:
+        click.secho(f"Error: No class named '{query}' found in '{path}'.", fg='red')
+        raise click.Abort()
+    if len(matches) > 1:
+        click.secho(f"Error: '{query}' matches several classes: {', '.join(sorted(matches))}", fg='red')
+        raise click.Abort()
+    return matches[0]
+
+
+def class_rows(index, names, root):
+    """Return [class, file, line] table rows, file paths relative to root."""
+    rows = []
+    for name in names:
+        file, lineno = index.location(name)
+        rows.append([name, display_path(file, root) if file else None, lineno])
+    return rows
@@ -1,13 +1,92 @@
-from radon.visitors import ComplexityVisitor
-from radon.complexity import cc_visit
-from radon.metrics import mi_parameters
-from tabulate import tabulate
+import sys
 import click
 import os
+from astrix.features.source import load_source
+from astrix.features.cache import cached_result
+from astrix.features.metrics import combine_tree_metrics, raw_metrics, segment_tree_metrics, tree_metrics
+from astrix.features.segments import segmented_result
 
 
 
-def analyze_code_quality(path):
+class FunctionRecord:
+    """Compact analysis result of one function or method.
+
+    Closures are kept by name only. Names are interned, so the many
+    functions called `__init__` or methods of the same class share their
+    strings, and the file a record belongs to is an index into a FileTable.
+    """
+
+    __slots__ = ('name', 'lineno', 'col_offset', 'endline', 'is_method', 'classname', 'closures', 'complexity', 'file_id')
+
+    def __init__(self, name, lineno, col_offset, endline, is_method, classname, closures, complexity, file_id=0):
+        self.name = sys.intern(name)
+        self.lineno = lineno
+        self.col_offset = col_offset
+        self.endline = endline
+        self.is_method = is_method
+        self.classname = sys.intern(classname) if classname is not None else None
+        self.closures = tuple(sys.intern(closure) for closure in closures)
+        self.complexity = complexity
+        self.file_id = file_id
+
+    def row(self):
+        """Return the plain (picklable, cacheable) tuple form of the record."""
+        return (self.name, self.lineno, self.col_offset, self.endline, self.is_method, self.classname, self.closures, self.complexity)
+
+    def __repr__(self):
+        return f"FunctionRecord(name={self.name!r}, lineno={self.lineno}, complexity={self.complexity})"
+
+
+class FileTable:
+    """Numbers the files of a run, so records store a small int instead of a path."""
+
+    def __init__(self):
+        self.paths = []
+        self.ids = {}
+
+    def add(self, path):
+        """Return the id of a file, registering it on first use."""
+        file_id = self.ids.get(path)
+        if file_id is None:
+            file_id = self.ids[path] = len(self.paths)
+            self.paths.append(path)
+        return file_id
+
+    def __getitem__(self, file_id):
+        return self.paths[file_id]
+
+
+def file_metrics(source, cache=None):
+    """Return the tree metrics of a loaded source file (see metrics.tree_metrics), cached.
+
+    Long files are also cached per function, method and class, so an edit
+    only walks the segments that changed.
+    """
+    return cached_result(cache, "metrics", source, (), lambda: segmented_result(
+        cache, "metrics", source, (), segment_tree_metrics, combine_tree_metrics, lambda: tree_metrics(source.tree)))
+
+
+def file_raw_metrics(source, cache=None):
+    """Return (lloc, sloc, comments, multi) of a loaded source file, cached.
+
+    Kept apart from the tree metrics: tokenizing costs more than walking the
+    tree and only the maintainability index needs it.
+    """
+    return cached_result(cache, "raw_metrics", source, (), lambda: segmented_result(
+        cache, "raw_metrics", source, (), lambda segment: raw_metrics(segment.code), _sum_raw_metrics, lambda: raw_metrics(source.code)))
+
+
+def _sum_raw_metrics(parts):
+    # Every count is per line or per statement, segments start a new statement
+    return tuple(map(sum, zip(*(raw for _, raw in parts))))
+
+
+def analyze_code_quality(path, cache=None):
+    """Return a FunctionRecord for every function and method of the given Python file."""
+    return [FunctionRecord(*row) for row in _function_tuples(path, cache)]
+
+
+def _function_tuples(path, cache=None):
     path = str(path)
     path = path or click.get_current_context().params['path']
     if not path.lower().endswith('.py'):
@@ -18,21 +97,23 @@ def analyze_code_quality(path):
         click.secho(f"Error: The path '{path}' is not a file or does not exist.", fg='red')
         raise click.Abort()
     
-    try:
-        with open(path, 'r', encoding='utf-8') as file:
-            code = file.read()
-    except IOError as e:
-        click.secho(f"Error: Unable to read the file '{path}'. {e}", fg='red')
-        raise click.Abort()
-    
-    results = cc_visit(code)
-    keys = ["Name", "Line Number", "Column Offset", "Endline", "isMethod", "Class", "Closures", "Complexity"]
-    data = [[val] for val in results]
-    data = dict(zip(keys, data))
-    return results
+    source = load_source(path)
+    return file_metrics(source, cache)['functions']
 
 
-def analyze_maintainability_index(path, multi):
+def mi_parameters(metrics, raw, count_multi=True):
+    """Return the maintainability index parameters from the tree and raw metrics of a file.
+
+    Same values as radon.metrics.mi_parameters: Halstead volume, total
+    complexity, LLOC and the percentage of comment lines.
+    """
+    lloc, sloc, comments, multi = raw
+    comments_lines = comments + (multi if count_multi else 0)
+    comments = comments_lines / float(sloc) * 100 if sloc != 0 else 0
+    return (metrics['halstead_volume'], metrics['complexity'], lloc, comments)
+
+
+def analyze_maintainability_index(path, multi, cache=None):
     """Calculate the maintainability index of the given Python file."""
     path = str(path)
     path = path or click.get_current_context().params['path']
@@ -45,14 +126,8 @@ def analyze_maintainability_index(path, multi):
         click.secho(f"Error: The path '{path}' is not a file or does not exist.", fg='red')
         raise click.Abort()
 
-    try:
-        with open(path, 'r', encoding='utf-8') as file:
-            code = file.read()
-    except IOError as e:
-        click.secho(f"Error: Unable to read the file '{path}'. {e}", fg='red')
-        raise click.Abort()
-    
-    maintainability_data = list(mi_parameters(code, multi))
+    source = load_source(path)
+    maintainability_data = list(mi_parameters(file_metrics(source, cache), file_raw_metrics(source, cache), multi))
     keys = ["Halstead Volume", "Complexity", "LLOC", "Percentage of comments"]
 
     maintainability_data = [[val] for val in maintainability_data]
@@ -60,4 +135,36 @@ def analyze_maintainability_index(path, multi):
     return data
 
 
+FUNCTION_HEADERS = ["Name", "Line Number", "Column Offset", "Endline", "isMethod", "Class", "Closures", "Complexity"]
+MAINTAINABILITY_HEADERS = ["Halstead Volume", "Complexity", "LLOC", "Percentage of comments"]
+
+# Column names of the NDJSON and CSV output, one row per function or file
+FUNCTION_FIELDS = ["file", "name", "lineno", "col_offset", "endline", "is_method", "classname", "closures", "complexity"]
+MAINTAINABILITY_FIELDS = ["file", "halstead_volume", "complexity", "lloc", "comments_percent"]
+
+
+def function_rows(records):
+    """Convert function records into table rows."""
+    return [[*record.row()[:6], list(record.closures), record.complexity] for record in records]
+
 
+def code_quality_rows(path, cache=None):
+    """Return the function tuples of a file (see FunctionRecord.row), or None if the file cannot be analyzed.
+
+    Used when analyzing a whole directory, where a single bad file should not
+    abort the run. Plain tuples are cheaper to send back from worker
+    processes than records.
+    """
+    try:
+        return _function_tuples(path, cache)
+    except click.Abort:
+        return None
+
+
+def maintainability_row(path, multi, cache=None):
+    """Return the maintainability row of a file, or None if the file cannot be analyzed."""
+    try:
+        data = analyze_maintainability_index(path, multi, cache)
+    except click.Abort:
+        return None
+    return [data[key][0] for key in MAINTAINABILITY_HEADERS]
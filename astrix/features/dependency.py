@@ -1,29 +1,113 @@
 import click
 import ast
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from stdlib_list import in_stdlib
-from importlib.metadata import packages_distributions
+from astrix.features.distribution_index import distribution_for
+from astrix.features.source import load_source
+from astrix.features.metadata_store import load_snapshot
+from astrix.features.profiling import phase
 
-def fetch_module_details(url):
+PYPI_URL = "https://pypi.org/pypi"
+
+# Column names of the NDJSON and CSV output, one row per imported module
+DEPENDENCY_FIELDS = ["module", "description", "documentation", "github_url"]
+REQUEST_TIMEOUT = 10
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+
+def create_session(concurrency=MAX_CONCURRENCY, retries=None, backoff_factor=None):
+    """
+    Creates a requests session whose keep-alive connection pool is shared by
+    all the metadata lookups of a run.
+
+    Failed requests (connection errors, 429 and 5xx responses) are retried
+    with exponential backoff.
+    """
+    retry = Retry(
+        total=MAX_RETRIES if retries is None else retries,
+        backoff_factor=BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_module_details(url, session=None):
     """
     Fetches the description of a given Python package using the PyPI API.
     
-    :param package_name: The name of the package.
-    :return: Description of the package or an error message if not found.
+    :param url: The PyPI JSON API url of the package.
+    :param session: Optional requests session to reuse connections from.
+    :return: The package metadata or an empty dict if not found.
     """
     try:
-        response = requests.get(url)
+        response = (session or requests).get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
 
         data = response.json()
         return data
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching package information : {e}")
+        click.echo(f"Error fetching package information : {e}", err=True)
         return {}
     except KeyError:
-        print(f'Package not found or no description available')
+        click.echo('Package not found or no description available', err=True)
+        return {}
+
+
+def lookup_local_details(package, store=None, offline=False, snapshot_dir=None):
+    """
+    Returns the PyPI metadata of a package from the local metadata store or
+    snapshot directory, or None if it has to be fetched from the network.
+
+    In offline mode expired store entries are served as well.
+    """
+    if store is not None:
+        data = store.get(package, allow_stale=offline)
+        if data is not None:
+            return data
+
+    if snapshot_dir:
+        data = load_snapshot(snapshot_dir, package)
+        if data is not None:
+            return data
+
+    return None
+
+
+def fetch_many_details(packages, session=None, concurrency=MAX_CONCURRENCY):
+    """
+    Fetches the PyPI metadata of several packages concurrently over a
+    shared keep-alive session, at most `concurrency` requests at a time.
+
+    :return: A dict mapping each package to its metadata (empty if not found).
+    """
+    packages = list(dict.fromkeys(packages))
+    if not packages:
         return {}
 
+    own_session = session is None
+    if own_session:
+        session = create_session(concurrency)
+    try:
+        urls = [f"{PYPI_URL}/{package}/json" for package in packages]
+        with phase("network"), ThreadPoolExecutor(max_workers=min(concurrency, len(packages))) as executor:
+            results = executor.map(lambda url: fetch_module_details(url, session), urls)
+            return dict(zip(packages, results))
+    finally:
+        if own_session:
+            session.close()
+
+
 def processResponse(project_url):
     github_url = ""
 
@@ -35,79 +119,90 @@ def processResponse(project_url):
     return github_url
 
 def get_pypi_name(module):
-    res = packages_distributions()
-    if module not in res:
-        return module
+    """Return the PyPI name of the distribution providing an imported module.
+
+    Modules no installed distribution provides are assumed to be published
+    under their top level name.
+    """
+    name = distribution_for(module)
+    if name is None:
+        return module.split('.')[0]
+    return name
+
+
+def describe_module(module, details):
+    """Return the [summary, documentation, github url] entry of a third party package."""
+    if details == {}:
+        summary = "No summary available :("
+        documentation = "No documentation available :("
+        github_url = "No github URL :("
     else:
-        return res[module][0]
+        info = details.get("info") or {}
+        summary = info.get("summary") or "No summary available :("
+        project_urls = info.get("project_urls") or {}
+        documentation = project_urls.get("Documentation", f"https://pypi.org/pypi/{module}")
+        github_url = processResponse(project_urls)
+    return [summary, documentation, github_url]
 
 
-def generate_dependency_info(path):
-    """Generate a dependency graph for the specified Python script."""
-    try:
-        with open(path, 'r') as file:
-            code = file.read()
-    except Exception as e:
-        click.echo(f"Error reading file: {e}")
-        raise click.Abort()
-    
-    
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        click.secho(f"Error: The python file '{path}' has Syntax Errors", fg='red')
-        raise click.Abort()
-    
+def imported_modules(tree):
+    """Return the names of the modules imported in a tree, in order of appearance."""
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names[alias.name] = None
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            # Relative imports always refer to the project itself
+            names[node.module] = None
+    return list(names)
+
+
+def generate_dependency_info(path, store=None, offline=False, snapshot_dir=None, concurrency=MAX_CONCURRENCY):
+    """Generate a dependency graph for the specified Python script.
 
+    Package metadata is looked up in the optional MetadataStore and snapshot
+    directory first, the remaining packages are fetched from PyPI
+    concurrently. offline=True never touches the network.
+    """
+    tree = load_source(path).tree
+    return describe_modules(imported_modules(tree), store, offline, snapshot_dir, concurrency)
+
+
+def describe_modules(names, store=None, offline=False, snapshot_dir=None, concurrency=MAX_CONCURRENCY):
+    """Return the [module, description, documentation, github url] rows of imported module names."""
     modules = {}
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    module = alias.name
-                    if in_stdlib(module):
-                        documentation = f"https://docs.python.org/3/library/{module}.html"
-                        modules[module] = ["Inbuilt module of python", documentation, "https://github.com/python/cpython"]
-
-                    else:
-                        module = get_pypi_name(module)
-                        url = f"https://pypi.org/pypi/{module}/json"
-                        moduleDetails = fetch_module_details(url)
-                        if moduleDetails == {}:
-                            summary = "No summary available :("
-                            project_urls = {}
-                            documentation = "No documentation available :("
-                            github_url = "No github URL :("
-                        else:
-                            summary = moduleDetails["info"].get("summary", "No summary available :(")
-                            project_urls = moduleDetails["info"].get("project_urls", {})
-                            documentation = project_urls.get("Documentation", f"https://pypi.org/pypi/{module}")
-                            github_url = processResponse(project_urls)
-                        modules[module] = [summary, documentation, github_url]
-                    
-
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module
-                if in_stdlib(module):
-                    documentation = f"https://docs.python.org/3/library/{module}.html"
-                    modules[module] = ["Inbuilt module of python", documentation, "https://github.com/python/cpython"]
-                else:
-                    module = get_pypi_name(module)
-                    url = f"https://pypi.org/pypi/{module}/json"
-                    moduleDetails = fetch_module_details(url)
-                    if moduleDetails == {}:
-                            summary = "No summary available :("
-                            project_urls = {}
-                            documentation = "No documentation available :("
-                            github_url = "No github URL :("
-                    else:
-                        summary = moduleDetails["info"].get("summary", "No summary available :(")
-                        project_urls = moduleDetails["info"].get("project_urls", {})
-                        documentation = project_urls.get("Documentation", f"https://pypi.org/pypi/{module}")
-                        github_url = processResponse(project_urls)
-                    modules[module] = [summary, documentation, github_url]
+    packages = []
+    for module in names:
+        if in_stdlib(module):
+            documentation = f"https://docs.python.org/3/library/{module}.html"
+            modules[module] = ["Inbuilt module of python", documentation, "https://github.com/python/cpython"]
+        else:
+            module = get_pypi_name(module)
+            modules[module] = None
+            packages.append(module)
+
+    details = {}
+    missing = []
+    for package in dict.fromkeys(packages):
+        data = lookup_local_details(package, store, offline, snapshot_dir)
+        if data is None:
+            missing.append(package)
+        else:
+            details[package] = data
+
+    if offline:
+        details.update((package, {}) for package in missing)
+    else:
+        fetched = fetch_many_details(missing, concurrency=concurrency)
+        if store is not None:
+            for package, data in fetched.items():
+                store.put(package, data)
+        details.update(fetched)
+
+    for package in packages:
+        modules[package] = describe_module(package, details[package])
 
-    
     table = []
     if(modules == {}):
         return table
@@ -116,7 +211,3 @@ def generate_dependency_info(path):
         table.append([pkg, *info])
     
     return table
-
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import tempfile
+import importlib.metadata
+from astrix.features.profiling import phase
+
+
+INDEX_FILENAME = "dist_index.json"
+
+_index = None
+
+
+def _module_prefixes(file):
+    """Yield the dotted package names a file installed by a distribution belongs to."""
+    parts = file.parts
+    if not parts or parts[0].endswith(('.dist-info', '.egg-info', '.data')) or parts[0] in ('..', '__pycache__'):
+        return
+    if len(parts) == 1:
+        name, ext = os.path.splitext(parts[0])
+        # Extension modules carry an ABI tag: foo.cpython-311-x86_64-linux-gnu.so
+        name = name.split('.')[0]
+        if ext in ('.py', '.so', '.pyd') and name.isidentifier():
+            yield name
+        return
+    packages = parts[:-1]
+    for depth in range(1, len(packages) + 1):
+        if not packages[depth - 1].isidentifier():
+            return
+        yield '.'.join(packages[:depth])
+
+
+def build_distribution_index():
+    """Map every importable package name to the distributions providing it.
+
+    Unlike importlib.metadata.packages_distributions, which only knows top
+    level names, dotted packages are indexed too, so namespace packages such
+    as ``google.cloud.storage`` resolve to the distribution shipping them.
+    """
+    index = {}
+    with phase("distribution index"):
+        for dist in importlib.metadata.distributions():
+            name = dist.metadata['Name']
+            if not name:
+                continue
+
+            modules = set()
+            top_level = dist.read_text('top_level.txt')
+            if top_level:
+                modules.update(line.strip() for line in top_level.splitlines() if line.strip())
+            for file in dist.files or ():
+                modules.update(_module_prefixes(file))
+
+            for module in modules:
+                providers = index.setdefault(module, [])
+                if name not in providers:
+                    providers.append(name)
+    return index
+
+
+def _holds_distributions(path):
+    """Return whether an import path directory has distributions installed in it."""
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.name.endswith(('.dist-info', '.egg-info')) for entry in entries)
+    except OSError:
+        return False
+
+
+def site_packages_stamp():
+    """Return the modification times of the import path directories holding distributions.
+
+    Installing or removing a distribution changes the modification time of
+    the directory it is installed to, invalidating a persisted index. Other
+    directories, like the working directory `python -m` puts on the path
+    (where the cache itself lives), are left out.
+    """
+    stamp = []
+    for path in sys.path:
+        if not path or not _holds_distributions(path):
+            continue
+        try:
+            stamp.append([path, os.stat(path).st_mtime_ns])
+        except OSError:
+            continue
+    return stamp
+
+
+def _load_persisted(index_path, stamp):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if data.get('stamp') != stamp:
+        return None
+    return data.get('index')
+
+
+def _persist(index_path, stamp, index):
+    try:
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path) or '.', suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump({'stamp': stamp, 'index': index}, file)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+
+def load_distribution_index(cache_dir=None):
+    """Return the distribution index, building it at most once per process.
+
+    With a cache_dir the index is also persisted there and reused by later
+    runs as long as the import path directories are unchanged.
+    """
+    global _index
+    if _index is not None:
+        return _index
+
+    if cache_dir:
+        index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        stamp = site_packages_stamp()
+        index = _load_persisted(index_path, stamp)
+        if index is None:
+            index = build_distribution_index()
+            _persist(index_path, stamp, index)
+    else:
+        index = build_distribution_index()
+
+    _index = index
+    return _index
+
+
+def reset_distribution_index():
+    """Forget the index built by this process."""
+    global _index
+    _index = None
+
+
+def distribution_for(module, index=None):
+    """Return the name of the distribution providing a (possibly dotted) module, or None.
+
+    The longest indexed package prefix of the module wins, so
+    ``google.cloud.storage.blob`` maps to the distribution shipping
+    ``google.cloud.storage`` rather than any ``google`` distribution.
+    """
+    if index is None:
+        index = load_distribution_index()
+    parts = module.split('.')
+    for depth in range(len(parts), 0, -1):
+        providers = index.get('.'.join(parts[:depth]))
+        if providers:
+            return providers[0]
+    return None
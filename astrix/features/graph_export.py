@@ -0,0 +1,120 @@
+import json
+from xml.sax.saxutils import escape, quoteattr
+from astrix.features.profiling import phase
+
+
+GRAPH_FORMATS = ("png", "dot", "graphml", "json")
+
+
+def graph_output_path(path, suffix, fmt):
+    """Return where the graph of a file or directory is saved, e.g. `sample_callgraph.dot`."""
+    path = str(path)
+    if path.endswith(".py"):
+        return path.replace(".py", f"{suffix}.{fmt}")
+    return f"{path.rstrip('/')}{suffix}.{fmt}"
+
+
+def pyplot():
+    """Import matplotlib.pyplot on the non-interactive Agg backend.
+
+    Rendering never needs a display, and matplotlib is only loaded when a
+    PNG is actually requested.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _dot_id(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _dot_attributes(data):
+    if not data:
+        return ""
+    items = ", ".join(f"{key}={_dot_id(value)}" for key, value in data.items())
+    return f" [{items}]"
+
+
+def write_dot(graph, file, name="G"):
+    """Write a graph in Graphviz DOT format, one node or edge per line."""
+    file.write(f"digraph {_dot_id(name)} {{\n")
+    for node, data in graph.nodes(data=True):
+        file.write(f"  {_dot_id(node)}{_dot_attributes(data)};\n")
+    for source, target in graph.edges():
+        file.write(f"  {_dot_id(source)} -> {_dot_id(target)};\n")
+    file.write("}\n")
+
+
+def _graphml_type(value):
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "long"
+    if isinstance(value, float):
+        return "double"
+    return "string"
+
+
+def write_graphml(graph, file, name="G"):
+    """Write a graph in GraphML, streaming nodes and edges."""
+    keys = {}
+    for _, data in graph.nodes(data=True):
+        for key, value in data.items():
+            keys.setdefault(key, _graphml_type(value))
+
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    file.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    key_ids = {}
+    for index, (key, key_type) in enumerate(keys.items()):
+        key_ids[key] = f"d{index}"
+        file.write(f'  <key id="d{index}" for="node" attr.name={quoteattr(str(key))} attr.type="{key_type}"/>\n')
+    file.write(f'  <graph id={quoteattr(str(name))} edgedefault="directed">\n')
+    for node, data in graph.nodes(data=True):
+        if not data:
+            file.write(f'    <node id={quoteattr(str(node))}/>\n')
+            continue
+        file.write(f'    <node id={quoteattr(str(node))}>')
+        for key, value in data.items():
+            if isinstance(value, bool):
+                value = str(value).lower()
+            file.write(f'<data key="{key_ids[key]}">{escape(str(value))}</data>')
+        file.write('</node>\n')
+    for source, target in graph.edges():
+        file.write(f'    <edge source={quoteattr(str(source))} target={quoteattr(str(target))}/>\n')
+    file.write('  </graph>\n</graphml>\n')
+
+
+def write_json(graph, file, name="G"):
+    """Write a graph as node-link JSON, readable with networkx.node_link_graph(data, edges="edges")."""
+    file.write('{"directed": true, "multigraph": false, "graph": ')
+    file.write(json.dumps({"name": name}))
+    file.write(', "nodes": [')
+    for index, (node, data) in enumerate(graph.nodes(data=True)):
+        file.write((",\n" if index else "\n") + json.dumps({**data, "id": node}))
+    file.write('\n], "edges": [')
+    for index, (source, target) in enumerate(graph.edges()):
+        file.write((",\n" if index else "\n") + json.dumps({"source": source, "target": target}))
+    file.write('\n]}\n')
+
+
+WRITERS = {
+    "dot": write_dot,
+    "graphml": write_graphml,
+    "json": write_json,
+}
+
+
+def export_graph(graph, output_path, fmt, draw_png, name="G"):
+    """Save a graph in the requested format.
+
+    Text formats are streamed straight from the graph; draw_png(graph, path)
+    is only called for PNG output.
+    """
+    with phase("render"):
+        if fmt == "png":
+            draw_png(graph, output_path)
+            return
+        with open(output_path, "w", encoding="utf-8") as file:
+            WRITERS[fmt](graph, file, name)
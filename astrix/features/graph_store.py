@@ -0,0 +1,192 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from astrix import __version__
+from astrix.features.cache import CACHE_FORMAT
+
+
+MAGIC = b"ASTRIXG1"
+# Magic, stamp of the project files and number of sections
+_HEADER = struct.Struct("<8s64sI")
+# Name, offset and length in bytes of a section
+_SECTION = struct.Struct("<16sQQ")
+_ALIGNMENT = 8
+
+
+def index_stamp(files):
+    """Return a digest of the file list and modification times an index was built from."""
+    digest = hashlib.sha256(f"{__version__}\0{CACHE_FORMAT}".encode('utf-8'))
+    for file in files:
+        try:
+            stat = os.stat(file)
+        except OSError:
+            continue
+        digest.update(f"\0{file}\0{stat.st_mtime_ns}\0{stat.st_size}".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+def store_path(cache_dir, dirname, path):
+    """Return where the index of the project at path is persisted."""
+    root = hashlib.sha256(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir, dirname, f"{root}.graph")
+
+
+def csr(count, edges):
+    """Return the (offsets, targets) arrays of adjacency lists given as (source, target) id pairs.
+
+    The targets of node i are targets[offsets[i]:offsets[i + 1]], in the order
+    of edges.
+    """
+    offsets = array('i', bytes(4 * (count + 1)))
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for position in range(count):
+        offsets[position + 1] += offsets[position]
+    targets = array('i', bytes(4 * len(edges)))
+    fill = offsets[:-1]
+    for source, target in edges:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+class StringTable:
+    """Strings stored back to back in a single UTF-8 buffer, each ended by a newline.
+
+    String i spans data[offsets[i]:offsets[i + 1] - 1], so the table is read
+    straight from a mapped file and only the strings used are decoded. Lookups
+    by value (``in``, ``index``) bisect the table and need it to be sorted.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, strings):
+        offsets = array('i', [0])
+        chunks = []
+        for string in strings:
+            chunk = string.encode('utf-8', 'surrogateescape') + b'\n'
+            chunks.append(chunk)
+            offsets.append(offsets[-1] + len(chunk))
+        return cls(b''.join(chunks), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return bytes(self.data[self.offsets[position]:self.offsets[position + 1] - 1]).decode('utf-8', 'surrogateescape')
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def __contains__(self, value):
+        position = bisect_left(self, value)
+        return position < len(self) and self[position] == value
+
+    def index(self, value):
+        position = bisect_left(self, value)
+        if position == len(self) or self[position] != value:
+            raise ValueError(f"{value!r} is not in the table")
+        return position
+
+    def endswith(self, suffix):
+        """Return the positions of the strings ending with suffix, scanning the buffer once."""
+        pattern = re.escape(suffix.encode('utf-8', 'surrogateescape')) + b'\n'
+        return [bisect_left(self.offsets, match.end()) - 1 for match in re.finditer(pattern, self.data)]
+
+    def sections(self, name):
+        return {name: self.data, f"{name}.idx": self.offsets}
+
+
+def save_store(path, stamp, sections):
+    """Write named buffers (bytes or int arrays) to a graph file, atomically.
+
+    Errors are ignored: the file is only a cache of an index that can be
+    built again.
+    """
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    chunks = []
+    table = []
+    offset = header_size + -header_size % _ALIGNMENT
+    for name, values in sections.items():
+        if isinstance(values, array) and sys.byteorder == 'big':
+            values = array(values.typecode, values)
+            values.byteswap()
+        data = memoryview(values).cast('B')
+        table.append(_SECTION.pack(name.encode('ascii'), offset, len(data)))
+        padding = -len(data) % _ALIGNMENT
+        chunks.append(data)
+        chunks.append(bytes(padding))
+        offset += len(data) + padding
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, stamp.encode('ascii'), len(sections)))
+            file.write(b''.join(table))
+            file.write(bytes(-header_size % _ALIGNMENT))
+            for chunk in chunks:
+                file.write(chunk)
+        # Readers keep their mapping of the file being replaced
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+class GraphStore:
+    """A graph file mapped read-only in memory.
+
+    Sections are exposed as views of the mapping, nothing is copied or
+    unpacked when the file is opened; processes opening the same file share
+    its pages through the page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, stamp, count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Astrix graph file")
+        self.stamp = stamp.decode('ascii')
+        self.sections = {}
+        for position in range(count):
+            name, offset, length = _SECTION.unpack_from(self._map, _HEADER.size + position * _SECTION.size)
+            if offset + length > len(self._map):
+                raise ValueError(f"{path} is truncated")
+            self.sections[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+
+    def bytes(self, name):
+        offset, length = self.sections[name]
+        return memoryview(self._map)[offset:offset + length]
+
+    def array(self, name):
+        values = self.bytes(name).cast('i')
+        if sys.byteorder == 'big':
+            values = array('i', values)
+            values.byteswap()
+        return values
+
+    def strings(self, name):
+        return StringTable(self.bytes(name), self.array(f"{name}.idx"))
+
+
+def open_store(path, stamp):
+    """Return the graph file at path when it was saved with stamp, None when missing, stale or unreadable."""
+    try:
+        store = GraphStore(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    return store if store.stamp == stamp else None
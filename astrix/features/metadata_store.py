@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import sqlite3
+import time
+import click
+
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+# Packages PyPI does not know (local modules) or that failed to fetch are kept for an hour
+MISSING_TTL = 60 * 60
+STORE_FILENAME = "pypi.sqlite"
+
+
+def normalize_name(name):
+    """Normalize a distribution name as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def slim_metadata(data):
+    """Keep only the parts of a PyPI JSON document Astrix uses.
+
+    The full document lists every release and file of a project and can be
+    megabytes large, while only the summary and project URLs are displayed.
+    An empty document, the entry of a missing package, stays empty.
+    """
+    if not data:
+        return {}
+    info = data.get("info") or {}
+    return {"info": {"summary": info.get("summary"), "project_urls": info.get("project_urls") or {}}}
+
+
+class MetadataStore:
+    """SQLite backed store of PyPI package metadata.
+
+    Every entry records when it expires, entries past their TTL are only
+    served when explicitly allowing stale data (offline mode). Packages that
+    could not be fetched are stored too, as an empty document expiring after
+    MISSING_TTL, so that local modules do not cost a request on every run.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = str(path)
+        self.ttl = ttl
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS packages ("
+            "name TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, name, allow_stale=False):
+        """Return the stored metadata of a package, or None when missing or expired."""
+        row = self.connection.execute(
+            "SELECT data, expires_at FROM packages WHERE name = ?", (normalize_name(name),)
+        ).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        if not allow_stale and expires_at < time.time():
+            return None
+        return json.loads(data)
+
+    def put(self, name, data, ttl=None):
+        """Store the metadata of a package for ttl seconds.
+
+        The default is the store TTL, or MISSING_TTL (when shorter) for the
+        empty document of a missing package.
+        """
+        now = time.time()
+        if ttl is None:
+            ttl = self.ttl if data else min(self.ttl, MISSING_TTL)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO packages (name, data, fetched_at, expires_at) VALUES (?, ?, ?, ?)",
+            (normalize_name(name), json.dumps(slim_metadata(data)), now, now + ttl),
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def load_snapshot(snapshot_dir, name):
+    """Return the metadata of a package from a local snapshot directory, if present.
+
+    A snapshot directory holds one PyPI JSON document per package, named
+    ``<package>.json`` (the normalized name is tried as well).
+    """
+    for candidate in dict.fromkeys((name, normalize_name(name))):
+        path = os.path.join(snapshot_dir, f"{candidate}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            click.echo(f"Error reading metadata snapshot {path}: {e}", err=True)
+            return None
+    return None
@@ -0,0 +1,394 @@
+import ast
+import io
+import math
+import tokenize
+from astrix.features.symbols import LEAF_TYPES
+
+
+# Nodes adding decision points to the cyclomatic complexity, as counted by radon
+BRANCH_TYPES = frozenset([ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.BoolOp, ast.comprehension, ast.Match])
+
+OP, NL, NEWLINE, COMMENT, STRING, ENDMARKER = tokenize.OP, tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT, tokenize.STRING, tokenize.ENDMARKER
+IGNORED_TOKENS = frozenset([tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER])
+OPENING = frozenset('([{')
+CLOSING = frozenset(')]}')
+
+# Nodes counted as Halstead operators, with their operands
+HALSTEAD_TYPES = frozenset([ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.AugAssign, ast.Compare])
+
+
+class _Frame:
+    """A module, function or class being walked."""
+
+    __slots__ = ('kind', 'node', 'parent', 'context', 'counted', 'decisions', 'closures', 'methods', 'tracking', 'max_line')
+
+    def __init__(self, kind, node=None, parent=None, context=None, counted=False):
+        self.kind = kind
+        self.node = node
+        self.parent = parent
+        self.context = context
+        self.counted = counted
+        self.decisions = 0
+        self.closures = []
+        self.methods = []
+        self.tracking = False
+        self.max_line = float('-inf')
+
+
+class _Marker:
+    __slots__ = ()
+
+
+# Stack markers: stop and resume counting complexity, start tracking the end line
+_CC_OFF = _Marker()
+_CC_ON = _Marker()
+_TRACK = _Marker()
+
+
+def _branches(node):
+    """Return the decision points a node adds, following radon's ComplexityVisitor."""
+    node_type = type(node)
+    if node_type is ast.BoolOp:
+        return len(node.values) - 1
+    if node_type is ast.If or node_type is ast.IfExp:
+        return 1
+    if node_type is ast.comprehension:
+        return len(node.ifs) + 1
+    if node_type is ast.Try:
+        return len(node.handlers) + bool(node.orelse)
+    if node_type is ast.Match:
+        # A `case _:` is the else branch
+        wildcard = any(getattr(case.pattern, "pattern", False) is None for case in node.cases)
+        return max(0, len(node.cases) - wildcard)
+    # For, AsyncFor and While
+    return bool(node.orelse) + 1
+
+
+def _operand(node):
+    node_type = type(node)
+    if node_type is ast.Name:
+        return node.id
+    if node_type is ast.Attribute:
+        return node.attr
+    if node_type is ast.Constant:
+        return node.value
+    # Any other expression is an operand of its own
+    return node
+
+
+class MetricsVisitor:
+    """Compute cyclomatic complexity and Halstead counts of a module in one walk.
+
+    The results follow radon: the function blocks of cc_visit_ast (module
+    level functions, then every class followed by its methods), the
+    total_complexity of ComplexityVisitor and the operators and operands of
+    HalsteadVisitor. radon walks the tree once per metric and once more per
+    function body; here a single iterative walk keeps a stack of the
+    enclosing definitions instead.
+    """
+
+    def __init__(self):
+        self.module = _Frame('module', counted=True)
+        self.functions = []
+        self.classes = []
+        self.operators = 0
+        self.operands = 0
+        self.operators_seen = set()
+        self.operands_seen = set()
+
+    def visit(self, tree):
+        frame = self.module
+        cc = True
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            node_type = type(node)
+            if node_type is _Frame:
+                self._leave(node)
+                frame = node.parent
+                continue
+            if node_type is _Marker:
+                if node is _TRACK:
+                    frame.tracking = True
+                else:
+                    cc = node is _CC_ON
+                continue
+            if node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
+                frame = self._enter_function(node, frame, pending)
+                continue
+            if node_type is ast.ClassDef:
+                frame = self._enter_class(node, frame, pending)
+                continue
+
+            if cc:
+                if node_type is ast.Assert:
+                    # Counted, but radon looks neither at asserts nor inside them
+                    frame.decisions += 1
+                    pending.append(_CC_ON)
+                    pending.extend(reversed(self._children(node, False, frame)))
+                    pending.append(_CC_OFF)
+                    continue
+                if frame.tracking and hasattr(node, 'lineno') and node.lineno > frame.max_line:
+                    frame.max_line = node.lineno
+                if node_type in BRANCH_TYPES:
+                    frame.decisions += _branches(node)
+            if node_type in HALSTEAD_TYPES:
+                self._halstead(node, node_type, frame.context)
+            pending.extend(reversed(self._children(node, cc, frame)))
+
+    @staticmethod
+    def _children(node, cc, frame):
+        """Return the children of a node, handling leaves on the spot."""
+        children = []
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if type(value) is list:
+                items = value
+            elif isinstance(value, ast.AST):
+                items = (value,)
+            else:
+                continue
+            for item in items:
+                if type(item) not in LEAF_TYPES:
+                    if isinstance(item, ast.AST):
+                        children.append(item)
+                elif cc and frame.tracking and getattr(item, 'lineno', -1) > frame.max_line:
+                    frame.max_line = item.lineno
+        return children
+
+    def _halstead(self, node, node_type, context):
+        if node_type is ast.BinOp:
+            operators, operands = (node.op,), (node.left, node.right)
+        elif node_type is ast.UnaryOp:
+            operators, operands = (node.op,), (node.operand,)
+        elif node_type is ast.BoolOp:
+            operators, operands = (node.op,), node.values
+        elif node_type is ast.AugAssign:
+            operators, operands = (node.op,), (node.target, node.value)
+        else:
+            operators, operands = node.ops, [*node.comparators, node.left]
+        self.operators += len(operators)
+        self.operands += len(operands)
+        self.operators_seen.update(type(operator).__name__ for operator in operators)
+        self.operands_seen.update((context, _operand(operand)) for operand in operands)
+
+    def _enter_function(self, node, frame, pending):
+        # Decorators, defaults and annotations count for neither metric
+        counted = frame.kind == 'module' or (frame.kind == 'class' and frame.counted)
+        function = _Frame('function', node, frame, node.name, counted)
+        pending.append(function)
+        if node.body:
+            pending.append(node.body[-1])
+            pending.append(_TRACK)
+            pending.extend(reversed(node.body[:-1]))
+        return function
+
+    def _enter_class(self, node, frame, pending):
+        cls = _Frame('class', node, frame, frame.context, frame.kind == 'module')
+        pending.append(cls)
+        pending.extend(reversed(node.body))
+        # Bases and decorators have Halstead operators but no complexity
+        pending.append(_CC_ON)
+        pending.extend(reversed([*node.decorator_list, *node.bases, *node.keywords, *getattr(node, 'type_params', ())]))
+        pending.append(_CC_OFF)
+        return cls
+
+    def _leave(self, frame):
+        node = frame.node
+        parent = frame.parent
+        if frame.kind == 'class':
+            if frame.counted:
+                self.classes.append(frame)
+            return
+        if parent.kind == 'function':
+            parent.closures.append(node.name)
+        if not frame.counted:
+            return
+        is_method = parent.kind == 'class'
+        block = (node.name, node.lineno, node.col_offset, max(node.lineno, frame.max_line), is_method,
+                 parent.node.name if is_method else None, tuple(frame.closures), frame.decisions + 1)
+        if is_method:
+            parent.methods.append(block)
+        else:
+            self.functions.append(block)
+
+    @property
+    def blocks(self):
+        """The function and method blocks, in radon's order."""
+        blocks = list(self.functions)
+        for cls in self.classes:
+            blocks.extend(cls.methods)
+        return blocks
+
+    @property
+    def total_complexity(self):
+        """Complexity of the whole module, as ComplexityVisitor.total_complexity."""
+        total = 1 + self.module.decisions
+        total += sum(block[-1] - 1 for block in self.functions)
+        for cls in self.classes:
+            total += cls.decisions + sum(block[-1] for block in cls.methods)
+        return total
+
+    @property
+    def halstead_volume(self):
+        vocabulary = len(self.operators_seen) + len(self.operands_seen)
+        length = self.operators + self.operands
+        return length * math.log(vocabulary, 2) if vocabulary else 0
+
+
+def raw_metrics(code):
+    """Return (lloc, sloc, comments, multi) of some code in one tokenize pass.
+
+    Counts the same way as radon.raw.analyze, which tokenizes every line again
+    until the statement it starts is complete: a statement spanning many
+    lines is tokenized many times over.
+
+    Logical lines follow radon.raw._logical: a statement is split on `;` and
+    a part with a `:` that is not its last token (`if x: return`) counts
+    twice.
+    """
+    # nonblank[n] is the number of non blank lines among the first n
+    nonblank = [0]
+    for line in code.split('\n'):
+        nonblank.append(nonblank[-1] + (1 if line.strip() else 0))
+
+    lloc = sloc = comments = multi = 0
+    depth = 0
+    start = None
+    # Tokens of the current statement, the first of them, and the length and
+    # last colon of the current `;` separated part
+    count = 0
+    first = None
+    length = 0
+    colon = -1
+    readline = io.StringIO(code).readline
+    for token_type, string, (row, _), (end, _), _ in tokenize.generate_tokens(readline):
+        if token_type == OP:
+            if string in OPENING:
+                depth += 1
+            elif string in CLOSING:
+                depth -= 1
+            elif string == ':':
+                colon = length
+            elif string == ';':
+                if colon >= 0:
+                    lloc += 2 - (colon == length - 2)
+                elif length:
+                    lloc += 1
+                length = 0
+                colon = -1
+                count += 1
+                continue
+        elif token_type in IGNORED_TOKENS:
+            if token_type == ENDMARKER:
+                break
+            continue
+        elif token_type == COMMENT:
+            comments += 1
+            if start is None:
+                start = row
+            count += 1
+            first = first or (token_type, row, end)
+            continue
+        elif token_type == NEWLINE or token_type == NL:
+            if start is None:
+                start = row
+            if token_type == NL and depth > 0:
+                continue
+
+            # The end of a statement, or of a blank or comment line
+            if count == 1 and first[0] == STRING:
+                # A docstring
+                if first[1] != first[2]:
+                    multi += nonblank[end] - nonblank[start - 1]
+            elif not (count == 1 and first[0] == COMMENT):
+                sloc += nonblank[end] - nonblank[start - 1]
+            # radon sees the end marker after the last part
+            if colon >= 0:
+                lloc += 2 - (colon == length - 1)
+            elif length:
+                lloc += 1
+            depth = 0
+            start = None
+            count = 0
+            first = None
+            length = 0
+            colon = -1
+            continue
+
+        if start is None:
+            start = row
+        if first is None:
+            first = (token_type, row, end)
+        count += 1
+        length += 1
+    return lloc, sloc, comments, multi
+
+
+def tree_metrics(tree):
+    """Return the function blocks, total complexity and Halstead volume of a module tree."""
+    visitor = MetricsVisitor()
+    visitor.visit(tree)
+    return {
+        'functions': visitor.blocks,
+        'complexity': visitor.total_complexity,
+        'halstead_volume': visitor.halstead_volume,
+    }
+
+
+def segment_tree_metrics(segment):
+    """Return the tree metrics of a segment, in parts that add up across segments.
+
+    Returns (functions, methods, complexity, operators, operands,
+    operator names, operand names, unique operands). Line numbers are relative
+    to the segment. Operands that are expressions of their own are always
+    distinct, only their number is kept.
+    """
+    visitor = MetricsVisitor()
+    visitor.visit(segment.module)
+    methods = [block for cls in visitor.classes for block in cls.methods]
+    names = set()
+    unique = 0
+    for operand in visitor.operands_seen:
+        if isinstance(operand[1], ast.AST):
+            unique += 1
+        else:
+            names.add(operand)
+    return (_shift_blocks(visitor.functions, -segment.offset), _shift_blocks(methods, -segment.offset),
+            visitor.total_complexity - 1, visitor.operators, visitor.operands, visitor.operators_seen, names, unique)
+
+
+def _shift_blocks(blocks, lines):
+    return [(name, lineno + lines, col_offset, endline + lines, *rest) for name, lineno, col_offset, endline, *rest in blocks]
+
+
+def combine_tree_metrics(parts):
+    """Merge the (segment, segment_tree_metrics) pairs of a module into its tree metrics."""
+    functions = []
+    methods = []
+    complexity = 1
+    operators = operands = unique = 0
+    operators_seen = set()
+    operands_seen = set()
+    for segment, (part_functions, part_methods, part_complexity, part_operators, part_operands, part_operators_seen, names, part_unique) in parts:
+        functions.extend(_shift_blocks(part_functions, segment.offset))
+        methods.extend(_shift_blocks(part_methods, segment.offset))
+        complexity += part_complexity
+        operators += part_operators
+        operands += part_operands
+        unique += part_unique
+        operators_seen.update(part_operators_seen)
+        operands_seen.update(names)
+    vocabulary = len(operators_seen) + len(operands_seen) + unique
+    length = operators + operands
+    return {
+        'functions': functions + methods,
+        'complexity': complexity,
+        'halstead_volume': length * math.log(vocabulary, 2) if vocabulary else 0,
+    }
+
+
+def compute_metrics(source):
+    """Return every metric of a loaded source file as plain, picklable data."""
+    lloc, sloc, comments, multi = raw_metrics(source.code)
+    return {**tree_metrics(source.tree), 'lloc': lloc, 'sloc': sloc, 'comments': comments, 'multi': multi}
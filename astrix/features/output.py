@@ -0,0 +1,72 @@
+import csv
+import json
+import click
+from astrix.features.profiling import phase
+
+
+OUTPUT_FORMATS = ("table", "ndjson", "csv")
+
+
+def flat_value(value):
+    """Return a value as a scalar for NDJSON and CSV rows.
+
+    Lists (the closures of a function) are joined with ';', using the name of
+    their items when they have one.
+    """
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(getattr(item, 'name', item)) for item in value)
+    return value
+
+
+class _EchoStream:
+    """File-like object writing through click.echo, so output goes wherever click sends it."""
+
+    def write(self, text):
+        click.echo(text, nl=False)
+
+
+class RowWriter:
+    """Write result rows as a table, NDJSON or CSV.
+
+    NDJSON and CSV rows are written as soon as they are passed to write, so
+    memory stays constant however many rows a run produces. A table needs
+    every row to size its columns: rows are kept and printed on close.
+
+    fields name the columns of the flat NDJSON/CSV schema, headers the
+    columns of the table. With to_row, write takes any object (a compact
+    record) and to_row turns it into the row, so that a table keeps the
+    objects rather than the expanded rows until it is printed.
+    """
+
+    def __init__(self, fmt, fields, headers=None, to_row=None, **table_options):
+        self.fmt = fmt
+        self.fields = fields
+        self.headers = headers or fields
+        self.to_row = to_row
+        self.table_options = table_options
+        self.count = 0
+        self.rows = []
+        if fmt == "csv":
+            self.csv = csv.writer(_EchoStream(), lineterminator="\n")
+            self.csv.writerow(fields)
+
+    def write(self, row):
+        self.count += 1
+        if self.fmt == "table":
+            self.rows.append(row)
+            return
+        if self.to_row is not None:
+            row = self.to_row(row)
+        with phase("output"):
+            if self.fmt == "ndjson":
+                click.echo(json.dumps(dict(zip(self.fields, map(flat_value, row))), default=str))
+            else:
+                self.csv.writerow(map(flat_value, row))
+
+    def close(self):
+        if self.fmt == "table":
+            from tabulate import tabulate
+            with phase("output"):
+                rows = self.rows if self.to_row is None else map(self.to_row, self.rows)
+                click.echo(tabulate(rows, headers=self.headers, **self.table_options))
+            self.rows = []
@@ -0,0 +1,416 @@
+import ast
+import click
+from functools import partial
+from astrix.features.cache import cached_result
+from astrix.features.source import load_source
+from astrix.features.symbols import child_nodes, dotted_parts
+
+
+SEVERITIES = ("low", "medium", "high")
+
+# Severity of every anti-pattern reported, PERF105 on a receiver that is not
+# known to be a list is reported as UNKNOWN_LIST_SEVERITY
+RULES = {
+    'PERF101': 'medium',  # String built with += in a loop
+    'PERF102': 'high',    # Membership test against a list in a loop
+    'PERF103': 'low',     # Loop invariant global or attribute lookup in an innermost loop
+    'PERF104': 'medium',  # re.compile in a loop
+    'PERF105': 'high',    # list.insert(0, ...) or list.pop(0) in a loop
+}
+UNKNOWN_LIST_SEVERITY = 'low'
+
+FINDING_HEADERS = ["File", "Line", "Column", "Code", "Severity", "Message"]
+FINDING_FIELDS = ["file", "lineno", "col_offset", "code", "severity", "message"]
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def value_kind(node):
+    """Return 'str', 'list', 'dict', 'deque' or 'other': what an expression evaluates to, as far as its syntax tells."""
+    node_type = type(node)
+    if node_type is ast.Constant:
+        return 'str' if isinstance(node.value, str) else 'other'
+    if node_type is ast.JoinedStr:
+        return 'str'
+    if node_type is ast.List or node_type is ast.ListComp:
+        return 'list'
+    if node_type is ast.BinOp and type(node.op) in (ast.Add, ast.Mult, ast.Mod):
+        return value_kind(node.left)
+    if node_type is ast.Call:
+        parts = dotted_parts(node.func)
+        if parts == ('str',) or (type(node.func) is ast.Attribute and node.func.attr in ('join', 'format')
+                                 and value_kind(node.func.value) == 'str'):
+            return 'str'
+        if parts in (('list',), ('sorted',)):
+            return 'list'
+        if parts == ('dict',):
+            return 'dict'
+        if parts and parts[-1] == 'deque':
+            return 'deque'
+    if node_type is ast.Dict or node_type is ast.DictComp:
+        return 'dict'
+    return 'other'
+
+
+def _stored_parts(target):
+    """Return the dotted names an assignment target rebinds (``a``, ``self.a``, both names of ``a, b``)."""
+    pending = [target]
+    stored = []
+    while pending:
+        node = pending.pop()
+        if type(node) in (ast.Tuple, ast.List):
+            pending.extend(node.elts)
+        elif type(node) is ast.Starred:
+            pending.append(node.value)
+        else:
+            parts = dotted_parts(node)
+            if parts is not None:
+                stored.append(parts)
+    return stored
+
+
+class _Scope:
+    """A module, class, function or comprehension: what its names are bound to and the loops being walked."""
+
+    __slots__ = ('kinds', 'loops')
+
+    def __init__(self, names=()):
+        self.kinds = dict.fromkeys(names, 'other')
+        self.loops = []
+
+
+class _Loop:
+    """A loop being walked: the names it rebinds and the lookups and compilations to check when it is left."""
+
+    __slots__ = ('stores', 'lookups', 'compiles', 'nested')
+
+    def __init__(self, targets=()):
+        self.stores = {parts for target in targets for parts in _stored_parts(target)}
+        self.lookups = {}
+        self.compiles = []
+        self.nested = False
+
+
+class _Marker:
+    """Stack entry telling the walker to enter or leave a scope or a loop."""
+
+    __slots__ = ('frame', 'enter')
+
+    def __init__(self, frame, enter):
+        self.frame = frame
+        self.enter = enter
+
+
+def _parameters(args):
+    names = [arg.arg for arg in [*args.posonlyargs, *args.args, *args.kwonlyargs]]
+    names.extend(arg.arg for arg in (args.vararg, args.kwarg) if arg is not None)
+    return names
+
+
+class PerfLintVisitor:
+    """Find performance anti-patterns in a module in one walk.
+
+    The tree is walked iteratively, keeping a stack of the enclosing scopes
+    and of the loops of the innermost scope. What a name was last bound to
+    (a string, a list, an import...) is tracked per scope from its
+    assignments. Whether a lookup or a re.compile call is loop invariant
+    depends on the whole loop body, so they are collected with the names the
+    loop rebinds and decided when the loop is left.
+    """
+
+    def __init__(self):
+        self.findings = []
+        self.scopes = [_Scope()]
+
+    def _report(self, node, code, message, severity=None):
+        self.findings.append((node.lineno, node.col_offset, code, severity or RULES[code], message))
+
+    def _name_kind(self, name):
+        for scope in reversed(self.scopes):
+            kind = scope.kinds.get(name)
+            if kind is not None:
+                return kind
+        return 'other'
+
+    def _kind(self, node):
+        if type(node) is ast.Name:
+            return self._name_kind(node.id)
+        return value_kind(node)
+
+    def _bind(self, parts, kind='other'):
+        scope = self.scopes[-1]
+        if scope.loops:
+            scope.loops[-1].stores.add(parts)
+        if len(parts) == 1:
+            scope.kinds[parts[0]] = kind
+
+    def _store(self, targets, kind='other'):
+        for target in targets:
+            for parts in _stored_parts(target):
+                self._bind(parts, kind)
+
+    def visit(self, tree):
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            node_type = type(node)
+            if node_type is _Marker:
+                self._marker(node)
+                continue
+
+            loops = self.scopes[-1].loops
+            loop = loops[-1] if loops else None
+            if node_type in _DEFINITIONS:
+                self._definition(node, pending)
+                continue
+            if node_type is ast.For or node_type is ast.AsyncFor:
+                self._store([node.target])
+                frame = _Loop([node.target])
+                pending.extend(reversed(node.orelse))
+                pending.append(_Marker(frame, False))
+                pending.extend(reversed(node.body))
+                pending.append(_Marker(frame, True))
+                pending.append(node.iter)
+                continue
+            if node_type is ast.While:
+                frame = _Loop()
+                pending.extend(reversed(node.orelse))
+                pending.append(_Marker(frame, False))
+                pending.extend(reversed(node.body))
+                pending.append(node.test)
+                pending.append(_Marker(frame, True))
+                continue
+            if node_type in _COMPREHENSIONS:
+                self._comprehension(node, pending)
+                continue
+
+            if node_type is ast.Assign:
+                self._assign(node, loop)
+            elif node_type is ast.AugAssign:
+                self._aug_assign(node, loop)
+            elif node_type is ast.AnnAssign or node_type is ast.NamedExpr:
+                self._store([node.target], 'other' if node.value is None else value_kind(node.value))
+            elif node_type is ast.With or node_type is ast.AsyncWith:
+                self._store([item.optional_vars for item in node.items if item.optional_vars is not None])
+            elif node_type is ast.Import or node_type is ast.ImportFrom:
+                self._import(node)
+            elif node_type is ast.Delete:
+                self._store(node.targets)
+            elif loop is not None:
+                if node_type is ast.Compare:
+                    self._membership(node)
+                elif node_type is ast.Call:
+                    self._call(node, loop)
+                elif node_type is ast.Attribute and self._lookup(node, loop):
+                    continue
+                elif node_type is ast.Raise:
+                    # Runs at most once per loop
+                    continue
+            # Reversed so that nodes are popped in source order
+            pending.extend(reversed(child_nodes(node)))
+        self.findings.sort()
+
+    def _marker(self, marker):
+        frame = marker.frame
+        if type(frame) is _Scope:
+            if marker.enter:
+                self.scopes.append(frame)
+            else:
+                self.scopes.pop()
+            return
+        loops = self.scopes[-1].loops
+        if marker.enter:
+            if loops:
+                loops[-1].nested = True
+            loops.append(frame)
+            return
+        loops.pop()
+        self._leave_loop(frame)
+        if loops:
+            # What an inner loop rebinds changes on every iteration of the outer ones too
+            loops[-1].stores |= frame.stores
+
+    def _definition(self, node, pending):
+        if type(node) is ast.Lambda:
+            scope = _Scope(_parameters(node.args))
+            body = [node.body]
+            outer = [node.args]
+        elif type(node) is ast.ClassDef:
+            self._bind((node.name,))
+            scope = _Scope()
+            body = node.body
+            outer = [*node.decorator_list, *node.bases, *node.keywords]
+        else:
+            self._bind((node.name,))
+            scope = _Scope(_parameters(node.args))
+            body = node.body
+            outer = [*node.decorator_list, node.args]
+        # Decorators and defaults are evaluated in the enclosing scope, the body runs later
+        pending.append(_Marker(scope, False))
+        pending.extend(reversed(body))
+        pending.append(_Marker(scope, True))
+        pending.extend(reversed(outer))
+
+    def _comprehension(self, node, pending):
+        generators = node.generators
+        targets = [generator.target for generator in generators]
+        scope = _Scope(parts[0] for target in targets for parts in _stored_parts(target))
+        frame = _Loop(targets)
+        pending.append(_Marker(scope, False))
+        pending.append(_Marker(frame, False))
+        if type(node) is ast.DictComp:
+            pending.extend((node.value, node.key))
+        else:
+            pending.append(node.elt)
+        for position in range(len(generators) - 1, -1, -1):
+            pending.extend(reversed(generators[position].ifs))
+            if position:
+                pending.append(generators[position].iter)
+        pending.append(_Marker(frame, True))
+        pending.append(_Marker(scope, True))
+        # The first iterable is evaluated once, in the enclosing scope
+        pending.append(generators[0].iter)
+
+    def _assign(self, node, loop):
+        kind = value_kind(node.value)
+        value = node.value
+        if (loop is not None and type(value) is ast.BinOp and type(value.op) is ast.Add and type(value.left) is ast.Name
+                and any(type(target) is ast.Name and target.id == value.left.id for target in node.targets)
+                and (self._kind(value.left) == 'str' or value_kind(value.right) == 'str')):
+            self._report(node, 'PERF101', f"String `{value.left.id}` built by concatenation in a loop, which copies it every time: "
+                                          "append the parts to a list and ''.join() them")
+            kind = 'str'
+        self._store(node.targets, kind)
+
+    def _aug_assign(self, node, loop):
+        target = node.target
+        if type(target) is not ast.Name:
+            self._store([target])
+            return
+        kind = self._kind(target)
+        if loop is not None and type(node.op) is ast.Add and (kind == 'str' or value_kind(node.value) == 'str'):
+            self._report(node, 'PERF101', f"String `{target.id}` built with += in a loop, which copies it every time: "
+                                          "append the parts to a list and ''.join() them")
+            kind = 'str'
+        self._bind((target.id,), kind)
+
+    def _import(self, node):
+        for alias in node.names:
+            if alias.name == '*':
+                continue
+            kind = 'import'
+            if type(node) is ast.Import and alias.name == 're':
+                kind = 're'
+            elif type(node) is ast.ImportFrom and node.module == 're' and alias.name == 'compile':
+                kind = 're.compile'
+            self._bind((alias.asname or alias.name.split('.')[0],), kind)
+
+    def _membership(self, node):
+        for op, comparator in zip(node.ops, node.comparators):
+            # A list display is small and fixed, only lists built at run time are reported
+            if type(op) not in (ast.In, ast.NotIn) or type(comparator) is ast.List:
+                continue
+            if self._kind(comparator) == 'list':
+                name = f"`{comparator.id}`" if type(comparator) is ast.Name else "built by this expression"
+                self._report(node, 'PERF102', f"Membership test against the list {name} in a loop scans it every time: "
+                                              "build a set once before the loop")
+
+    def _call(self, node, loop):
+        parts = dotted_parts(node.func)
+        if parts is not None and self._is_re_compile(parts):
+            names = {child.id for argument in [*node.args, *node.keywords] for child in ast.walk(argument) if type(child) is ast.Name}
+            loop.compiles.append((node, names))
+
+        func = node.func
+        if type(func) is not ast.Attribute or node.keywords or not node.args:
+            return
+        first = node.args[0]
+        if type(first) is not ast.Constant or type(first.value) is not int or first.value != 0:
+            return
+        if not ((func.attr == 'pop' and len(node.args) == 1) or (func.attr == 'insert' and len(node.args) == 2)):
+            return
+        kind = self._kind(func.value)
+        if kind not in ('list', 'other'):
+            return
+        call = "insert(0, ...)" if func.attr == 'insert' else "pop(0)"
+        if kind == 'list':
+            self._report(node, 'PERF105', f"list.{call} in a loop shifts every item, quadratic overall: "
+                                          "use a collections.deque or reverse the order of the list")
+        else:
+            # Any object can have such methods, only lists are known to be slow
+            self._report(node, 'PERF105', f"{call} in a loop shifts every item if the receiver is a list, quadratic "
+                                          "overall: use a collections.deque or reverse the order of the list",
+                         UNKNOWN_LIST_SEVERITY)
+
+    def _is_re_compile(self, parts):
+        if len(parts) == 2 and parts[1] == 'compile':
+            return self._name_kind(parts[0]) == 're'
+        return len(parts) == 1 and self._name_kind(parts[0]) == 're.compile'
+
+    def _lookup(self, node, loop):
+        """Record a dotted name read in a loop; return True as its inner attributes need no visit."""
+        if type(node.ctx) is not ast.Load:
+            return False
+        parts = dotted_parts(node)
+        if parts is None:
+            return False
+        # a.b.c costs two lookups per iteration, module.attribute a global and an attribute lookup
+        if len(parts) >= 3 or (len(parts) == 2 and self._name_kind(parts[0]) in ('import', 're')):
+            loop.lookups.setdefault(parts, node)
+        return True
+
+    def _leave_loop(self, loop):
+        roots = {parts[0] for parts in loop.stores}
+        for node, names in loop.compiles:
+            if not names & roots:
+                self._report(node, 'PERF104', "re.compile() of a loop invariant pattern in a loop: compile it once, "
+                                              "before the loop or at module level")
+        if loop.nested:
+            # Lookups are only worth hoisting out of the innermost, hottest loops
+            return
+        # Hoisting re.compile itself is PERF104's advice, whatever the pattern
+        compiles = {dotted_parts(node.func) for node, _ in loop.compiles}
+        for parts, node in loop.lookups.items():
+            if parts not in compiles and not any(parts[:length] in loop.stores for length in range(1, len(parts) + 1)):
+                self._report(node, 'PERF103', f"`{'.'.join(parts)}` is looked up on every iteration of the loop: "
+                                              "bind it to a local name before the loop")
+
+
+def lint_source(source):
+    """Return the (lineno, col_offset, code, severity, message) findings of a loaded source file."""
+    visitor = PerfLintVisitor()
+    visitor.visit(source.tree)
+    return visitor.findings
+
+
+def file_findings(path, cache=None):
+    """Return the findings of a file, cached, or None if it cannot be analyzed.
+
+    Used as a process pool worker.
+    """
+    try:
+        source = load_source(path)
+        return cached_result(cache, "perf_lint", source, (), lambda: lint_source(source))
+    except click.Abort:
+        return None
+
+
+def generate_perf_lint(path, files, jobs=None, cache=None, fmt="table", min_severity="low"):
+    """Print the findings of the given files of path at or above a severity; return how many were printed."""
+    from astrix.features.output import RowWriter
+    from astrix.features.project import display_path, map_files
+
+    threshold = SEVERITIES.index(min_severity)
+    writer = RowWriter(fmt, FINDING_FIELDS, FINDING_HEADERS)
+    for file, findings in zip(files, map_files(partial(file_findings, cache=cache), files, jobs)):
+        for finding in findings or []:
+            if SEVERITIES.index(finding[3]) >= threshold:
+                writer.write([display_path(file, path), *finding])
+    if fmt == "table" and not writer.count:
+        click.echo("No performance issues found.")
+        return 0
+    writer.close()
+    if fmt == "table":
+        click.echo(f"\n{writer.count} findings.")
+    return writer.count
@@ -0,0 +1,157 @@
+import threading
+import time
+
+
+# The profiler of the current run, None unless --profile is given
+_profiler = None
+
+
+class _NullPhase:
+    """Context manager doing nothing, returned by phase() when profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+
+    __slots__ = ('profiler', 'name', 'file', 'start', 'children')
+
+    def __init__(self, profiler, name, file):
+        self.profiler = profiler
+        self.name = name
+        self.file = file
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.children = 0.0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.profiler.record(self.name, elapsed - self.children, self.file)
+        return False
+
+
+def phase(name, file=None):
+    """Time a phase of the run (`with phase("parse", path): ...`).
+
+    Phases nest: the time of a phase excludes the phases run inside it, so
+    parsing triggered by an analyzer counts as parse, not as the analyzer.
+    When profiling is off this returns a shared no-op context manager, cheap
+    enough for the hooks to stay in place.
+    """
+    if _profiler is None:
+        return _NULL_PHASE
+    return _Phase(_profiler, name, file)
+
+
+class Profiler:
+    """Wall time spent per phase and per file."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # name -> [calls, seconds]
+        self.phases = {}
+        # file -> seconds
+        self.files = {}
+        self.workers = 0
+        # Seconds recorded by worker processes, they overlap the wall time
+        self.merged = 0.0
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name, seconds, file=None, calls=1):
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = [0, 0.0]
+        entry[0] += calls
+        entry[1] += seconds
+        if file is not None:
+            self.files[file] = self.files.get(file, 0.0) + seconds
+
+    def data(self):
+        """Return the recorded timings as plain data, sent back by worker processes."""
+        return self.phases, self.files
+
+    def merge(self, data):
+        """Add the timings recorded by a worker process."""
+        phases, files = data
+        for name, (calls, seconds) in phases.items():
+            self.record(name, seconds, calls=calls)
+            self.merged += seconds
+        for file, seconds in files.items():
+            self.files[file] = self.files.get(file, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def enable():
+    """Start profiling the run, returning the Profiler."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def active():
+    """Return the profiler of the run, or None."""
+    return _profiler
+
+
+def profiled_call(func, *args):
+    """Call func in a worker process, returning (result, timings) for Profiler.merge."""
+    global _profiler
+    previous = _profiler
+    # A forked worker inherits a copy of the parent profiler, record afresh
+    _profiler = Profiler()
+    try:
+        return func(*args), _profiler.data()
+    finally:
+        _profiler = previous
+
+
+def print_summary(profiler, top=10):
+    """Print the time per phase and the slowest files on stderr."""
+    import click
+    from tabulate import tabulate
+
+    wall = profiler.elapsed()
+    rows = []
+    for name, (calls, seconds) in sorted(profiler.phases.items(), key=lambda item: -item[1][1]):
+        rows.append([name, calls, f"{seconds:.3f}", f"{seconds / wall * 100:.1f}" if wall else ""])
+    # Time of the main process outside any phase: startup, imports, waiting for workers...
+    other = max(0.0, wall - sum(seconds for _, seconds in profiler.phases.values()) + profiler.merged)
+    rows.append(["other", "", f"{other:.3f}", f"{other / wall * 100:.1f}" if wall else ""])
+    click.echo(err=True)
+    click.echo(f"Profile: {wall:.3f}s wall time", err=True)
+    if profiler.workers:
+        click.echo(f"Phases of {profiler.workers} worker processes are summed, they can add up to more than the wall time.", err=True)
+    click.echo(tabulate(rows, headers=["Phase", "Calls", "Seconds", "% of wall"], disable_numparse=True), err=True)
+    if profiler.files:
+        slowest = sorted(profiler.files.items(), key=lambda item: -item[1])[:top]
+        click.echo(err=True)
+        click.echo(tabulate([[file, f"{seconds:.3f}"] for file, seconds in slowest], headers=["Slowest files", "Seconds"], disable_numparse=True), err=True)
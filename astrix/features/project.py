@@ -0,0 +1,85 @@
+import os
+import multiprocessing
+from functools import partial
+from astrix.features import profiling
+
+
+# Directories that never contain project sources worth analyzing.
+EXCLUDED_DIRS = {"__pycache__", "venv", "node_modules", "site-packages"}
+
+
+def _is_excluded(root, name):
+    if name.startswith('.') or name in EXCLUDED_DIRS:
+        return True
+    # Skip virtual environments regardless of their name
+    return os.path.isfile(os.path.join(root, name, "pyvenv.cfg"))
+
+
+def find_python_files(path):
+    """Return the sorted list of Python files found at the given path.
+
+    A file path is returned as is, a directory is walked recursively skipping
+    hidden directories, caches and virtual environments.
+    """
+    path = str(path)
+    if os.path.isfile(path):
+        return [path]
+
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not _is_excluded(root, d))
+        for name in sorted(names):
+            if name.endswith('.py'):
+                files.append(os.path.join(root, name))
+    return files
+
+
+def find_directories(path):
+    """Return the sorted list of directories below path (itself included) that find_python_files walks."""
+    path = str(path)
+    directories = []
+    for root, dirs, _ in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not _is_excluded(root, d))
+        directories.append(root)
+    return directories
+
+
+def default_jobs():
+    """Return the default number of worker processes."""
+    return os.cpu_count() or 1
+
+
+def map_files(func, paths, jobs=None):
+    """Apply func to every path and yield the results in order.
+
+    With more than one job the work is spread across a process pool, so func
+    must be a picklable module level function (or a functools.partial of one).
+    Files are handed out in chunks to keep the inter-process overhead low.
+    """
+    paths = list(paths)
+    jobs = min(jobs or default_jobs(), len(paths))
+
+    if jobs <= 1:
+        for path in paths:
+            yield func(path)
+        return
+
+    chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+    profiler = profiling.active()
+    with multiprocessing.Pool(jobs) as pool:
+        if profiler is None:
+            yield from pool.imap(func, paths, chunksize)
+            return
+        # Workers time their phases on their own and send the timings back
+        profiler.workers = max(profiler.workers, jobs)
+        for result, timings in pool.imap(partial(profiling.profiled_call, func), paths, chunksize):
+            profiler.merge(timings)
+            yield result
+
+
+def display_path(path, root):
+    """Return path relative to root for display, when root is a directory."""
+    root = str(root)
+    if os.path.isdir(root):
+        return os.path.relpath(path, root)
+    return str(path)
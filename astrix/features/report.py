@@ -0,0 +1,193 @@
+import os
+import time
+import click
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from astrix.features.code_quality import (code_quality_rows, maintainability_row, function_rows, FunctionRecord, FileTable,
+                                          FUNCTION_HEADERS, MAINTAINABILITY_HEADERS)
+from astrix.features.profiling import phase
+from astrix.features.project import display_path, find_python_files, map_files
+from astrix.features.symbols import ProjectSymbols, module_symbols
+
+
+def analyze_file(path, multi=False, cache=None, root=None):
+    """Return the function rows, maintainability row and symbols of a file.
+
+    Each entry is None when the file cannot be analyzed. The file is read and
+    parsed once, every analyzer runs on the same tree; root is the analyzed
+    directory module names are built from. Used as a process pool worker.
+    """
+    functions = code_quality_rows(path, cache)
+    if functions is None:
+        # Unreadable or invalid, the other analyzers would fail (and report it) again
+        return None, None, None
+    return functions, maintainability_row(path, multi, cache), module_symbols(path, cache, root)
+
+
+class ProjectReport:
+    """Results of every analyzer for a file or a project directory.
+
+    The per-file stage (read, parse, metrics, symbols) runs once per file in
+    worker processes and its results are handed to add() as they arrive. The
+    project stage builds the call graph, the class index and the dependency
+    list from the collected symbols, without touching the files again.
+
+    When loaded with since (a git ref), the per-file stage only runs on the
+    files changed since then. Their direct dependents join modules so that the
+    calls and subclasses reaching the changed files are reported, and the
+    project modules all of them import are kept in context, indexed for name
+    resolution only.
+    """
+
+    def __init__(self, path, multi=False, cache=None):
+        self.path = str(path)
+        self.multi = multi
+        self.cache = cache
+        self.files = FileTable()
+        self.functions = []
+        self.maintainability = []
+        self.modules = []
+        self.context = []
+        # Files the per-file stage ran on
+        self.selected = []
+
+    def load(self, jobs=None, since=None):
+        """Run the per-file stage over every Python file (or the ones changed since a git ref), in parallel."""
+        if since is not None:
+            from astrix.features.changes import context_symbols, direct_dependents, git_changes
+
+            files, deleted = git_changes(self.path, since)
+        else:
+            files = find_python_files(self.path)
+        self.selected = files
+        worker = partial(analyze_file, multi=self.multi, cache=self.cache, root=self.path)
+        for file, result in zip(files, map_files(worker, files, jobs)):
+            self.add(file, *result)
+        if since is not None and (files or deleted):
+            self.modules.extend(direct_dependents(self.path, files, deleted, self.cache, jobs))
+            self.context = context_symbols(self.path, self.modules, self.cache, jobs)
+
+    def add(self, file, functions, row, symbols):
+        """Collect the per-file results of a file, None when it could not be analyzed."""
+        if symbols is None:
+            return
+        file_id = self.files.add(display_path(file, self.path))
+        self.functions.extend(FunctionRecord(*function, file_id=file_id) for function in functions or ())
+        if row is not None:
+            self.maintainability.append([self.files[file_id], *row])
+        self.modules.append(symbols)
+
+    def function_rows(self):
+        """Return the table rows of the functions, file first."""
+        return [[self.files[record.file_id], *row] for record, row in zip(self.functions, function_rows(self.functions))]
+
+    def project_symbols(self):
+        """Index the symbols of every file for the project stage."""
+        return ProjectSymbols([*self.context, *self.modules])
+
+    def class_index(self, project):
+        """Index the classes of modules, bases being resolved through project."""
+        from astrix.features.class_index import ClassIndex
+
+        if not self.context:
+            return ClassIndex.from_project(project)
+        return ClassIndex.from_project(project, {symbols['module'] for symbols in self.modules})
+
+    def imported_modules(self):
+        """Return the modules imported by the files, leaving out the modules of the project itself."""
+        project = {symbols['module'].split('.')[0] for symbols in [*self.context, *self.modules]}
+        names = {}
+        for symbols in self.modules:
+            for name in symbols['imported_modules']:
+                if name.split('.')[0] not in project:
+                    names[name] = None
+        return list(names)
+
+
+def dependency_table(names, cache_dir=None, offline=False):
+    """Describe imported modules, using the metadata store of cache_dir.
+
+    Runs on its own thread while the project stage runs: the store and its
+    SQLite connection are opened here.
+    """
+    from astrix.features.dependency import describe_modules
+    from astrix.features.distribution_index import load_distribution_index
+    from astrix.features.metadata_store import MetadataStore, STORE_FILENAME
+
+    store = MetadataStore(os.path.join(cache_dir, STORE_FILENAME)) if cache_dir else None
+    load_distribution_index(cache_dir)
+    try:
+        return describe_modules(names, store, offline)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def generate_report(path, jobs=None, cache=None, cache_dir=None, multi=False, graph_fmt="dot", offline=False, since=None):
+    """Run every analyzer on a file or project directory and print one report.
+
+    Prints the function, maintainability and dependency tables and saves the
+    call graph and class hierarchy next to path, e.g. `sample_callgraph.dot`.
+    With since (a git ref) the report covers the files changed since then.
+    """
+    from astrix.features.callgraph import draw_call_graph, project_call_graph
+    from astrix.features.class_heirarchy import class_index_graph, draw_class_hierarchy
+    from astrix.features.graph_export import export_graph, graph_output_path
+
+    start = time.perf_counter()
+    report = ProjectReport(path, multi, cache)
+    report.load(jobs, since)
+    if since is not None and not report.selected and not report.modules:
+        click.echo(f"No Python file changed since {since}.")
+        return report
+    if not report.modules:
+        click.secho(f"Error: No Python file could be analyzed in '{path}'.", fg='red')
+        raise click.Abort()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Package metadata is fetched while the graphs are built
+        dependencies = executor.submit(dependency_table, report.imported_modules(), cache_dir, offline)
+
+        project = report.project_symbols()
+        call_graph = project_call_graph(project, report.modules)
+        class_index = report.class_index(project)
+        class_graph = class_index_graph(class_index)
+        base = os.path.normpath(str(path))
+        call_graph_path = graph_output_path(base, "_callgraph", graph_fmt)
+        export_graph(call_graph, call_graph_path, graph_fmt, draw_call_graph, "Call Graph")
+        class_graph_path = None
+        if class_graph.number_of_nodes():
+            class_graph_path = graph_output_path(base, "_class_graph", graph_fmt)
+            export_graph(class_graph, class_graph_path, graph_fmt, draw_class_hierarchy, "Class Hierarchy")
+        dependencies = dependencies.result()
+
+    with phase("output"):
+        print_report(report, dependencies)
+    click.echo(f"Call graph saved as {call_graph_path} ({call_graph.number_of_nodes()} functions, {call_graph.number_of_edges()} calls)")
+    if class_graph_path:
+        click.echo(f"Class hierarchy saved as {class_graph_path} ({len(class_index.classes)} classes)")
+    else:
+        click.echo("No class definitions found.")
+    click.echo(f"Analyzed {len(report.modules)} files in {time.perf_counter() - start:.2f}s")
+    return report
+
+
+def print_report(report, dependencies):
+    """Print the function, maintainability and dependency tables of a report."""
+    from tabulate import tabulate
+
+    click.secho("Functions", bold=True)
+    if report.functions:
+        click.echo(tabulate(report.function_rows(), headers=["File", *FUNCTION_HEADERS], missingval="None"))
+    else:
+        click.echo("No functions found.")
+    click.echo()
+    click.secho("Maintainability", bold=True)
+    click.echo(tabulate(report.maintainability, headers=["File", *MAINTAINABILITY_HEADERS]))
+    click.echo()
+    click.secho("Dependencies", bold=True)
+    if dependencies:
+        click.echo(tabulate(dependencies, headers=["Module", "Description", "Documentation", "GitHub URL"], maxcolwidths=[10, 30, 40, 40], tablefmt="grid"))
+    else:
+        click.echo("No dependencies found.")
+    click.echo()
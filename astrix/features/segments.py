@@ -0,0 +1,155 @@
+import ast
+import copy
+import hashlib
+import os
+from astrix.features.cache import MISSING
+
+
+# Files shorter than this are cached as a whole: splitting them would only add
+# cache entries. Longer ones (generated or legacy modules) are cached per
+# function, method and class, so that an edit recomputes a single segment.
+SEGMENT_MIN_LINES = 1000
+
+FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+DEFINITION_TYPES = (*FUNCTION_TYPES, ast.ClassDef)
+
+
+class Segment:
+    """A run of statements of a module and the source lines holding them.
+
+    Every top-level function is a segment of its own, decorators included,
+    and so is every method of a top-level class: the class segment keeps the
+    class line and the statements of its body before the first method. The
+    statements between two definitions are grouped in one segment. The lines
+    of consecutive segments cover the whole file: comments and blank lines
+    belong to the segment they follow.
+
+    owner is the class whose body the statements belong to, None for
+    top-level statements.
+    """
+
+    __slots__ = ('path', 'start', 'code', 'statements', 'owner', '_digest')
+
+    def __init__(self, path, start, code, statements, owner=None):
+        self.path = path
+        # First line of the segment, line numbers of cached results are relative to it
+        self.start = start
+        self.code = code
+        self.statements = statements
+        self.owner = owner
+        self._digest = None
+
+    @property
+    def offset(self):
+        """Number of lines of the file before the segment."""
+        return self.start - 1
+
+    @property
+    def module(self):
+        """The statements of the segment as a module tree.
+
+        Statements of a class body are wrapped in a bare class of the same
+        name (no decorators, bases or keywords), so that they are analyzed
+        as members of their class.
+        """
+        body = self.statements
+        if self.owner is not None:
+            owner = self.owner
+            body = [ast.ClassDef(name=owner.name, bases=[], keywords=[], body=body, decorator_list=[],
+                                 lineno=owner.lineno, col_offset=owner.col_offset)]
+        return ast.Module(body=body, type_ignores=[])
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.code.encode('utf-8')).hexdigest()
+        return self._digest
+
+
+def _first_line(statement):
+    if type(statement) in DEFINITION_TYPES and statement.decorator_list:
+        return min(statement.lineno, *(decorator.lineno for decorator in statement.decorator_list))
+    return statement.lineno
+
+
+def _group(statements, definition_types, owner=None):
+    """Return the [start, statements, is definition, owner] groups of a body."""
+    groups = []
+    for statement in statements:
+        definition = type(statement) in definition_types
+        if definition or not groups or groups[-1][2]:
+            groups.append([_first_line(statement), [statement], definition, owner])
+        else:
+            groups[-1][1].append(statement)
+    return groups
+
+
+def split_segments(source):
+    """Return the segments of a loaded source file, or None when it is cached as a whole."""
+    code = source.code
+    if code.count('\n') + 1 < SEGMENT_MIN_LINES or code.count('\r') != code.count('\r\n'):
+        # Short, or with old Mac line endings the lines would not match the tree
+        return None
+
+    groups = []
+    for group in _group(source.tree.body, DEFINITION_TYPES):
+        statement = group[1][0]
+        if type(statement) is not ast.ClassDef or not any(type(member) in FUNCTION_TYPES for member in statement.body):
+            groups.append(group)
+            continue
+        # A class is split into its methods, the statements before the first
+        # one stay on the class line. The tree is shared, the class is copied.
+        members = _group(statement.body, FUNCTION_TYPES, statement)
+        cls = copy.copy(statement)
+        cls.body = [] if members[0][2] else members.pop(0)[1]
+        groups.append([group[0], [cls], True, None])
+        groups.extend(members)
+    if not groups:
+        return None
+    groups[0][0] = 1
+
+    lines = code.split('\n')
+    segments = []
+    for index, (start, statements, _, owner) in enumerate(groups):
+        end = groups[index + 1][0] - 1 if index + 1 < len(groups) else len(lines)
+        text = '\n'.join(lines[start - 1:end])
+        if end < len(lines):
+            text += '\n'
+        segments.append(Segment(source.path, start, text, statements, owner))
+    return segments
+
+
+def segmented_result(cache, analyzer, source, options, compute, combine, whole):
+    """Compute the result of a file segment by segment, reusing the unchanged ones.
+
+    compute(segment) returns the result of a segment with line numbers
+    relative to it (see Segment.offset), combine(parts) merges the
+    (segment, result) pairs into the result of the file. Without a cache, or
+    for a file too short to be split, whole() computes the result at once.
+
+    The segment results of the last analyzed version of a file are kept in a
+    single cache entry keyed by its path, a table from segment digest to
+    result: thousands of entries per file would cost more to write than the
+    walks they save.
+    """
+    segments = split_segments(source) if cache is not None else None
+    if segments is None:
+        return whole()
+
+    location = hashlib.sha256(os.path.abspath(source.path).encode('utf-8', 'surrogateescape')).hexdigest()
+    key = cache.key(f"{analyzer}:segments", location, options)
+    previous = cache.get(key)
+    if previous is MISSING or type(previous) is not dict:
+        previous = {}
+    results = {}
+    parts = []
+    for segment in segments:
+        result = results.get(segment.digest, MISSING)
+        if result is MISSING:
+            result = previous.get(segment.digest, MISSING)
+            if result is MISSING:
+                result = compute(segment)
+            results[segment.digest] = result
+        parts.append((segment, result))
+    cache.set(key, results)
+    return combine(parts)
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import click
+from astrix.features.cache import DEFAULT_CACHE_DIR, MemoryCache, ResultCache
+
+
+SOCKET_FILENAME = "astrix.sock"
+
+
+def run_command(cli, args, cwd, obj):
+    """Run an astrix command in this process and return (exit code, stdout, stderr).
+
+    Mirrors what click does for a standalone invocation: usage errors and
+    aborts are reported on stderr with their usual exit codes.
+    """
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    previous = os.getcwd()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            os.chdir(cwd)
+            result = cli.main(args=list(args), prog_name="astrix", standalone_mode=False, obj=obj)
+            code = result if isinstance(result, int) else 0
+        except click.exceptions.Exit as e:
+            code = e.exit_code
+        except click.ClickException as e:
+            e.show()
+            code = e.exit_code
+        except click.Abort:
+            click.echo("Aborted!", err=True)
+            code = 1
+        except OSError as e:
+            click.echo(f"Error: {e}", err=True)
+            code = 1
+        finally:
+            os.chdir(previous)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+class AnalysisServer(socketserver.UnixStreamServer):
+    """Answer astrix commands sent over a Unix socket, one JSON document per line.
+
+    A request names a command, its arguments and the working directory of
+    the client, plus the cache options of the command group::
+
+        {"command": "analyze", "args": ["sample.py"], "cwd": "/project",
+         "cache_dir": ".astrix_cache", "no_cache": false}
+
+    The response is ``{"exit_code": 0, "stdout": "...", "stderr": "..."}``.
+    A connection may send any number of requests.
+
+    Keeping the process alive amortizes interpreter startup and the imports
+    of radon, networkx and friends. Analysis results are kept in memory in
+    front of the on-disk result cache, the distribution index is built once
+    and recently parsed files stay loaded. Requests are handled one at a
+    time, the commands write to the process wide stdout.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, socket_path, cli, commands):
+        self.socket_path = os.path.abspath(str(socket_path))
+        self.cli = cli
+        self.commands = commands
+        self.caches = {}
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise OSError(f"An Astrix server is already listening on {self.socket_path}")
+            # Left behind by a server that did not exit cleanly
+            os.remove(self.socket_path)
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Only the current user may connect
+        umask = os.umask(0o077)
+        try:
+            super().__init__(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def cache_for(self, directory):
+        """Return the memory backed result cache of a cache directory."""
+        key = os.path.abspath(directory)
+        if key not in self.caches:
+            self.caches[key] = MemoryCache(ResultCache(key))
+        return self.caches[key]
+
+    def handle_request_data(self, request):
+        """Answer one decoded request."""
+        command = request.get("command")
+        args = request.get("args", [])
+        cwd = request.get("cwd") or os.getcwd()
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            return {"exit_code": 2, "stdout": "", "stderr": "Error: Invalid request, 'args' must be a list of strings.\n"}
+        if command not in self.commands:
+            return {"exit_code": 2, "stdout": "", "stderr": f"Error: The server does not run '{command}'.\n"}
+
+        group_args = ["--cache-dir", str(request.get("cache_dir") or DEFAULT_CACHE_DIR)]
+        if request.get("no_cache"):
+            group_args.append("--no-cache")
+        obj = {"serving": True, "cache_factory": self.cache_for}
+        code, stdout, stderr = run_command(self.cli, [*group_args, command, *args], cwd, obj)
+        return {"exit_code": code, "stdout": stdout, "stderr": stderr}
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(OSError):
+            os.remove(self.socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"exit_code": 2, "stdout": "", "stderr": "Error: Invalid request, expected one JSON document per line.\n"}
+            else:
+                try:
+                    response = self.server.handle_request_data(request if isinstance(request, dict) else {})
+                except Exception as e:
+                    # A failing command must not take the server down
+                    response = {"exit_code": 1, "stdout": "", "stderr": f"Error: {e!r}\n"}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def _is_listening(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def send_request(socket_path, command, args, cwd=None, cache_dir=DEFAULT_CACHE_DIR, no_cache=False):
+    """Send a command to a server and return its response."""
+    request = {"command": command, "args": list(args), "cwd": cwd or os.getcwd(), "cache_dir": cache_dir, "no_cache": no_cache}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(socket_path))
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("The server closed the connection without answering")
+    return json.loads(line)
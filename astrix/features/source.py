@@ -0,0 +1,89 @@
+import ast
+import hashlib
+import io
+import os
+import tokenize
+from collections import OrderedDict
+import click
+from astrix.features.profiling import phase
+
+
+# Number of recently loaded files kept in memory. Analyzers running one after
+# the other on the same file share its source and tree, while a whole project
+# run does not keep every tree alive.
+MAX_CACHED_SOURCES = 32
+
+_sources = OrderedDict()
+
+
+class SourceFile:
+    """A Python source file that is read once and parsed at most once."""
+
+    def __init__(self, path, code, stamp=None):
+        self.path = str(path)
+        self.code = code
+        self.stamp = stamp
+        self._tree = None
+        self._digest = None
+
+    @property
+    def tree(self):
+        """The parsed AST of the file, built on first access."""
+        if self._tree is None:
+            try:
+                with phase("parse", self.path):
+                    self._tree = ast.parse(self.code, filename=self.path)
+            except SyntaxError:
+                click.secho(f"Error: The python file '{self.path}' has Syntax Errors", fg='red', err=True)
+                raise click.Abort()
+        return self._tree
+
+    @property
+    def digest(self):
+        """SHA-256 of the source code, used to key cached results."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.code.encode('utf-8')).hexdigest()
+        return self._digest
+
+    def is_empty(self):
+        return not self.code.strip()
+
+
+def _decode(data):
+    """Decode source bytes honouring the PEP 263 encoding declaration."""
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return data.decode(encoding)
+
+
+def load_source(path):
+    """Return the SourceFile for path, reading the file only once per run.
+
+    Files are cached by absolute path and revalidated against their size and
+    modification time, so an edited file is read again.
+    """
+    path = str(path)
+    key = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = _sources.get(key)
+        if cached is not None and cached.stamp == stamp:
+            _sources.move_to_end(key)
+            return cached
+
+        with phase("read", path), open(path, 'rb') as file:
+            code = _decode(file.read())
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        click.secho(f"Error: Unable to read the file '{path}'. {e}", fg='red', err=True)
+        raise click.Abort()
+
+    source = SourceFile(path, code, stamp)
+    _sources[key] = source
+    if len(_sources) > MAX_CACHED_SOURCES:
+        _sources.popitem(last=False)
+    return source
+
+
+def clear_sources():
+    """Forget every loaded source file."""
+    _sources.clear()
@@ -0,0 +1,248 @@
+import json
+import os
+import click
+import numpy as np
+from array import array
+from functools import partial
+from astrix.features.code_quality import code_quality_rows, maintainability_row
+from astrix.features.profiling import phase
+from astrix.features.project import display_path, find_python_files, map_files
+
+
+PERCENTILES = (50, 75, 90, 95, 99)
+
+# Lower bounds of the maintainability index histogram bins, radon ranks a
+# file C below 10 and B below 20
+MI_BINS = (0, 10, 20, 40, 60, 80)
+MI_BIN_LABELS = ("0-10", "10-20", "20-40", "40-60", "60-80", "80-100")
+
+
+def file_stats(path, multi=False, cache=None):
+    """Return the function tuples and maintainability row of a file, or None if it cannot be analyzed.
+
+    Used as a process pool worker.
+    """
+    functions = code_quality_rows(path, cache)
+    if functions is None:
+        return None
+    row = maintainability_row(path, multi, cache)
+    if row is None:
+        return None
+    return [(name, lineno, classname, complexity) for name, lineno, _, _, _, classname, _, complexity in functions], row
+
+
+def maintainability_index(volume, complexity, lloc, comments):
+    """Return the maintainability index of files, radon.metrics.mi_compute over arrays of its parameters."""
+    volume = np.asarray(volume, dtype=float)
+    lloc = np.asarray(lloc, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index = (171 - 5.2 * np.log(volume) - 0.23 * np.asarray(complexity, dtype=float) - 16.2 * np.log(lloc)
+                 + 50 * np.sin(np.sqrt(2.46 * np.radians(comments))))
+        index = np.clip(index * 100 / 171.0, 0.0, 100.0)
+    return np.where((volume <= 0) | (lloc <= 0), 100.0, index)
+
+
+def package_of(path):
+    """Return the package (directory relative to the analyzed root) a displayed file path belongs to."""
+    return os.path.dirname(path).replace(os.sep, '/') or '.'
+
+
+class MetricTable:
+    """Per-function and per-file metrics of a project, stored column by column.
+
+    Rows are appended to typed buffers while files are analyzed and exposed
+    as NumPy arrays without copying, so millions of functions take a few
+    bytes each. Function names are only looked up for the rows printed.
+    """
+
+    def __init__(self):
+        self.files = []
+        self.packages = {}
+        self.file_package = array('i')
+        self.volume = array('d')
+        self.file_complexity = array('d')
+        self.lloc = array('d')
+        self.comments = array('d')
+        self.function_file = array('i')
+        self.function_line = array('i')
+        self.complexity = array('i')
+        self.function_names = []
+
+    def add(self, file, functions, row):
+        """Append the functions (name, lineno, classname, complexity) and maintainability row of a file."""
+        file_id = len(self.files)
+        self.files.append(file)
+        self.file_package.append(self.packages.setdefault(package_of(file), len(self.packages)))
+        volume, complexity, lloc, comments = row
+        self.volume.append(volume)
+        self.file_complexity.append(complexity)
+        self.lloc.append(lloc)
+        self.comments.append(comments)
+        for name, lineno, classname, function_complexity in functions:
+            self.function_file.append(file_id)
+            self.function_line.append(lineno)
+            self.complexity.append(function_complexity)
+            self.function_names.append(f"{classname}.{name}" if classname else name)
+
+    def column(self, name):
+        """Return a column as a NumPy array sharing the buffer of the table."""
+        values = getattr(self, name)
+        return np.frombuffer(values, dtype=np.intc if values.typecode == 'i' else np.float64)
+
+    @property
+    def package_names(self):
+        return list(self.packages)
+
+
+def _grouped_order(values, groups, count):
+    """Sort values by group then value; return the sorted values, group starts and sizes."""
+    order = np.lexsort((values, groups))
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return values[order], starts, sizes
+
+
+def _grouped_percentile(ordered, starts, sizes, q):
+    """Return the q-th percentile of every group of sorted values, interpolated as np.percentile; NaN for empty groups."""
+    result = np.full(len(sizes), np.nan)
+    present = sizes > 0
+    position = starts[present] + (sizes[present] - 1) * (q / 100)
+    low = np.floor(position).astype(np.intp)
+    high = np.ceil(position).astype(np.intp)
+    values = ordered.astype(float)
+    result[present] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+def _grouped_mean(values, groups, sizes):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.bincount(groups, weights=values, minlength=len(sizes)) / sizes
+
+
+class ProjectStats:
+    """Distributions of the metrics of a MetricTable, computed with vectorized operations."""
+
+    def __init__(self, table):
+        self.table = table
+        self.complexity = table.column('complexity')
+        self.function_file = table.column('function_file')
+        self.file_package = table.column('file_package')
+        self.function_package = self.file_package[self.function_file]
+        self.mi = maintainability_index(table.column('volume'), table.column('file_complexity'), table.column('lloc'), table.column('comments'))
+
+    def summary(self):
+        """Return the number of files and functions and the distribution of complexity and maintainability."""
+        summary = {'files': len(self.mi), 'functions': len(self.complexity)}
+        if len(self.complexity):
+            summary['complexity_mean'] = float(self.complexity.mean())
+            summary['complexity_max'] = int(self.complexity.max())
+            for q, value in zip(PERCENTILES, np.percentile(self.complexity, PERCENTILES)):
+                summary[f'complexity_p{q}'] = float(value)
+        if len(self.mi):
+            summary['mi_mean'] = float(self.mi.mean())
+            summary['mi_min'] = float(self.mi.min())
+        return summary
+
+    def packages(self):
+        """Return one dict per package: function complexity and file maintainability statistics, MI histogram."""
+        count = len(self.table.packages)
+        ordered, starts, sizes = _grouped_order(self.complexity, self.function_package, count)
+        mean = _grouped_mean(self.complexity, self.function_package, sizes)
+        p90 = _grouped_percentile(ordered, starts, sizes, 90)
+        maximum = np.zeros(count, dtype=np.intp)
+        present = sizes > 0
+        maximum[present] = ordered[starts[present] + sizes[present] - 1]
+
+        files = np.bincount(self.file_package, minlength=count)
+        mi_mean = _grouped_mean(self.mi, self.file_package, files)
+        mi_min = np.full(count, np.inf)
+        np.minimum.at(mi_min, self.file_package, self.mi)
+        bins = np.digitize(self.mi, MI_BINS[1:])
+        histogram = np.bincount(self.file_package * len(MI_BINS) + bins, minlength=count * len(MI_BINS)).reshape(count, len(MI_BINS))
+
+        packages = []
+        for package_id, name in enumerate(self.table.package_names):
+            functions = int(sizes[package_id])
+            packages.append({
+                'package': name,
+                'files': int(files[package_id]),
+                'functions': functions,
+                'complexity_mean': float(mean[package_id]) if functions else None,
+                'complexity_p90': float(p90[package_id]) if functions else None,
+                'complexity_max': int(maximum[package_id]) if functions else None,
+                'mi_mean': float(mi_mean[package_id]),
+                'mi_min': float(mi_min[package_id]),
+                'mi_histogram': dict(zip(MI_BIN_LABELS, map(int, histogram[package_id]))),
+            })
+        return sorted(packages, key=lambda package: package['package'])
+
+    def worst_functions(self, top=10):
+        """Return the top most complex functions, most complex first."""
+        top = min(top, len(self.complexity))
+        if top <= 0:
+            return []
+        candidates = np.argpartition(-self.complexity, top - 1)[:top]
+        # Ties are broken by position, so the output does not depend on the partition
+        candidates = candidates[np.lexsort((candidates, -self.complexity[candidates]))]
+        table = self.table
+        return [{
+            'file': table.files[self.function_file[index]],
+            'function': table.function_names[index],
+            'lineno': int(table.function_line[index]),
+            'complexity': int(self.complexity[index]),
+        } for index in candidates]
+
+
+def collect_stats(path, jobs=None, cache=None, multi=False):
+    """Analyze every Python file below path into a MetricTable."""
+    files = find_python_files(path)
+    table = MetricTable()
+    for file, result in zip(files, map_files(partial(file_stats, multi=multi, cache=cache), files, jobs)):
+        if result is not None:
+            table.add(display_path(file, path), *result)
+    return table
+
+
+def _format(value, digits=1):
+    return "" if value is None else f"{value:.{digits}f}"
+
+
+def generate_stats(path, jobs=None, cache=None, multi=False, top=10, fmt="table"):
+    """Print the metric distributions of a project: overall, per package and the most complex functions."""
+    table = collect_stats(path, jobs, cache, multi)
+    if not table.files:
+        click.secho(f"Error: No Python file could be analyzed in '{path}'.", fg='red')
+        raise click.Abort()
+
+    with phase("aggregate"):
+        stats = ProjectStats(table)
+        summary = stats.summary()
+        packages = stats.packages()
+        worst = stats.worst_functions(top)
+
+    with phase("output"):
+        if fmt == "json":
+            click.echo(json.dumps({'summary': summary, 'packages': packages, 'worst_functions': worst}, indent=2))
+            return stats
+        from tabulate import tabulate
+
+        click.secho("Summary", bold=True)
+        rows = [[key.replace('_', ' '), _format(value, 2) if isinstance(value, float) else value] for key, value in summary.items()]
+        click.echo(tabulate(rows, headers=["Metric", "Value"], disable_numparse=True))
+        click.echo()
+        click.secho("Complexity per package", bold=True)
+        click.echo(tabulate(
+            [[package['package'], package['functions'], _format(package['complexity_mean']), _format(package['complexity_p90']), package['complexity_max']]
+             for package in packages],
+            headers=["Package", "Functions", "Mean", "P90", "Max"], missingval="", disable_numparse=True))
+        click.echo()
+        click.secho("Maintainability index per package", bold=True)
+        click.echo(tabulate(
+            [[package['package'], package['files'], _format(package['mi_mean']), _format(package['mi_min']), *package['mi_histogram'].values()]
+             for package in packages],
+            headers=["Package", "Files", "Mean", "Min", *MI_BIN_LABELS], disable_numparse=True))
+        click.echo()
+        click.secho("Most complex functions", bold=True)
+        click.echo(tabulate([[row['file'], row['function'], row['lineno'], row['complexity']] for row in worst],
+                            headers=["File", "Function", "Line", "Complexity"]))
+    return stats
@@ -0,0 +1,475 @@
+import ast
+import os
+import click
+from collections import deque
+from astrix.features.cache import cached_result
+from astrix.features.segments import segmented_result
+from astrix.features.source import load_source
+
+
+# Maximum number of import aliases followed when resolving a name, guards
+# against import cycles such as two modules re-exporting each other.
+MAX_ALIAS_DEPTH = 8
+
+
+def module_name_for(path, root=None):
+    """Return the dotted module name of a file.
+
+    The name goes up through the package directories (the ones with an
+    ``__init__.py``), so it matches the absolute imports used by the
+    project. Below root (the analyzed directory or file), directories without
+    one are namespace packages and part of the name too, until a package has
+    been walked through: a plain directory holding a package is an import
+    root, like ``src`` in a src layout, and ends the name.
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    parts = [] if filename == '__init__.py' else [os.path.splitext(filename)[0]]
+    top = None
+    if root is not None:
+        top = os.path.abspath(root)
+        if not os.path.isdir(top):
+            top = os.path.dirname(top)
+    in_package = False
+    while True:
+        if os.path.isfile(os.path.join(directory, '__init__.py')):
+            in_package = True
+        elif in_package or top is None or directory == top or os.path.commonpath([top, directory]) != top:
+            break
+        directory, package = os.path.split(directory)
+        parts.append(package)
+    return '.'.join(reversed(parts))
+
+
+def dotted_parts(node):
+    """Return the parts of a dotted name expression (``a.b.c``), or None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return tuple(reversed(parts))
+
+
+def base_parts(node):
+    """Return the parts of a class base expression, ``Generic[T]`` counting as ``Generic``."""
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    return dotted_parts(node)
+
+
+def _concrete_types(*bases):
+    types = set()
+    pending = list(bases)
+    while pending:
+        cls = pending.pop()
+        types.add(cls)
+        pending.extend(cls.__subclasses__())
+    return frozenset(types)
+
+
+# Nodes that can never contain a definition, an import or a call
+LEAF_TYPES = _concrete_types(ast.Name, ast.Constant, ast.alias, ast.expr_context, ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+
+
+def child_nodes(node):
+    """Return the direct children of a node worth visiting.
+
+    A leaner ast.iter_child_nodes: reads the fields directly instead of going
+    through ast.iter_fields and drops leaves, which matters on large trees.
+    """
+    children = []
+    for field in node._fields:
+        value = getattr(node, field, None)
+        if type(value) is list:
+            children.extend(item for item in value if type(item) not in LEAF_TYPES and isinstance(item, ast.AST))
+        elif isinstance(value, ast.AST) and type(value) not in LEAF_TYPES:
+            children.append(value)
+    return children
+
+
+class _ScopeMarker:
+    """Stack entry telling the walker to enter or leave a definition."""
+
+    __slots__ = ('name', 'kind')
+
+    def __init__(self, name=None, kind=None):
+        self.name = name
+        self.kind = kind
+
+
+_LEAVE = _ScopeMarker()
+
+
+class SymbolVisitor:
+    """Collect the definitions, imports, class bases and calls of a module in one pass.
+
+    The tree is walked iteratively with an explicit stack instead of
+    ast.NodeVisitor recursion. A stack of the enclosing definitions is kept
+    while walking, so every call is attributed to its innermost enclosing
+    function without walking any subtree twice.
+    """
+
+    def __init__(self, module, is_package=False):
+        self.module = module
+        self.is_package = is_package
+        self.scope = []
+        self.functions = []
+        self.definitions = []
+        self.imports = {}
+        self.star_imports = []
+        self.imported_modules = {}
+        self.bases = {}
+        self.calls = []
+
+    def _qualname(self, name):
+        return '.'.join([*(entry[0] for entry in self.scope), name])
+
+    def visit(self, tree):
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if type(node) is _ScopeMarker:
+                if node is _LEAVE:
+                    _, kind = self.scope.pop()
+                    if kind == 'function':
+                        self.functions.pop()
+                else:
+                    self.scope.append((node.name, node.kind))
+                    if node.kind == 'function':
+                        self.functions.append('.'.join(entry[0] for entry in self.scope))
+                continue
+
+            node_type = type(node)
+            if node_type is ast.Call:
+                if self.functions:
+                    parts = dotted_parts(node.func)
+                    if parts is not None:
+                        self.calls.append((self.functions[-1], parts, node.lineno))
+            elif node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef or node_type is ast.ClassDef:
+                self._definition(node, pending)
+                continue
+            elif node_type is ast.Import:
+                self._import(node)
+            elif node_type is ast.ImportFrom:
+                self._import_from(node)
+            # Reversed so that nodes are popped in source order
+            pending.extend(reversed(child_nodes(node)))
+
+    def _definition(self, node, pending):
+        qualname = self._qualname(node.name)
+        if type(node) is ast.ClassDef:
+            kind = 'class'
+            self.definitions.append((qualname, node.lineno, kind, None))
+            self.bases[qualname] = [parts for parts in map(base_parts, node.bases) if parts]
+            outer = [*node.decorator_list, *node.bases, *node.keywords]
+        else:
+            kind = 'function'
+            owner = None
+            if self.scope and self.scope[-1][1] == 'class':
+                owner = '.'.join(entry[0] for entry in self.scope)
+            self.definitions.append((qualname, node.lineno, kind, owner))
+            outer = [*node.decorator_list, node.args]
+            if node.returns is not None:
+                outer.append(node.returns)
+
+        # Popped in reverse: decorators, defaults and bases are evaluated in
+        # the enclosing scope, then the body runs inside the definition.
+        pending.append(_LEAVE)
+        pending.extend(reversed(node.body))
+        pending.append(_ScopeMarker(node.name, kind))
+        pending.extend(reversed(outer))
+
+    def _import(self, node):
+        for alias in node.names:
+            self.imported_modules[alias.name] = None
+            if alias.asname:
+                self.imports[alias.asname] = alias.name
+            else:
+                # `import a.b` binds `a`
+                top = alias.name.split('.')[0]
+                self.imports[top] = top
+
+    def _import_from(self, node):
+        base = node.module or ''
+        if not node.level and node.module:
+            self.imported_modules[node.module] = None
+        if node.level:
+            package = self.module.split('.') if self.is_package else self.module.split('.')[:-1]
+            if node.level > 1:
+                package = package[:-(node.level - 1)]
+            base = '.'.join([*package, *([node.module] if node.module else [])])
+        for alias in node.names:
+            if alias.name == '*':
+                self.star_imports.append(base)
+                continue
+            self.imports[alias.asname or alias.name] = f"{base}.{alias.name}" if base else alias.name
+
+
+def extract_symbols(source, module):
+    """Return the symbols of a loaded source file as plain, picklable data."""
+    visitor = SymbolVisitor(module, os.path.basename(source.path) == '__init__.py')
+    visitor.visit(source.tree)
+    return _visitor_symbols(visitor, source, module)
+
+
+def segment_symbols(segment, module):
+    """Return the symbols of a segment (see segments.Segment), line numbers relative to it."""
+    visitor = SymbolVisitor(module, os.path.basename(segment.path) == '__init__.py')
+    visitor.visit(segment.module)
+    symbols = _visitor_symbols(visitor, segment, module)
+    if segment.owner is not None:
+        # The bare class wrapping a class body is defined by the class segment
+        name = segment.owner.name
+        symbols['definitions'] = [entry for entry in symbols['definitions'] if entry[0] != name]
+        symbols['bases'].pop(name, None)
+    lines = -segment.offset
+    symbols['definitions'] = [(qualname, lineno + lines, kind, owner) for qualname, lineno, kind, owner in symbols['definitions']]
+    symbols['calls'] = [(caller, parts, lineno + lines) for caller, parts, lineno in symbols['calls']]
+    return symbols
+
+
+def combine_symbols(parts, source, module):
+    """Merge the (segment, segment_symbols) pairs of a module into its symbols."""
+    definitions = []
+    imports = {}
+    star_imports = []
+    imported_modules = {}
+    bases = {}
+    calls = []
+    for segment, symbols in parts:
+        lines = segment.offset
+        definitions.extend((qualname, lineno + lines, kind, owner) for qualname, lineno, kind, owner in symbols['definitions'])
+        imports.update(symbols['imports'])
+        star_imports.extend(symbols['star_imports'])
+        imported_modules.update(dict.fromkeys(symbols['imported_modules']))
+        bases.update(symbols['bases'])
+        calls.extend((caller, parts, lineno + lines) for caller, parts, lineno in symbols['calls'])
+    return {
+        'module': module,
+        'path': source.path,
+        'definitions': definitions,
+        'imports': imports,
+        'star_imports': star_imports,
+        'imported_modules': list(imported_modules),
+        'bases': bases,
+        'calls': calls,
+    }
+
+
+def _visitor_symbols(visitor, source, module):
+    return {
+        'module': module,
+        'path': source.path,
+        'definitions': visitor.definitions,
+        'imports': visitor.imports,
+        'star_imports': visitor.star_imports,
+        # Absolute imports only, relative ones always refer to the project itself
+        'imported_modules': list(visitor.imported_modules),
+        'bases': visitor.bases,
+        'calls': visitor.calls,
+    }
+
+
+def module_symbols(path, cache=None, root=None):
+    """Return the symbols of a file, or None if the file cannot be analyzed.
+
+    root is the analyzed directory the module name is built from. Used as a
+    process pool worker when indexing a whole project.
+    """
+    try:
+        source = load_source(path)
+        module = module_name_for(path, root)
+        symbols = cached_result(cache, "symbols", source, (module,), lambda: segmented_result(
+            cache, "symbols", source, (module,), lambda segment: segment_symbols(segment, module),
+            lambda parts: combine_symbols(parts, source, module), lambda: extract_symbols(source, module)))
+    except click.Abort:
+        return None
+    # The path is not part of the cache key, a moved file keeps its entry
+    return {**symbols, 'path': str(path)}
+
+
+class ProjectSymbols:
+    """Index of the definitions of every module of a project.
+
+    Names are resolved across modules by following import aliases and star
+    imports, including re-exports from package ``__init__`` files. When two
+    files have the same module name (``pkg.py`` next to ``pkg/__init__.py``),
+    the first one is indexed and the other is reported and kept in
+    duplicates, by path.
+    """
+
+    def __init__(self, modules):
+        self.modules = {}
+        self.definitions = {}
+        self.owners = {}
+        self.class_modules = {}
+        self.duplicates = {}
+        self._resolved = {}
+        for symbols in modules:
+            self._index(symbols)
+
+    def _index(self, symbols):
+        module = symbols['module']
+        indexed = self.modules.get(module)
+        if indexed is not None and indexed['path'] != symbols['path']:
+            if self.duplicates.get(symbols['path']) != module:
+                click.secho(f"Warning: {symbols['path']} is module '{module}' too, already defined by {indexed['path']}; "
+                            f"it is left out of the project index.", fg='yellow', err=True)
+            self.duplicates[symbols['path']] = module
+            return False
+        self.modules[module] = symbols
+        for qualname, lineno, kind, owner in symbols['definitions']:
+            name = f"{module}.{qualname}" if module else qualname
+            self.definitions[name] = (symbols['path'], lineno, kind)
+            if owner is not None:
+                self.owners[name] = f"{module}.{owner}" if module else owner
+            if kind == 'class':
+                self.class_modules[name] = module
+        return True
+
+    def add_module(self, symbols):
+        """Index the symbols of a module, replacing the previous version of that module.
+
+        Returns False, leaving the index unchanged, when another file already
+        defines the module.
+        """
+        indexed = self.modules.get(symbols['module'])
+        if indexed is not None and indexed['path'] != symbols['path']:
+            return self._index(symbols)
+        self.remove_module(symbols['module'])
+        return self._index(symbols)
+
+    def is_indexed(self, symbols):
+        """Return whether the module of symbols is indexed from its file, and not left out as a duplicate."""
+        indexed = self.modules.get(symbols['module'])
+        return indexed is not None and indexed['path'] == symbols['path']
+
+    def remove_module(self, module):
+        """Forget the definitions of a module."""
+        symbols = self.modules.pop(module, None)
+        if symbols is None:
+            return
+        for qualname, _, _, _ in symbols['definitions']:
+            name = f"{module}.{qualname}" if module else qualname
+            self.definitions.pop(name, None)
+            self.owners.pop(name, None)
+            self.class_modules.pop(name, None)
+        # Any memoized resolution may have gone through the module
+        self._resolved.clear()
+
+    def resolve_dotted(self, dotted, depth=0):
+        """Return the definition a fully qualified name refers to, following re-exports."""
+        if dotted in self.definitions:
+            return dotted
+        if dotted in self._resolved:
+            return self._resolved[dotted]
+        if depth >= MAX_ALIAS_DEPTH:
+            return None
+
+        # Memoized, with a None placeholder while resolving so that import
+        # cycles end immediately and shared star import chains are walked once.
+        self._resolved[dotted] = None
+        resolved = None
+        parts = dotted.split('.')
+        for split in range(len(parts) - 1, 0, -1):
+            module = '.'.join(parts[:split])
+            if module in self.modules:
+                resolved = self._resolve_imported(module, parts[split:], depth)
+                break
+        self._resolved[dotted] = resolved
+        return resolved
+
+    def _resolve_imported(self, module, parts, depth=0):
+        """Resolve a name a module binds through its imports, star imports included."""
+        symbols = self.modules[module]
+        target = symbols['imports'].get(parts[0])
+        if target is not None:
+            return self.resolve_dotted('.'.join([target, *parts[1:]]), depth + 1)
+        for star in symbols['star_imports']:
+            resolved = self.resolve_dotted('.'.join([star, *parts]), depth + 1)
+            if resolved is not None:
+                return resolved
+        return None
+
+    def resolve_name(self, module, parts, scope=()):
+        """Resolve a dotted name used in a module, from within the given scope.
+
+        scope is the qualified name of the enclosing function split into parts,
+        enclosing functions are searched first, then the module globals and
+        finally the names bound by imports.
+        """
+        prefix = f"{module}." if module else ""
+        for depth in range(len(scope), -1, -1):
+            enclosing = prefix + '.'.join(scope[:depth])
+            if depth and self.definitions.get(enclosing, (None, None, None))[2] != 'function':
+                # Names defined in a class body are not visible from its methods
+                continue
+            candidate = '.'.join(filter(None, [enclosing if depth else module, *parts]))
+            if candidate in self.definitions:
+                return candidate
+
+        if module in self.modules:
+            return self._resolve_imported(module, parts)
+        return None
+
+    def resolve_class(self, name):
+        """Return the resolved base classes of a class defined in the project."""
+        module = self.class_modules.get(name)
+        if module is None:
+            return []
+        qualname = name[len(module) + 1:] if module else name
+        resolved = []
+        for parts in self.modules[module]['bases'].get(qualname, ()):
+            base = self.resolve_name(module, parts)
+            if base is not None and self.definitions[base][2] == 'class':
+                resolved.append(base)
+        return resolved
+
+    def resolve_bases(self, name):
+        """Return every base of a project class, resolved or not.
+
+        Bases defined in the project are returned by their fully qualified
+        name; the others (builtins, third party classes) by the dotted name
+        they are imported as, e.g. ``django.db.models.Model``.
+        """
+        module = self.class_modules.get(name)
+        if module is None:
+            return []
+        qualname = name[len(module) + 1:] if module else name
+        imports = self.modules[module]['imports']
+        bases = []
+        for parts in self.modules[module]['bases'].get(qualname, ()):
+            base = self.resolve_name(module, parts)
+            if base is None or self.definitions[base][2] != 'class':
+                target = imports.get(parts[0])
+                base = '.'.join([target, *parts[1:]]) if target else '.'.join(parts)
+            if base != name and base not in bases:
+                bases.append(base)
+        return bases
+
+    def resolve_method(self, class_name, method):
+        """Find a method on a class or, breadth first, on its bases."""
+        pending = deque([class_name])
+        seen = set()
+        while pending:
+            current = pending.popleft()
+            if current in seen:
+                continue
+            seen.add(current)
+            candidate = f"{current}.{method}"
+            if candidate in self.definitions:
+                return candidate
+            pending.extend(self.resolve_class(current))
+        return None
+
+    def resolve_call(self, module, caller, parts):
+        """Return the definition called by `parts(...)` from the function caller, or None."""
+        caller_name = f"{module}.{caller}" if module else caller
+        if parts[0] in ('self', 'cls') and len(parts) == 2:
+            owner = self.owners.get(caller_name)
+            if owner is not None:
+                return self.resolve_method(owner, parts[1])
+            return None
+        return self.resolve_name(module, parts, tuple(caller.split('.')))
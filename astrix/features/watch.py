@@ -0,0 +1,436 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+import click
+import networkx as nx
+from functools import partial
+from astrix.features.callgraph import add_call_edges
+from astrix.features.class_index import ClassIndex
+from astrix.features.project import display_path, find_directories, find_python_files, map_files
+from astrix.features.report import analyze_file
+from astrix.features.symbols import ProjectSymbols
+
+
+def _changed_names(previous, symbols):
+    """Return the names whose binding differs between two versions of a module.
+
+    A call elsewhere in the project can only resolve differently if one of
+    its dotted parts is such a name. Returns None when any call of the
+    modules importing it may be affected (changed star imports or bases).
+    previous or symbols is None for an added or deleted module.
+    """
+    if previous is None or symbols is None:
+        current = previous or symbols
+        if current['star_imports'] or current['bases']:
+            return None
+        names = set(current['module'].split('.'))
+        names.update(current['imports'])
+        for qualname, _, _, _ in current['definitions']:
+            names.update(qualname.split('.'))
+        return names
+
+    if previous['star_imports'] != symbols['star_imports'] or previous['bases'] != symbols['bases']:
+        return None
+    names = set()
+    old_definitions = {(qualname, kind, owner) for qualname, _, kind, owner in previous['definitions']}
+    new_definitions = {(qualname, kind, owner) for qualname, _, kind, owner in symbols['definitions']}
+    for qualname, kind, _ in old_definitions ^ new_definitions:
+        names.update(qualname.split('.'))
+        if kind == 'class':
+            # Subclasses resolve self.method() through this class
+            names.update(('self', 'cls'))
+    for alias in previous['imports'].keys() | symbols['imports'].keys():
+        if previous['imports'].get(alias) != symbols['imports'].get(alias):
+            names.add(alias)
+    return names
+
+
+class ProjectState:
+    """In-memory analysis results of a project, patched file by file.
+
+    Holds the function and maintainability rows of every file, the project
+    symbol table and the project call graph. update() re-analyzes only the
+    files that changed and resolves the calls they make again. When the
+    definitions or imports of a module change, the calls of the modules
+    importing it (directly or through re-exports) that mention one of the
+    changed names are resolved again too. The class index is rebuilt on first
+    use after such a change.
+    """
+
+    def __init__(self, root, multi=False, cache=None):
+        self.root = str(root)
+        self.multi = multi
+        self.cache = cache
+        self.functions = {}
+        self.maintainability = {}
+        self.symbols = {}
+        self.project = ProjectSymbols([])
+        self.call_graph = nx.DiGraph()
+        self.callees = {}
+        self.call_edges = {}
+        self._class_index = None
+
+    def load(self, jobs=None):
+        """Analyze every file of the project, in parallel."""
+        files = find_python_files(self.root)
+        worker = partial(analyze_file, multi=self.multi, cache=self.cache, root=self.root)
+        for path, (functions, row, symbols) in zip(files, map_files(worker, files, jobs)):
+            if symbols is None:
+                continue
+            self.functions[path] = functions
+            self.maintainability[path] = row
+            self.symbols[path] = symbols
+            if self.project.add_module(symbols):
+                self._add_nodes(symbols)
+        for path in self.symbols:
+            self._resolve_calls(path)
+
+    @property
+    def class_index(self):
+        if self._class_index is None:
+            self._class_index = ClassIndex.from_project(self.project)
+        return self._class_index
+
+    def _definition_nodes(self, symbols):
+        module = symbols['module']
+        return {f"{module}.{qualname}" if module else qualname: (lineno, kind) for qualname, lineno, kind, _ in symbols['definitions']}
+
+    def _add_nodes(self, symbols, previous=None):
+        """Add the function nodes of a module, updating the nodes of a previous version in place."""
+        nodes = self._definition_nodes(symbols)
+        if previous is not None:
+            for name in self._definition_nodes(previous).keys() - nodes.keys():
+                if name in self.call_graph:
+                    self.call_graph.remove_node(name)
+        for name, (lineno, kind) in nodes.items():
+            if name in self.call_graph:
+                self.call_graph.nodes[name].update(file=symbols['path'], lineno=lineno)
+            elif kind == 'function':
+                self.call_graph.add_node(name, file=symbols['path'], lineno=lineno)
+
+    def _resolve_calls(self, path, names=None):
+        """Resolve the calls of a module again and patch its call graph edges.
+
+        With names, only the calls mentioning one of them are resolved again.
+        """
+        old_edges = self.call_edges.pop(path, set())
+        symbols = self.symbols.get(path)
+        if symbols is None or self.project.modules.get(symbols['module']) is not symbols:
+            self.callees.pop(path, None)
+            self.call_graph.remove_edges_from(old_edges)
+            return
+
+        module = symbols['module']
+        calls = symbols['calls']
+        callees = self.callees.get(path)
+        if names is None or callees is None:
+            callees = [self.project.resolve_call(module, caller, parts) for caller, parts, _ in calls]
+        else:
+            for index, (caller, parts, _) in enumerate(calls):
+                if not names.isdisjoint(parts):
+                    callees[index] = self.project.resolve_call(module, caller, parts)
+        self.callees[path] = callees
+
+        prefix = f"{module}." if module else ""
+        edges = {(prefix + caller, callee) for (caller, _, _), callee in zip(calls, callees) if callee is not None}
+        self.call_graph.remove_edges_from(old_edges - edges)
+        # Edges can also have gone with a removed node
+        add_call_edges(self.call_graph, self.project, [edge for edge in edges if not self.call_graph.has_edge(*edge)])
+        self.call_edges[path] = edges
+
+    def _forget(self, path):
+        symbols = self.symbols.pop(path)
+        self.functions.pop(path, None)
+        self.maintainability.pop(path, None)
+        self.callees.pop(path, None)
+        self.call_graph.remove_edges_from(self.call_edges.pop(path, ()))
+        if self.project.modules.get(symbols['module']) is not symbols:
+            # A duplicate module name, its definitions were never indexed
+            self.project.duplicates.pop(path, None)
+            return
+        self.project.remove_module(symbols['module'])
+        for name in self._definition_nodes(symbols):
+            if name in self.call_graph:
+                self.call_graph.remove_node(name)
+
+    def _dependents(self, modules, names=None):
+        """Return the paths of the modules importing any of modules, directly or transitively.
+
+        names, when given, is extended in place with the aliases the
+        dependents bind to any of those names (`from m import f as g`).
+        """
+        by_prefix = {}
+        by_target = {}
+        for path, symbols in self.symbols.items():
+            for target in (*symbols['imports'].values(), *symbols['star_imports']):
+                by_target.setdefault(target, set()).add(path)
+                parts = target.split('.')
+                for depth in range(1, len(parts) + 1):
+                    by_prefix.setdefault('.'.join(parts[:depth]), set()).add(path)
+
+        paths = set()
+        pending = list(modules)
+        seen = set(pending)
+        while pending:
+            module = pending.pop()
+            # `from module import name` or `import module.sub`, and `import package` for its submodules
+            importers = set(by_prefix.get(module, ()))
+            parts = module.split('.')
+            for depth in range(1, len(parts)):
+                importers.update(by_target.get('.'.join(parts[:depth]), ()))
+            for path in importers - paths:
+                paths.add(path)
+                importer = self.symbols[path]['module']
+                if importer not in seen:
+                    seen.add(importer)
+                    pending.append(importer)
+
+        grown = names is not None
+        while grown:
+            grown = False
+            for path in paths:
+                for alias, target in self.symbols[path]['imports'].items():
+                    if alias not in names and not names.isdisjoint(target.split('.')):
+                        names.add(alias)
+                        grown = True
+        return paths
+
+    def update(self, paths):
+        """Re-analyze changed, added or deleted files and patch the results in place.
+
+        Returns the paths whose results changed. A file that no longer parses
+        (a save in the middle of an edit) keeps its last results. A path that
+        is not a Python file is a removed or moved away directory, every file
+        analyzed below it is removed.
+        """
+        paths = set(map(str, paths))
+        directories = tuple(os.path.join(path, '') for path in paths if not path.endswith('.py'))
+        if directories:
+            paths.update(path for path in self.symbols if path.startswith(directories))
+        changed = []
+        changed_modules = set()
+        names = set()
+        for path in sorted(paths):
+            previous = self.symbols.get(path)
+            if not os.path.isfile(path):
+                if previous is not None:
+                    self._forget(path)
+                    changed.append(path)
+                    changed_modules.add(previous['module'])
+                    module_names = _changed_names(previous, None)
+                    names = None if names is None or module_names is None else names | module_names
+                continue
+
+            functions, row, symbols = analyze_file(path, self.multi, self.cache, self.root)
+            if symbols is None:
+                continue
+            self.functions[path] = functions
+            self.maintainability[path] = row
+            self.symbols[path] = symbols
+            if self.project.add_module(symbols):
+                self._add_nodes(symbols, previous)
+            module_names = _changed_names(previous, symbols)
+            if module_names is None or module_names:
+                changed_modules.add(symbols['module'])
+                names = None if names is None or module_names is None else names | module_names
+            changed.append(path)
+
+        dependents = set()
+        if changed_modules:
+            dependents = self._dependents(changed_modules, names)
+            self._class_index = None
+        for path in changed:
+            self._resolve_calls(path)
+        for path in dependents.difference(changed):
+            self._resolve_calls(path, names)
+        return changed
+
+    def file_summary(self, path):
+        """Return a one line summary of the results of a file."""
+        name = display_path(path, self.root)
+        if path not in self.symbols:
+            return f"{name}: removed"
+        functions = self.functions.get(path) or []
+        complexity = max((row[-1] for row in functions), default=0)
+        row = self.maintainability.get(path)
+        volume = f", Halstead volume {row[0]:.1f}" if row else ""
+        return f"{name}: {len(functions)} functions, max complexity {complexity}{volume}"
+
+    def project_summary(self):
+        """Return a one line summary of the whole project."""
+        functions = sum(len(rows or ()) for rows in self.functions.values())
+        return (f"{len(self.symbols)} files, {functions} functions, "
+                f"call graph {self.call_graph.number_of_nodes()} nodes / {self.call_graph.number_of_edges()} edges, "
+                f"{len(self.project.class_modules)} classes")
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Report changed Python files using Linux inotify, through ctypes.
+
+    Every directory of the project is watched; directories created later are
+    added as they appear. A directory deleted or moved out of the project is
+    reported by its own path, its files being gone with it.
+    """
+
+    name = "inotify"
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, root, debounce=0.05):
+        self.root = str(root)
+        self.debounce = debounce
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+        for directory in find_directories(self.root):
+            self._add(directory)
+
+    def _add(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = directory
+
+    def _remove(self, directory):
+        """Stop watching a directory and every directory below it."""
+        prefix = os.path.join(directory, '')
+        for wd, watched in list(self.watches.items()):
+            if watched == directory or watched.startswith(prefix):
+                # Already gone when the directory was deleted, the error does not matter
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def _read(self, changed):
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, consider every file changed
+                changed.update(find_python_files(self.root))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for added in find_directories(path):
+                        self._add(added)
+                    # Files may have been written before the watch was added
+                    changed.update(find_python_files(path))
+                elif mask & (IN_MOVED_FROM | IN_DELETE):
+                    self._remove(path)
+                    changed.add(path)
+            elif name.endswith('.py'):
+                changed.add(path)
+
+    def wait(self, timeout=None):
+        """Block until Python files change and return their paths (empty after timeout seconds).
+
+        Removed directories are returned as well, see ProjectState.update().
+        """
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            self._read(changed)
+            # Editors save with several events (write, rename), collect them all
+            ready, _, _ = select.select([self.fd], [], [], self.debounce)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Report changed Python files by comparing modification times every interval seconds."""
+
+    name = "polling"
+
+    def __init__(self, root, interval=1.0):
+        self.root = str(root)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in find_python_files(self.root):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """Block until Python files change and return their paths (empty after timeout seconds)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self.snapshot.keys() if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def create_watcher(root, poll=False, interval=1.0):
+    """Return an inotify watcher where available, a polling one otherwise."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            # No inotify symbols in the C library, or out of watches
+            pass
+    return PollingWatcher(root, interval)
+
+
+def watch_project(state, watcher):
+    """Patch the project state on every change until interrupted, printing a summary per update."""
+    try:
+        while True:
+            paths = watcher.wait()
+            start = time.perf_counter()
+            changed = state.update(paths)
+            if not changed:
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            for path in changed:
+                click.echo(state.file_summary(path))
+            click.echo(f"Project: {state.project_summary()} (updated in {elapsed:.0f} ms)")
+    except KeyboardInterrupt:
+        click.echo("Stopped watching.")
+    finally:
+        watcher.close()
@@ -0,0 +1,78 @@
+"""Benchmark call graph queries on large synthetic call graphs.
+
+Run with `python benchmarks/bench_call_index.py [functions ...]`. Every
+function calls a few others, mostly nearby ones like real modules do. The
+index is built, saved as a graph file and mapped back as `astrix callgraph`
+persists it, next to loading the same graph pickled as a networkx DiGraph;
+then --from, --callers-of, --path and --cycles queries are timed on the
+mapped index.
+"""
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+from astrix.features.call_index import CallIndex
+from astrix.features.graph_store import GraphStore
+
+CALLS_PER_FUNCTION = 4
+
+
+def synthetic_graph(functions):
+    generator = random.Random(0)
+    graph = nx.DiGraph()
+    for position in range(functions):
+        graph.add_node(f"pkg.module{position // 50}.f{position}", file=f"module{position // 50}.py", lineno=position % 50 * 10 + 1)
+    names = list(graph.nodes)
+    for position, name in enumerate(names):
+        for _ in range(CALLS_PER_FUNCTION):
+            target = min(functions - 1, max(0, position + int(generator.gauss(0, 200))))
+            graph.add_edge(name, names[target])
+    return graph
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def measure(functions):
+    graph = synthetic_graph(functions)
+    index, build = timed(CallIndex.from_graph, graph)
+    data = pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL)
+    _, unpickle = timed(pickle.loads, data)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.graph")
+        index.save(path, "0" * 64)
+        size = os.path.getsize(path)
+        index, load = timed(lambda: CallIndex.open(GraphStore(path)))
+        measure_queries(functions, index, build, len(data), unpickle, size, load)
+
+
+def measure_queries(functions, index, build, pickled, unpickle, size, load):
+    middle = index.names[functions // 2]
+    _, lookup = timed(index.find, middle.rsplit('.', 2)[-2] + '.' + middle.rsplit('.', 1)[-1])
+    _, depth3 = timed(index.reachable, middle, 3)
+    _, callers = timed(index.reachable, middle, 2, True)
+    _, path = timed(index.path, index.names[0], index.names[-1])
+    _, cycles = timed(index.cycles)
+    print(f"{functions:>10,}{index.edge_count:>10,}{build:>10.0f}{pickled / 2**20:>9.1f}{unpickle:>10.0f}{size / 2**20:>8.1f}{load:>8.2f}"
+          f"{lookup:>8.1f}{depth3:>8.2f}{callers:>9.2f}{path:>8.1f}{cycles:>8.0f}")
+
+
+def main():
+    print(f"{'functions':>10}{'edges':>10}{'build ms':>10}{'pickle MB':>10}{'unpickle':>10}{'file MB':>8}{'open':>8}"
+          f"{'find':>8}{'from 3':>8}{'callers':>9}{'path':>8}{'cycles':>8}")
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 50_000, 200_000]
+    for functions in sizes:
+        measure(functions)
+
+
+if __name__ == "__main__":
+    main()
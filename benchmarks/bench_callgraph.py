@@ -0,0 +1,63 @@
+"""Benchmark call-graph extraction on large synthetic files.
+
+Run with `python benchmarks/bench_callgraph.py`. For every size the time per
+AST node should stay flat, both for flat files with many functions and for
+deeply nested functions.
+"""
+import ast
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from astrix.features.callgraph import extract_call_edges
+from astrix.features.source import load_source
+
+
+def flat_source(functions):
+    return "\n".join(
+        f"def f{i}(x):\n    y = g{i}(x)\n    return f{max(i - 1, 0)}(y) + h(x, y)\n" for i in range(functions)
+    )
+
+
+def nested_source(depth, copies):
+    blocks = []
+    for copy in range(copies):
+        lines = []
+        for level in range(depth):
+            indent = "    " * level
+            lines.append(f"{indent}def f{copy}_{level}():")
+            lines.append(f"{indent}    g{copy}_{level}()")
+        blocks.append("\n".join(lines) + "\n")
+    return "\n".join(blocks)
+
+
+def measure(code, directory, name):
+    path = os.path.join(directory, f"{name}.py")
+    with open(path, "w") as file:
+        file.write(code)
+    source = load_source(path)
+    nodes = sum(1 for _ in ast.walk(source.tree))
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        extract_call_edges(source)
+        best = min(best, time.perf_counter() - start)
+    return nodes, best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'case':<22}{'nodes':>10}{'seconds':>10}{'us/node':>10}")
+        for functions in (1_000, 10_000, 50_000):
+            nodes, seconds = measure(flat_source(functions), directory, f"flat_{functions}")
+            print(f"{'flat ' + str(functions):<22}{nodes:>10}{seconds:>10.3f}{seconds / nodes * 1e6:>10.2f}")
+        for depth in (10, 40, 90):
+            nodes, seconds = measure(nested_source(depth, 200), directory, f"nested_{depth}")
+            print(f"{'nested depth ' + str(depth):<22}{nodes:>10}{seconds:>10.3f}{seconds / nodes * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark the single-pass metrics engine against radon on large files.
+
+Run with `python benchmarks/bench_metrics.py [file.py ...]`. Without
+arguments synthetic files are generated. radon computes the same metrics
+with cc_visit_ast, ComplexityVisitor, h_visit_ast and raw.analyze, which walk
+the tree and tokenize the code several times.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radon.complexity import cc_visit_ast
+from radon.metrics import h_visit_ast
+from radon.raw import analyze
+from radon.visitors import ComplexityVisitor
+from astrix.features.metrics import compute_metrics
+from astrix.features.source import load_source
+
+
+def synthetic_source(functions):
+    blocks = []
+    for i in range(functions):
+        blocks.append(
+            f"class C{i}:\n"
+            f"    \"\"\"Class {i}.\n\n    Longer description.\n    \"\"\"\n"
+            f"    def run(self, items, limit={i}):\n"
+            f"        total = 0  # running total\n"
+            f"        for item in items:\n"
+            f"            if item > limit and item % 2 or not item:\n"
+            f"                total += item * {i} - limit\n"
+            f"        values = call(\n            total,\n            [x for x in items if x],\n        )\n"
+            f"        return total if values else -total\n"
+        )
+    return "\n\n".join(blocks)
+
+
+def radon_metrics(source):
+    tree = source.tree
+    cc_visit_ast(tree)
+    ComplexityVisitor.from_ast(tree).total_complexity
+    h_visit_ast(tree).total.volume
+    analyze(source.code)
+
+
+def best_of(function, source, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(path):
+    source = load_source(path)
+    source.tree
+    radon_seconds = best_of(radon_metrics, source)
+    astrix_seconds = best_of(compute_metrics, source)
+    lines = source.code.count("\n") + 1
+    name = os.path.basename(path)
+    print(f"{name:<28}{lines:>10}{radon_seconds:>10.3f}{astrix_seconds:>10.3f}{radon_seconds / astrix_seconds:>9.1f}x")
+
+
+def main():
+    print(f"{'file':<28}{'lines':>10}{'radon':>10}{'astrix':>10}{'speedup':>10}")
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            measure(path)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        for functions in (100, 1_000, 5_000):
+            path = os.path.join(directory, f"synthetic_{functions}.py")
+            with open(path, "w") as file:
+                file.write(synthetic_source(functions))
+            measure(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark the aggregation stage of `astrix stats` on synthetic projects.
+
+Run with `python benchmarks/bench_stats.py [functions ...]`. Metric rows are
+generated without analyzing any file, so only filling the columnar table and
+the vectorized statistics are timed, next to the same statistics computed with
+plain Python loops over the rows.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from astrix.features.stats import MetricTable, ProjectStats
+
+FUNCTIONS_PER_FILE = 20
+PACKAGES = 200
+
+
+def synthetic_table(functions):
+    generator = random.Random(0)
+    table = MetricTable()
+    for file_id in range(functions // FUNCTIONS_PER_FILE):
+        rows = [(f"f{index}", index * 10 + 1, None, int(generator.paretovariate(1.5))) for index in range(FUNCTIONS_PER_FILE)]
+        table.add(f"pkg{file_id % PACKAGES}/module{file_id}.py", rows, (generator.uniform(10, 5000), 40.0, generator.randint(10, 800), 12.5))
+    return table
+
+
+def python_statistics(table):
+    """The per package statistics with dicts and sorted lists, for comparison."""
+    groups = {}
+    for file_id, complexity in zip(table.function_file, table.complexity):
+        groups.setdefault(table.files[file_id].split('/')[0], []).append(complexity)
+    result = {}
+    for package, values in groups.items():
+        values.sort()
+        result[package] = (sum(values) / len(values), values[int(0.9 * (len(values) - 1))], values[-1])
+    worst = sorted(range(len(table.complexity)), key=lambda index: -table.complexity[index])[:10]
+    return result, worst
+
+
+def measure(functions):
+    start = time.perf_counter()
+    table = synthetic_table(functions)
+    filled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = ProjectStats(table)
+    stats.summary()
+    stats.packages()
+    stats.worst_functions(10)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    python_statistics(table)
+    loops = time.perf_counter() - start
+    print(f"{functions:>12,}{filled:>10.2f}{vectorized:>12.3f}{loops:>10.2f}{loops / vectorized:>9.1f}x")
+
+
+def main():
+    print(f"{'functions':>12}{'fill':>10}{'numpy':>12}{'python':>10}{'speedup':>10}")
+    sizes = [int(size) for size in sys.argv[1:]] or [100_000, 1_000_000, 2_000_000]
+    for functions in sizes:
+        measure(functions)
+
+
+if __name__ == "__main__":
+    main()
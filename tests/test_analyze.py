@@ -1,7 +1,7 @@
 import pytest
 import os
 import click
-from astrix.features.code_quality import analyze_code_quality
+from astrix.features.code_quality import analyze_code_quality, FileTable, FunctionRecord
 
 
 @pytest.fixture
@@ -79,3 +79,24 @@ def test_analyze_code_quality_unreadable_file(tmp_path):
     os.remove(unreadable_file)
     with pytest.raises(click.exceptions.Abort):  # Expecting a SystemExit due to an unreadable file
         analyze_code_quality(unreadable_file)
+
+
+def test_function_records_are_compact(tmp_path):
+    file_path = tmp_path / "nested.py"
+    file_path.write_text("class A:\n    def run(self):\n        def helper():\n            return 1\n        return helper()\n\n\nclass B:\n    def run(self):\n        pass\n")
+    records = analyze_code_quality(file_path)
+
+    assert [(record.classname, record.name) for record in records] == [('A', 'run'), ('B', 'run')]
+    assert records[0].closures == ('helper',)
+    assert not hasattr(records[0], '__dict__')
+    # Equal names share one string
+    assert records[0].name is records[1].name
+    assert FunctionRecord(*records[0].row()).row() == records[0].row()
+
+
+def test_file_table():
+    table = FileTable()
+    assert table.add("a.py") == 0
+    assert table.add("b.py") == 1
+    assert table.add("a.py") == 0
+    assert table[1] == "b.py"
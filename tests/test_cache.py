@@ -0,0 +1,124 @@
+import ast
+import os
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.cache import ResultCache, MISSING
+from astrix.features.source import clear_sources
+from astrix.features.code_quality import analyze_code_quality, analyze_maintainability_index
+from astrix.features.callgraph import extract_call_edges
+from astrix.features.class_heirarchy import extract_class_hierarchy
+from astrix.features.source import load_source
+
+
+@pytest.fixture
+def sample_python_file(tmp_path):
+    """Fixture that provides a temporary Python file for testing."""
+    content = '''
+class Base:
+    def run(self):
+        return helper()
+
+def helper():
+    return 1
+    '''
+    file_path = tmp_path / "sample_python_file.py"
+    file_path.write_text(content)
+    clear_sources()
+    return file_path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "cache")
+
+
+def test_cache_roundtrip(cache):
+    key = cache.key("analyzer", "digest")
+    assert cache.get(key) is MISSING
+    cache.set(key, [1, 2, 3])
+    assert cache.get(key) == [1, 2, 3]
+
+
+def test_cache_key_depends_on_content_and_options(cache):
+    key = cache.key("maintainability", "digest", (False,))
+    assert key != cache.key("maintainability", "digest", (True,))
+    assert key != cache.key("maintainability", "other", (False,))
+    assert key != cache.key("code_quality", "digest", (False,))
+
+
+def test_cache_prune_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=2500)
+    keys = [cache.key("analyzer", str(i)) for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.set(key, b"x" * 1000)
+        path = cache._entry_path(key)
+        os.utime(path, (i, i))
+
+    assert cache.prune() == 3
+    assert cache.size() <= 2500
+    assert cache.get(keys[0]) is MISSING
+    assert cache.get(keys[4]) == b"x" * 1000
+
+
+def test_prune_is_throttled(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=0)
+    assert cache.prune_if_due() == 0
+    assert not (tmp_path / "cache").exists()
+
+    cache.set(cache.key("analyzer", "first"), b"x")
+    assert cache.prune_if_due() == 1
+    cache.set(cache.key("analyzer", "second"), b"x")
+    # Another process pruned a moment ago
+    assert ResultCache(tmp_path / "cache", max_size=0).prune_if_due() == 0
+    assert cache.prune_if_due(interval=0) == 1
+
+
+def test_corrupt_entry_is_recomputed(cache):
+    key = cache.key("analyzer", "digest")
+    cache.set(key, "value")
+    with open(cache._entry_path(key), 'wb') as file:
+        file.write(b"garbage")
+    assert cache.get(key) is MISSING
+
+
+def test_warm_run_skips_parsing(sample_python_file, cache, monkeypatch):
+    cold_quality = analyze_code_quality(sample_python_file, cache)
+    cold_maintainability = analyze_maintainability_index(sample_python_file, False, cache)
+    clear_sources()
+
+    def failing_parse(*args, **kwargs):
+        raise AssertionError("cached analysis should not parse the file")
+
+    monkeypatch.setattr(ast, "parse", failing_parse)
+    warm_quality = analyze_code_quality(sample_python_file, cache)
+    warm_maintainability = analyze_maintainability_index(sample_python_file, False, cache)
+
+    assert [r.name for r in warm_quality] == [r.name for r in cold_quality]
+    assert warm_maintainability == cold_maintainability
+
+
+def test_modified_file_is_analyzed_again(sample_python_file, cache):
+    analyze_code_quality(sample_python_file, cache)
+    sample_python_file.write_text("def other():\n    pass\n")
+    os.utime(sample_python_file, ns=(0, 0))
+
+    results = analyze_code_quality(sample_python_file, cache)
+    assert [r.name for r in results] == ["other"]
+
+
+def test_graph_edges(sample_python_file):
+    source = load_source(sample_python_file)
+    nodes, edges = extract_call_edges(source)
+    assert ("run", "helper") in edges
+
+    nodes, edges = extract_class_hierarchy(source)
+    assert ("Base", "class") in nodes
+    assert ("Base", "Base.run") in edges
+
+
+def test_cli_populates_cache(sample_python_file, tmp_path):
+    cache_dir = tmp_path / "cli_cache"
+    result = CliRunner().invoke(cli, ["--cache-dir", str(cache_dir), "analyze", str(sample_python_file)])
+    assert result.exit_code == 0
+    assert ResultCache(cache_dir).size() > 0
@@ -0,0 +1,211 @@
+import json
+import os
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.call_index import CallIndex, build_call_index, load_call_index
+
+
+@pytest.fixture
+def sample_package(tmp_path):
+    """Fixture that provides a package whose functions call each other across modules."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "db.py").write_text('''
+def connect():
+    return open_socket()
+
+def open_socket():
+    pass
+
+def close():
+    pass
+''')
+    (package / "models.py").write_text('''
+from pkg.db import connect
+
+
+class Model:
+    def save(self):
+        self.validate()
+        connect()
+
+    def validate(self):
+        pass
+''')
+    (package / "views.py").write_text('''
+from pkg.models import Model
+
+
+def handle():
+    Model.save(Model())
+
+def save():
+    pass
+''')
+    return tmp_path
+
+
+def test_reachable_and_callers(sample_package):
+    index = build_call_index(sample_package, jobs=1)
+
+    assert index.reachable("pkg.views.handle", depth=2) == {
+        "pkg.views.handle": 0, "pkg.models.Model": 1, "pkg.models.Model.save": 1,
+        "pkg.models.Model.validate": 2, "pkg.db.connect": 2,
+    }
+    assert index.reachable("pkg.views.handle")["pkg.db.open_socket"] == 3
+    assert index.reachable("pkg.db.open_socket", reverse=True) == {
+        "pkg.db.open_socket": 0, "pkg.db.connect": 1, "pkg.models.Model.save": 2, "pkg.views.handle": 3,
+    }
+    assert index.reachable("pkg.db.close") == {"pkg.db.close": 0}
+
+
+def test_path_and_find(sample_package):
+    index = build_call_index(sample_package, jobs=1)
+
+    assert index.path("pkg.views.handle", "pkg.db.open_socket") == [
+        "pkg.views.handle", "pkg.models.Model.save", "pkg.db.connect", "pkg.db.open_socket",
+    ]
+    assert index.path("pkg.db.open_socket", "pkg.views.handle") is None
+    assert index.find("Model.save") == ["pkg.models.Model.save"]
+    assert index.find("pkg.db.close") == ["pkg.db.close"]
+    assert sorted(index.find("save")) == ["pkg.models.Model.save", "pkg.views.save"]
+    assert index.find("odel.save") == []
+
+
+def test_subgraph_keeps_the_calls_followed(sample_package):
+    index = build_call_index(sample_package, jobs=1)
+    distances = index.reachable("pkg.views.handle", depth=1)
+    graph = index.subgraph(distances, depth=1)
+
+    assert set(graph.edges) == {("pkg.views.handle", "pkg.models.Model"), ("pkg.views.handle", "pkg.models.Model.save")}
+    assert graph.nodes["pkg.views.handle"]["lineno"] == 5
+
+
+def test_large_index():
+    count = 100_000
+    edges = [(position, position + 1) for position in range(count - 1)]
+    index = CallIndex.from_edges([f"m.f{position:06d}" for position in range(count)], [None] * count, [0] * count, edges)
+
+    assert len(index.reachable("m.f000000")) == count
+    assert index.reachable("m.f099999", depth=5, reverse=True)["m.f099994"] == 5
+    assert len(index.path("m.f000000", "m.f099999")) == count
+
+
+def test_index_is_persisted_and_invalidated(sample_package, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = load_call_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert os.listdir(cache_dir / "call_index")
+
+    second = load_call_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert list(second.names) == list(first.names)
+    assert second.reachable("pkg.views.handle") == first.reachable("pkg.views.handle")
+    assert second.location("pkg.db.connect") == first.location("pkg.db.connect")
+
+    db = sample_package / "pkg" / "db.py"
+    db.write_text(db.read_text() + "\n\ndef reconnect():\n    close()\n")
+    os.utime(db, ns=(0, 0))
+    third = load_call_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert third.path("pkg.db.reconnect", "pkg.db.close") == ["pkg.db.reconnect", "pkg.db.close"]
+
+
+def test_cli_queries(sample_package, tmp_path):
+    runner = CliRunner()
+    base = ["--cache-dir", str(tmp_path / "cache"), "callgraph", str(sample_package), "-j", "1"]
+
+    result = runner.invoke(cli, [*base, "--from", "handle", "--depth", "1"])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].split() == ["Function", "Depth", "File", "Line"]
+    assert [line.split()[:2] for line in lines[2:]] == [["pkg.models.Model", "1"], ["pkg.models.Model.save", "1"]]
+    assert os.path.join("pkg", "models.py") in lines[3]
+
+    result = runner.invoke(cli, [*base, "--callers-of", "connect"])
+    assert result.exit_code == 0, result.output
+    assert [line.split()[0] for line in result.output.splitlines()[2:]] == ["pkg.models.Model.save", "pkg.views.handle"]
+
+    result = runner.invoke(cli, [*base, "--path", "handle", "open_socket"])
+    assert result.exit_code == 0, result.output
+    assert [line.split()[:2] for line in result.output.splitlines()[2:]] == [
+        ["pkg.views.handle", "0"], ["pkg.models.Model.save", "1"], ["pkg.db.connect", "2"], ["pkg.db.open_socket", "3"],
+    ]
+
+    result = runner.invoke(cli, [*base, "--callers-of", "handle"])
+    assert result.output == "No function calls pkg.views.handle.\n"
+
+    result = runner.invoke(cli, [*base, "--from", "save"])
+    assert result.exit_code != 0
+    assert "matches several functions" in result.output
+
+    result = runner.invoke(cli, [*base, "--from", "handle", "--callers-of", "connect"])
+    assert result.exit_code != 0
+
+    for options in (["--depth", "2"], ["--path", "handle", "connect", "--depth", "2"]):
+        result = runner.invoke(cli, [*base, *options])
+        assert result.exit_code == 2
+        assert "--depth only applies to --from and --callers-of." in result.output
+
+
+def test_cli_query_subgraph(sample_package):
+    result = CliRunner().invoke(cli, ["--no-cache", "callgraph", str(sample_package), "-j", "1", "--from", "Model.save", "--format", "json"])
+    assert result.exit_code == 0, result.output
+    output_path = os.path.normpath(str(sample_package)) + "_callgraph_query.json"
+    with open(output_path) as file:
+        graph = json.load(file)
+    os.remove(output_path)
+    assert {node["id"] for node in graph["nodes"]} == {
+        "pkg.models.Model.save", "pkg.models.Model.validate", "pkg.db.connect", "pkg.db.open_socket",
+    }
+
+
+RECURSIVE = '''
+def parse(tokens):
+    return parse_list(tokens)
+
+def parse_list(tokens):
+    return [parse(token) for token in tokens]
+
+def walk(node):
+    return walk(node)
+
+def main():
+    parse([])
+'''
+
+
+def test_cycles(tmp_path):
+    path = tmp_path / "recursive.py"
+    path.write_text(RECURSIVE)
+    index = build_call_index(path, jobs=1)
+
+    assert index.cycles() == [["recursive.parse", "recursive.parse_list"], ["recursive.walk"]]
+    graph = index.cycle_graph(index.cycles())
+    assert set(graph.edges) == {
+        ("recursive.parse", "recursive.parse_list"), ("recursive.parse_list", "recursive.parse"), ("recursive.walk", "recursive.walk"),
+    }
+
+    # A cycle through every function of a long chain, without recursion
+    count = 100_000
+    edges = [(position, (position + 1) % count) for position in range(count)]
+    index = CallIndex.from_edges([f"m.f{position:06d}" for position in range(count)], [None] * count, [0] * count, sorted(edges))
+    assert [len(group) for group in index.cycles()] == [count]
+
+
+def test_cli_cycles(sample_package, tmp_path):
+    path = tmp_path / "recursive.py"
+    path.write_text(RECURSIVE)
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["--no-cache", "callgraph", str(path), "--cycles"])
+    assert result.exit_code == 1
+    lines = result.output.splitlines()
+    assert lines[0].split() == ["Cycle", "Function", "File", "Line"]
+    assert lines[2].split() == ["1", "recursive.parse", str(path), "2"]
+    assert lines[3].split() == ["recursive.parse_list", str(path), "5"]
+    assert lines[4].split() == ["2", "recursive.walk", str(path), "8"]
+    assert lines[-1] == "2 call cycles, 3 functions."
+
+    result = runner.invoke(cli, ["--no-cache", "callgraph", str(sample_package / "pkg"), "--cycles"])
+    assert result.exit_code == 0, result.output
+    assert result.output == "No call cycles found.\n"
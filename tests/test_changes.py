@@ -0,0 +1,104 @@
+import json
+import subprocess
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.changes import change_set_symbols, git_changes
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-c", "user.name=Astrix", "-c", "user.email=astrix@example.com", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Fixture that provides a committed git repository with a small package."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "base.py").write_text("class Base:\n    def run(self):\n        return 1\n")
+    (package / "util.py").write_text("def helper(x):\n    return x\n")
+    (package / "app.py").write_text(
+        "from pkg.util import helper\nfrom pkg.base import Base\n\n\n"
+        "class App(Base):\n    def start(self):\n        return helper(self.run())\n"
+    )
+    (package / "other.py").write_text("def alone():\n    return 2\n")
+    (package / "old.py").write_text("def gone():\n    return 3\n")
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+def test_git_changes(repo):
+    package = repo / "pkg"
+    (package / "util.py").write_text("def helper(x):\n    return x or 0\n")
+    (package / "new.py").write_text("def fresh():\n    return 4\n")
+    git(repo, "add", "pkg/new.py")
+    git(repo, "mv", "pkg/old.py", "pkg/renamed.py")
+
+    files, deleted = git_changes(str(package), "HEAD")
+    assert files == [str(package / "new.py"), str(package / "renamed.py"), str(package / "util.py")]
+    assert deleted == [str(package / "old.py")]
+
+
+def test_git_changes_untracked_and_siblings(repo):
+    package = repo / "pkg"
+    (package / "untracked.py").write_text("def draft():\n    return 5\n")
+    (package / "ignored.py").write_text("")
+    (repo / ".gitignore").write_text("ignored.py\n")
+    # A sibling directory sharing the package name as a prefix
+    sibling = repo / "pkg2"
+    sibling.mkdir()
+    (sibling / "gone.py").write_text("")
+    git(repo, "add", "pkg2/gone.py")
+    git(repo, "commit", "-q", "-m", "sibling")
+    git(repo, "rm", "-q", "pkg2/gone.py")
+
+    files, deleted = git_changes(str(package), "HEAD")
+    assert files == [str(package / "untracked.py")]
+    assert deleted == []
+
+
+def test_change_set_includes_direct_dependents(repo):
+    package = repo / "pkg"
+    (package / "util.py").write_text("def helper(x):\n    return x or 0\n")
+
+    modules, context = change_set_symbols(str(package), "HEAD")
+    assert sorted(symbols['module'] for symbols in modules) == ["pkg.app", "pkg.util"]
+    # Imported by a dependent, indexed to resolve self.run() but not reported
+    assert "pkg.base" in {symbols['module'] for symbols in context}
+
+
+def test_callgraph_since(repo):
+    package = repo / "pkg"
+    (package / "util.py").write_text("def helper(x):\n    return x or 0\n")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "callgraph", str(package), "--since", "HEAD", "--format", "json", "-j", "1"])
+
+    assert result.exit_code == 0, result.output
+    graph = json.loads((repo / "pkg_callgraph.json").read_text())
+    nodes = {node["id"] for node in graph["nodes"]}
+    assert "pkg.other.alone" not in nodes
+    assert {"source": "pkg.app.App.start", "target": "pkg.util.helper"} in graph["edges"]
+    assert {"source": "pkg.app.App.start", "target": "pkg.base.Base.run"} in graph["edges"]
+
+
+def test_analyze_since(repo):
+    package = repo / "pkg"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "analyze", str(package), "--since", "HEAD"])
+    assert result.exit_code == 0, result.output
+    assert "No Python file changed since HEAD." in result.output
+
+    (package / "other.py").write_text("def alone():\n    return 5\n")
+    result = runner.invoke(cli, ["--no-cache", "analyze", str(package), "--since", "HEAD", "-f", "csv", "-j", "1"])
+    assert result.exit_code == 0, result.output
+    assert [line.split(",")[:2] for line in result.stdout.splitlines()[1:]] == [["other.py", "alone"]]
+
+
+def test_since_unknown_ref(repo):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "maintainability", str(repo / "pkg"), "--since", "no-such-ref"])
+    assert result.exit_code != 0
+    assert "git diff failed" in result.output
@@ -0,0 +1,136 @@
+import os
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.class_index import ClassIndex, MappedClassIndex, build_class_index, load_class_index
+
+
+@pytest.fixture
+def sample_package(tmp_path):
+    """Fixture that provides a package whose classes inherit across modules."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from .base import Base\n")
+    (package / "base.py").write_text('''
+class Base:
+    pass
+
+
+class Mixin(object):
+    pass
+''')
+    (package / "models.py").write_text('''
+import pkg.base
+from pkg import Base
+from .base import Mixin
+
+
+class Child(Mixin, Base):
+    pass
+
+
+class GrandChild(Child):
+    pass
+
+
+class Other(pkg.base.Base):
+    pass
+
+
+class Error(ValueError):
+    pass
+''')
+    return package
+
+
+def test_mro_resolves_bases_across_modules(sample_package):
+    index = build_class_index(sample_package, jobs=1)
+    assert index.mro("pkg.models.GrandChild") == (
+        "pkg.models.GrandChild", "pkg.models.Child", "pkg.base.Mixin", "pkg.base.Base", "object")
+    assert index.mro("pkg.models.Error") == ("pkg.models.Error", "ValueError", "object")
+
+
+def test_subclasses_are_transitive(sample_package):
+    index = build_class_index(sample_package, jobs=1)
+    assert set(index.subclasses("pkg.base.Base")) == {"pkg.models.Child", "pkg.models.GrandChild", "pkg.models.Other"}
+    assert index.subclasses("ValueError") == ("pkg.models.Error",)
+    assert index.subclasses("pkg.models.GrandChild") == ()
+
+
+def test_find_accepts_dotted_suffixes(sample_package):
+    index = build_class_index(sample_package, jobs=1)
+    assert index.find("GrandChild") == ["pkg.models.GrandChild"]
+    assert index.find("models.Child") == ["pkg.models.Child"]
+    assert index.find("Missing") == []
+
+
+def test_c3_linearization_matches_python():
+    # class A; class B(A); class C(A); class D(B, C)
+    index = ClassIndex(
+        {name: ("m.py", 1) for name in "ABCD"},
+        {"A": (), "B": ("A",), "C": ("A",), "D": ("B", "C")},
+    )
+    assert index.mro("D") == ("D", "B", "C", "A", "object")
+
+
+def test_inheritance_cycle_does_not_hang():
+    index = ClassIndex({"A": ("m.py", 1), "B": ("m.py", 2)}, {"A": ("B",), "B": ("A",)})
+    assert index.mro("A")[0] == "A"
+
+
+def test_deep_hierarchy_is_not_recursive():
+    depth = 3000
+    classes = {f"C{i}": ("m.py", i) for i in range(depth)}
+    bases = {f"C{i}": (f"C{i - 1}",) if i else () for i in range(depth)}
+    index = ClassIndex(classes, bases)
+    assert len(index.mro(f"C{depth - 1}")) == depth + 1
+    assert len(index.subclasses("C0")) == depth - 1
+
+
+def test_index_is_persisted_and_invalidated(sample_package, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = load_class_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert os.listdir(cache_dir / "class_index")
+
+    second = load_class_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert isinstance(second, MappedClassIndex)
+    for name in first.classes:
+        assert second.mro(name) == first.mro(name)
+        assert second.location(name) == first.location(name)
+    assert second.subclasses("pkg.base.Base") == first.subclasses("pkg.base.Base")
+    assert second.find("Child") == first.find("Child")
+
+    models = sample_package / "models.py"
+    models.write_text(models.read_text() + "\n\nclass Late(GrandChild):\n    pass\n")
+    os.utime(models, ns=(0, 0))
+    third = load_class_index(sample_package, jobs=1, cache_dir=cache_dir)
+    assert "pkg.models.Late" in third.subclasses("pkg.base.Base")
+
+
+def test_cli_queries(sample_package, tmp_path):
+    runner = CliRunner()
+    base = ["--cache-dir", str(tmp_path / "cache"), "class-info", str(sample_package)]
+
+    result = runner.invoke(cli, [*base, "--mro", "GrandChild"])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[2].startswith("pkg.models.GrandChild")
+    assert os.path.join("models.py") in lines[2]
+    assert lines[-1].startswith("object")
+
+    result = runner.invoke(cli, [*base, "--subclasses-of", "pkg.base.Base"])
+    assert result.exit_code == 0, result.output
+    assert "pkg.models.Other" in result.output
+
+    result = runner.invoke(cli, [*base, "--mro", "Nope"])
+    assert result.exit_code != 0
+    assert "No class named 'Nope'" in result.output
+
+
+def test_cli_project_graph(sample_package, tmp_path):
+    result = CliRunner().invoke(cli, ["--no-cache", "class-info", str(sample_package), "--format", "dot", "-j", "1"])
+    assert result.exit_code == 0, result.output
+    output_path = f"{sample_package}_class_graph.dot"
+    with open(output_path) as file:
+        content = file.read()
+    assert '"pkg.base.Base" -> "pkg.models.Child";' in content
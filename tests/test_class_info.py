@@ -77,3 +77,21 @@ def standalone_function():
     
     # Check if the output file is created
     assert not os.path.exists(output_file), "Output file was not created, because there were no classes in the Python file."
+
+
+def test_generate_class_hierarchy_dotted_bases(tmp_path):
+    """Bases such as `a.b.C` or `Generic[T]` used to crash the extraction."""
+    file_path = tmp_path / "dotted.py"
+    file_path.write_text('''
+import typing
+import collections.abc
+
+class Items(collections.abc.Mapping, typing.Generic[T]):
+    pass
+''')
+    generate_class_hierarchy(file_path, fmt="json")
+    output_path = str(file_path).replace(".py", "_class_graph.json")
+    with open(output_path) as file:
+        content = file.read()
+    assert '"source": "collections.abc.Mapping", "target": "Items"' in content
+    assert '"source": "typing.Generic", "target": "Items"' in content
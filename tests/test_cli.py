@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+
+
+HEAVY_MODULES = ["matplotlib", "networkx", "radon", "requests", "toml", "stdlib_list", "tabulate", "numpy"]
+
+# Cumulative import time budget of astrix.cli, in microseconds. Importing
+# click alone takes a few tens of milliseconds.
+IMPORT_TIME_BUDGET = 250_000
+
+
+def import_times(*args):
+    """Run Python with -X importtime and return {module: cumulative microseconds}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_skips_heavy_modules():
+    times = import_times("-c", "import astrix.cli")
+    assert "astrix.cli" in times
+    loaded = [module for module in HEAVY_MODULES if module in times]
+    assert loaded == []
+
+
+def test_cli_import_time_budget():
+    # Take the best of a few runs to keep the check stable on busy machines
+    best = min(import_times("-c", "import astrix.cli")["astrix.cli"] for _ in range(3))
+    assert best < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize("args", [["--help"], ["delete", "--help"], ["analyze", "--help"]])
+def test_help_skips_heavy_modules(args):
+    times = import_times("-m", "astrix.cli", *args)
+    loaded = [module for module in HEAVY_MODULES if module in times]
+    assert loaded == []
+
+
+def test_help_lists_commands():
+    result = CliRunner().invoke(cli, ["--help"])
+    assert result.exit_code == 0
+    for command in ["analyze", "maintainability", "callgraph", "class-info", "deps", "install", "delete"]:
+        assert command in result.output
@@ -105,3 +105,93 @@ import requests
             assert "No summary available :(" not in row[1], "requests summary should be fetched"
             assert "No documentation available :(" not in row[2], "requests documentation should be available"
 
+
+
+@pytest.fixture
+def slow_pypi(monkeypatch):
+    """Local stand-in for the PyPI JSON API answering every request after a delay."""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from astrix.features import dependency
+
+    state = {"requests": 0, "clients": set(), "failures": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            package = self.path.strip("/").split("/")[0]
+            with lock:
+                state["requests"] += 1
+                state["clients"].add(self.client_address)
+                fail = package.startswith("flaky") and package not in state["failures"]
+                if fail:
+                    state["failures"].add(package)
+            time.sleep(0.1)
+            if fail:
+                body, status = b"{}", 503
+            else:
+                body = json.dumps({"info": {"summary": f"Summary of {package}", "project_urls": {}}}).encode()
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(dependency, "PYPI_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(dependency, "BACKOFF_FACTOR", 0)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_fetch_is_faster_than_serial(slow_pypi):
+    import time
+    from astrix.features.dependency import fetch_many_details
+    packages = [f"fakepkg{i}" for i in range(10)]
+
+    start = time.perf_counter()
+    details = fetch_many_details(packages, concurrency=10)
+    elapsed = time.perf_counter() - start
+
+    assert [details[p]["info"]["summary"] for p in packages] == [f"Summary of {p}" for p in packages]
+    # Ten requests of 100ms each take a second when fetched one by one
+    assert elapsed < 0.5
+
+
+def test_dependency_info_uses_fetched_details(tmp_path, slow_pypi):
+    python_file = tmp_path / "many_imports.py"
+    python_file.write_text("".join(f"import fakepkg{i}\n" for i in range(3)))
+
+    result = generate_dependency_info(python_file)
+    assert [row[1] for row in result] == [f"Summary of fakepkg{i}" for i in range(3)]
+
+
+def test_concurrency_limit_reuses_connections(tmp_path, slow_pypi):
+    python_file = tmp_path / "many_imports.py"
+    python_file.write_text("".join(f"import fakepkg{i}\n" for i in range(8)))
+
+    generate_dependency_info(python_file, concurrency=2)
+
+    assert slow_pypi["requests"] == 8
+    assert len(slow_pypi["clients"]) <= 2
+
+
+def test_failed_requests_are_retried(tmp_path, slow_pypi):
+    python_file = tmp_path / "flaky_imports.py"
+    python_file.write_text("import flakypkg\n")
+
+    result = generate_dependency_info(python_file)
+
+    assert result[0][1] == "Summary of flakypkg"
+    assert slow_pypi["requests"] == 2
@@ -0,0 +1,81 @@
+import sys
+import pytest
+from unittest import mock
+from astrix.features import distribution_index
+from astrix.features.distribution_index import (
+    build_distribution_index, distribution_for, load_distribution_index, reset_distribution_index, INDEX_FILENAME,
+)
+from astrix.features.dependency import get_pypi_name, imported_modules
+from astrix.features.source import load_source
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    reset_distribution_index()
+    yield
+    reset_distribution_index()
+
+
+def test_distribution_for_prefers_longest_prefix():
+    index = {
+        "google": ["protobuf", "google-cloud-storage"],
+        "google.cloud.storage": ["google-cloud-storage"],
+        "yaml": ["PyYAML"],
+    }
+    assert distribution_for("google.cloud.storage.blob", index) == "google-cloud-storage"
+    assert distribution_for("google.protobuf", index) == "protobuf"
+    assert distribution_for("yaml", index) == "PyYAML"
+    assert distribution_for("unknown.module", index) is None
+
+
+def test_build_distribution_index_installed_packages():
+    index = build_distribution_index()
+    assert distribution_for("requests", index) == "requests"
+    assert distribution_for("dateutil.parser", index) == "python-dateutil"
+    assert distribution_for("matplotlib.pyplot", index) == "matplotlib"
+
+
+def test_index_is_built_once_per_process():
+    with mock.patch.object(distribution_index, "build_distribution_index", return_value={"yaml": ["PyYAML"]}) as build:
+        assert get_pypi_name("yaml") == "PyYAML"
+        assert get_pypi_name("yaml.loader") == "PyYAML"
+        assert get_pypi_name("localpkg.sub") == "localpkg"
+    assert build.call_count == 1
+
+
+def test_index_is_persisted(tmp_path):
+    with mock.patch.object(distribution_index, "build_distribution_index", return_value={"yaml": ["PyYAML"]}) as build:
+        load_distribution_index(tmp_path)
+        reset_distribution_index()
+        assert load_distribution_index(tmp_path) == {"yaml": ["PyYAML"]}
+    assert build.call_count == 1
+    assert (tmp_path / INDEX_FILENAME).exists()
+
+
+def test_persisted_index_invalidated_by_install(tmp_path):
+    with mock.patch.object(distribution_index, "build_distribution_index", return_value={"yaml": ["PyYAML"]}) as build:
+        with mock.patch.object(distribution_index, "site_packages_stamp", return_value=[["site", 1]]):
+            load_distribution_index(tmp_path)
+        reset_distribution_index()
+        with mock.patch.object(distribution_index, "site_packages_stamp", return_value=[["site", 2]]):
+            load_distribution_index(tmp_path)
+    assert build.call_count == 2
+
+
+def test_stamp_only_covers_distribution_directories(tmp_path, monkeypatch):
+    site = tmp_path / "site-packages"
+    (site / "example-1.0.dist-info").mkdir(parents=True)
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.setattr(sys, "path", ["", str(work), str(site), str(tmp_path / "missing.zip")])
+
+    stamp = distribution_index.site_packages_stamp()
+    assert [path for path, _ in stamp] == [str(site)]
+    (work / ".astrix_cache").mkdir()
+    assert distribution_index.site_packages_stamp() == stamp
+
+
+def test_imported_modules_skips_relative_imports(tmp_path):
+    python_file = tmp_path / "imports.py"
+    python_file.write_text("import os\nfrom . import sibling\nfrom .pkg import thing\nfrom dateutil.parser import parse\n")
+    assert imported_modules(load_source(python_file).tree) == ["os", "dateutil.parser"]
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import networkx as nx
+import pytest
+from astrix.features.callgraph import generate_call_graph
+from astrix.features.class_heirarchy import generate_class_hierarchy
+from astrix.features.graph_export import graph_output_path
+
+
+@pytest.fixture
+def sample_python_file(tmp_path):
+    """Fixture that provides a temporary Python file for testing."""
+    content = '''
+class Base:
+    def run(self):
+        return helper("a \\\\ \\"quoted\\" <value>")
+
+class Derived(Base):
+    pass
+
+def helper(value):
+    return main()
+
+def main():
+    helper(1)
+    '''
+    file_path = tmp_path / "sample_python_file.py"
+    file_path.write_text(content)
+    return file_path
+
+
+def test_graph_output_path():
+    assert graph_output_path("dir/sample.py", "_callgraph", "dot") == "dir/sample_callgraph.dot"
+    assert graph_output_path("dir/project", "_callgraph", "json") == "dir/project_callgraph.json"
+
+
+def test_call_graph_dot(sample_python_file):
+    generate_call_graph(sample_python_file, fmt="dot")
+    output_path = graph_output_path(sample_python_file, "_callgraph", "dot")
+    content = open(output_path).read()
+    assert content.startswith('digraph "Call Graph" {')
+    assert '"helper" -> "main";' in content
+    assert '"main" -> "helper";' in content
+
+
+def test_call_graph_graphml_roundtrip(sample_python_file):
+    generate_call_graph(sample_python_file, fmt="graphml")
+    graph = nx.read_graphml(graph_output_path(sample_python_file, "_callgraph", "graphml"))
+    assert set(graph.edges) == {("run", "helper"), ("helper", "main"), ("main", "helper")}
+
+
+def test_call_graph_json_roundtrip(sample_python_file):
+    generate_call_graph(sample_python_file, fmt="json")
+    with open(graph_output_path(sample_python_file, "_callgraph", "json")) as file:
+        graph = nx.node_link_graph(json.load(file), edges="edges")
+    assert set(graph.edges) == {("run", "helper"), ("helper", "main"), ("main", "helper")}
+
+
+def test_class_hierarchy_graphml_keeps_node_types(sample_python_file):
+    generate_class_hierarchy(sample_python_file, fmt="graphml")
+    graph = nx.read_graphml(graph_output_path(sample_python_file, "_class_graph", "graphml"))
+    assert graph.nodes["Base"]["type"] == "class"
+    assert graph.nodes["Base.run"]["type"] == "method"
+    assert ("Base", "Derived") in graph.edges
+
+
+def test_text_formats_do_not_load_matplotlib(sample_python_file):
+    code = (
+        "import sys\n"
+        "from astrix.features.callgraph import generate_call_graph\n"
+        "from astrix.features.class_heirarchy import generate_class_hierarchy\n"
+        f"generate_call_graph({str(sample_python_file)!r}, fmt='dot')\n"
+        f"generate_class_hierarchy({str(sample_python_file)!r}, fmt='json')\n"
+        "print('matplotlib' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("False")
+
+
+def test_png_uses_agg_backend(sample_python_file):
+    import matplotlib
+    generate_call_graph(sample_python_file, fmt="png")
+    assert matplotlib.get_backend().lower() == "agg"
+    assert os.path.isfile(graph_output_path(sample_python_file, "_callgraph", "png"))
@@ -0,0 +1,49 @@
+from array import array
+from astrix.features.graph_store import GraphStore, StringTable, csr, open_store, save_store
+
+
+def test_string_table():
+    table = StringTable.build(["a.b", "a.b.c", "pkg.mod.f", "pkg.other.f", "zé"])
+
+    assert len(table) == 5
+    assert list(table) == ["a.b", "a.b.c", "pkg.mod.f", "pkg.other.f", "zé"]
+    assert table[-1] == "zé"
+    assert "a.b.c" in table and "a.c" not in table
+    assert table.index("pkg.mod.f") == 2
+    assert table.endswith(".f") == [2, 3]
+    assert table.endswith(".b") == [0]
+    assert table.endswith("é") == [4]
+
+
+def test_csr_keeps_edge_order():
+    offsets, targets = csr(3, [(0, 2), (2, 0), (0, 1)])
+    assert list(offsets) == [0, 2, 2, 3]
+    assert list(targets) == [2, 1, 0]
+
+
+def test_store_round_trip(tmp_path):
+    path = tmp_path / "index" / "project.graph"
+    stamp = "0" * 64
+    names = StringTable.build(["f", "g"])
+    save_store(str(path), stamp, {**names.sections('names'), 'lines': array('i', [3, -7]), 'empty': array('i')})
+
+    store = open_store(str(path), stamp)
+    assert list(store.strings('names')) == ["f", "g"]
+    assert list(store.array('lines')) == [3, -7]
+    assert len(store.array('empty')) == 0
+    assert open_store(str(path), "1" * 64) is None
+    assert open_store(str(tmp_path / "missing.graph"), stamp) is None
+
+
+def test_corrupt_store_is_ignored(tmp_path):
+    path = tmp_path / "project.graph"
+    save_store(str(path), "0" * 64, {'lines': array('i', range(100))})
+    data = path.read_bytes()
+    assert len(GraphStore(str(path)).array('lines')) == 100
+
+    path.write_bytes(data[:200])
+    assert open_store(str(path), "0" * 64) is None
+    path.write_bytes(b"")
+    assert open_store(str(path), "0" * 64) is None
+    path.write_bytes(b"not a graph" * 10)
+    assert open_store(str(path), "0" * 64) is None
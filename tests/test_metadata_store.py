@@ -0,0 +1,128 @@
+import json
+import pytest
+import requests
+from unittest import mock
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.metadata_store import MISSING_TTL, MetadataStore, load_snapshot, normalize_name
+from astrix.features.dependency import describe_modules, generate_dependency_info
+
+
+REQUESTS_METADATA = {
+    "info": {
+        "summary": "Python HTTP for Humans.",
+        "project_urls": {"Documentation": "https://requests.readthedocs.io", "Source": "https://github.com/psf/requests"},
+    },
+    "releases": {"2.32.3": []},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(tmp_path / "pypi.sqlite")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    directory = tmp_path / "snapshot"
+    directory.mkdir()
+    (directory / "requests.json").write_text(json.dumps(REQUESTS_METADATA))
+    return directory
+
+
+def test_normalize_name():
+    assert normalize_name("Typing_Extensions") == "typing-extensions"
+    assert normalize_name("zope.interface") == "zope-interface"
+
+
+def test_store_roundtrip_keeps_only_used_fields(store):
+    store.put("requests", REQUESTS_METADATA)
+    data = store.get("Requests")
+    assert data["info"]["summary"] == "Python HTTP for Humans."
+    assert "releases" not in data
+
+
+def test_store_expired_entries(store):
+    store.put("requests", REQUESTS_METADATA, ttl=-1)
+    assert store.get("requests") is None
+    assert store.get("requests", allow_stale=True)["info"]["summary"] == "Python HTTP for Humans."
+
+
+def test_load_snapshot(snapshot_dir):
+    assert load_snapshot(snapshot_dir, "requests")["info"]["summary"] == "Python HTTP for Humans."
+    assert load_snapshot(snapshot_dir, "missing") is None
+
+
+def test_broken_snapshot_is_reported_on_stderr(snapshot_dir, capsys):
+    (snapshot_dir / "broken.json").write_text("{")
+    assert load_snapshot(snapshot_dir, "broken") is None
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Error reading metadata snapshot" in captured.err
+
+
+def test_store_hit_skips_network(store):
+    store.put("requests", REQUESTS_METADATA)
+    with mock.patch("requests.Session.get") as mock_get:
+        rows = describe_modules(["requests"], store)
+    mock_get.assert_not_called()
+    assert rows[0][1] == "Python HTTP for Humans."
+
+
+def test_network_result_is_stored(store):
+    response = mock.Mock()
+    response.json.return_value = REQUESTS_METADATA
+    with mock.patch("requests.Session.get", return_value=response) as mock_get:
+        describe_modules(["requests"], store)
+        rows = describe_modules(["requests"], store)
+    assert mock_get.call_count == 1
+    assert rows[0][1] == "Python HTTP for Humans."
+
+
+def test_missing_package_is_stored_briefly(store):
+    response = mock.Mock()
+    response.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Client Error: Not Found")
+    with mock.patch("requests.Session.get", return_value=response) as mock_get:
+        describe_modules(["not_a_real_package_xyz"], store)
+        rows = describe_modules(["not_a_real_package_xyz"], store)
+    assert mock_get.call_count == 1
+    assert rows[0][1:] == ["No summary available :(", "No documentation available :(", "No github URL :("]
+
+    expires_at, = store.connection.execute("SELECT expires_at - fetched_at FROM packages").fetchone()
+    assert expires_at == MISSING_TTL
+
+
+def test_snapshot_without_info(tmp_path, snapshot_dir):
+    (snapshot_dir / "bare.json").write_text("{}")
+    (snapshot_dir / "partial.json").write_text('{"releases": {}}')
+    rows = describe_modules(["bare", "partial"], offline=True, snapshot_dir=snapshot_dir)
+    assert rows[1][1:] == ["No summary available :(", "https://pypi.org/pypi/partial", ""]
+
+
+def test_offline_never_uses_network(tmp_path, store, snapshot_dir):
+    python_file = tmp_path / "imports.py"
+    python_file.write_text("import os\nimport requests\nimport not_a_real_package_xyz\n")
+
+    with mock.patch("requests.Session.get") as mock_get:
+        table = generate_dependency_info(python_file, store, offline=True, snapshot_dir=snapshot_dir)
+    mock_get.assert_not_called()
+
+    rows = {row[0]: row for row in table}
+    assert rows["os"][1] == "Inbuilt module of python"
+    assert rows["requests"][1] == "Python HTTP for Humans."
+    assert rows["requests"][3] == "https://github.com/psf/requests"
+    assert rows["not_a_real_package_xyz"][1] == "No summary available :("
+
+
+def test_deps_offline_cli(tmp_path, snapshot_dir):
+    python_file = tmp_path / "imports.py"
+    python_file.write_text("import requests\n")
+
+    with mock.patch("requests.Session.get") as mock_get:
+        result = CliRunner().invoke(cli, ["--cache-dir", str(tmp_path / "cache"), "deps", str(python_file),
+                                          "--offline", "--snapshot-dir", str(snapshot_dir)])
+    mock_get.assert_not_called()
+    assert result.exit_code == 0
+    assert "Python HTTP for Humans." in result.output
@@ -0,0 +1,128 @@
+import ast
+import pytest
+from radon.complexity import cc_visit_ast
+from radon.metrics import h_visit_ast
+from radon.raw import analyze
+from radon.visitors import Class, ComplexityVisitor
+from astrix.features.metrics import compute_metrics, raw_metrics
+from astrix.features.source import SourceFile
+
+
+SAMPLE = '''"""Module docstring."""
+import os  # a comment
+
+
+def top(a, b=1 if True else 2):
+    """Docstring
+    on two lines.
+    """
+    total = 0
+    for item in a:
+        if item and b or not item:
+            total += item * 2
+        elif item > 3 > b:
+            continue
+    else:
+        total -= 1
+    def inner(x):
+        return [y for y in x if y if y > 1]
+    try:
+        inner(a)
+    except ValueError:
+        pass
+    except (TypeError, KeyError):
+        raise
+    else:
+        total = -total
+    assert total and b, "checked"
+    return (total +
+            b)
+
+
+class Base:
+    attribute = [i for i in range(3) if i]
+
+    def method(self, value):
+        while value:
+            value -= 1
+        match value:
+            case 0:
+                return "zero"
+            case [x, *rest]:
+                return x
+            case _:
+                return None
+
+    async def later(self):
+        async for chunk in self.stream():
+            yield chunk
+
+    class Inner:
+        def hidden(self):
+            return 1 if self else 0
+
+
+@decorator(lambda x: x or 1)
+class Child(Base, metaclass=type):
+    def method(self, value): x = value; return x
+
+    def only_assert(self):
+        assert self
+
+
+def _private(): pass
+'''
+
+
+def radon_metrics(code):
+    tree = ast.parse(code)
+    raw = analyze(code)
+    functions = [
+        (b.name, b.lineno, b.col_offset, b.endline, b.is_method, b.classname, tuple(c.name for c in b.closures), b.complexity)
+        for b in cc_visit_ast(tree) if not isinstance(b, Class)
+    ]
+    return {
+        'functions': functions,
+        'complexity': ComplexityVisitor.from_ast(tree).total_complexity,
+        'halstead_volume': h_visit_ast(tree).total.volume,
+        'lloc': raw.lloc,
+        'sloc': raw.sloc,
+        'comments': raw.comments,
+        'multi': raw.multi,
+    }
+
+
+def test_metrics_match_radon(tmp_path):
+    metrics = compute_metrics(SourceFile(tmp_path / "sample.py", SAMPLE))
+    expected = radon_metrics(SAMPLE)
+
+    assert metrics['functions'] == expected['functions']
+    assert metrics['complexity'] == expected['complexity']
+    assert metrics['halstead_volume'] == pytest.approx(expected['halstead_volume'])
+    for key in ('lloc', 'sloc', 'comments', 'multi'):
+        assert metrics[key] == expected[key], key
+
+
+def test_metrics_blocks():
+    metrics = compute_metrics(SourceFile("sample.py", SAMPLE))
+    names = [(name, classname, closures) for name, _, _, _, _, classname, closures, _ in metrics['functions']]
+    # Module functions first, then the methods of every top level class
+    assert names == [
+        ('top', None, ('inner',)), ('_private', None, ()),
+        ('method', 'Base', ()), ('later', 'Base', ()),
+        ('method', 'Child', ()), ('only_assert', 'Child', ()),
+    ]
+
+
+@pytest.mark.parametrize("code", [
+    "",
+    "# only a comment\n",
+    "x = 1; y = 2\nif x: y = {1: 2}\n",
+    "value = call(\n    1,  # first\n\n    2,\n)\n",
+    "text = '''a\n\nb'''\n'''\ndocstring\n'''\n",
+    "x = 1 + \\\n    2\n",
+    "def f():\n    pass",
+])
+def test_raw_metrics_match_radon(code):
+    raw = analyze(code)
+    assert raw_metrics(code) == (raw.lloc, raw.sloc, raw.comments, raw.multi)
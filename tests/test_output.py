@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.code_quality import FUNCTION_FIELDS, MAINTAINABILITY_FIELDS
+from astrix.features.output import RowWriter, flat_value
+
+
+@pytest.fixture
+def sample_project(tmp_path):
+    """Fixture that provides a directory with two modules and a broken file."""
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "a.py").write_text('''
+def outer(x):
+    def inner():
+        return x
+    if x:
+        return inner()
+    return None
+''')
+    (project / "b.py").write_text("def other():\n    return 1\n")
+    (project / "broken.py").write_text("def broken(:\n")
+    return project
+
+
+class Named:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_flat_value_joins_lists():
+    assert flat_value([Named("a"), Named("b")]) == "a;b"
+    assert flat_value([]) == ""
+    assert flat_value(3) == 3
+
+
+def test_ndjson_rows_are_written_immediately(capsys):
+    writer = RowWriter("ndjson", ["file", "value"])
+    writer.write(["a.py", 1])
+    assert json.loads(capsys.readouterr().out) == {"file": "a.py", "value": 1}
+    writer.write(["b.py", None])
+    writer.close()
+    assert json.loads(capsys.readouterr().out) == {"file": "b.py", "value": None}
+
+
+def test_csv_has_header_even_without_rows(capsys):
+    writer = RowWriter("csv", ["file", "value"])
+    writer.close()
+    assert capsys.readouterr().out == "file,value\n"
+
+
+def test_table_is_printed_on_close(capsys):
+    writer = RowWriter("table", ["file"], ["File"])
+    writer.write(["a.py"])
+    assert capsys.readouterr().out == ""
+    writer.close()
+    assert "File" in capsys.readouterr().out
+
+
+def test_analyze_directory_ndjson(sample_project):
+    result = CliRunner().invoke(cli, ["--no-cache", "analyze", str(sample_project), "--format", "ndjson", "-j", "1"])
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record["name"] for record in records] == ["outer", "other"]
+    assert set(records[0]) == set(FUNCTION_FIELDS)
+    assert records[0]["file"] == "a.py"
+    assert records[0]["closures"] == "inner"
+    assert records[0]["complexity"] == 2
+    # Errors about the broken file go to stderr and never corrupt the stream
+    assert "broken.py" in result.stderr
+
+
+def test_maintainability_directory_csv(sample_project):
+    result = CliRunner().invoke(cli, ["--no-cache", "maintainability", str(sample_project), "--format", "csv", "-j", "1"])
+    assert result.exit_code == 0, result.output
+    rows = list(csv.reader(io.StringIO(result.stdout)))
+    assert rows[0] == MAINTAINABILITY_FIELDS
+    assert [row[0] for row in rows[1:]] == ["a.py", "b.py"]
+
+
+def test_analyze_file_csv(sample_project):
+    path = str(sample_project / "b.py")
+    result = CliRunner().invoke(cli, ["--no-cache", "analyze", path, "--format", "csv"])
+    assert result.exit_code == 0, result.output
+    rows = list(csv.reader(io.StringIO(result.stdout)))
+    assert rows[0] == FUNCTION_FIELDS
+    assert rows[1][:2] == [path, "other"]
+
+
+def test_deps_ndjson(tmp_path):
+    path = tmp_path / "imports.py"
+    path.write_text("import os\nimport json\n")
+    result = CliRunner().invoke(cli, ["--no-cache", "deps", str(path), "--offline", "--format", "ndjson"])
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record["module"] for record in records] == ["os", "json"]
+    assert records[0]["documentation"] == "https://docs.python.org/3/library/os.html"
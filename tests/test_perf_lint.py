@@ -0,0 +1,154 @@
+import json
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.cache import ResultCache
+from astrix.features.perf_lint import file_findings, lint_source
+from astrix.features.source import SourceFile
+
+
+SLOW = '''
+import re
+import math
+from collections import deque
+
+BLOCKED = list(range(100))
+
+
+def render(rows):
+    out = ""
+    seen = []
+    for row in rows:
+        out += str(row)
+        if row not in seen:
+            seen.append(row)
+        if row in BLOCKED or row in [1, 2]:
+            pass
+        pattern = re.compile("a+b")
+        own = re.compile(row)
+        total = math.sqrt(row) + self.data.items.get(row)
+    return out
+
+
+def drain(stack):
+    queue = deque(stack)
+    while stack:
+        stack.pop(0)
+        stack.insert(0, 1)
+        queue.insert(0, 1)
+    return [word for word in stack if word in BLOCKED]
+'''
+
+FAST = '''
+import math
+
+
+def render(rows, items):
+    parts = []
+    seen = set()
+    for row in rows:
+        parts.append(str(row))
+        if row in seen or row in items:
+            pass
+        count = 0
+        count += 1
+        sqrt = math.sqrt
+        for column in row:
+            math = column
+            math.floor(1)
+            self.data = column
+            self.data.items.get(column)
+    return "".join(parts)
+'''
+
+
+def codes(code):
+    return [(lineno, rule) for lineno, _, rule, _, _ in lint_source(SourceFile("sample.py", code))]
+
+
+def test_slow_patterns_are_reported():
+    assert codes(SLOW) == [
+        (13, 'PERF101'),
+        (14, 'PERF102'),
+        (16, 'PERF102'),
+        (18, 'PERF104'),
+        (20, 'PERF103'),
+        (20, 'PERF103'),
+        (27, 'PERF105'),
+        (28, 'PERF105'),
+        (30, 'PERF102'),
+    ]
+    findings = lint_source(SourceFile("sample.py", SLOW))
+    assert findings[0][3] == 'medium'
+    assert "`out`" in findings[0][4]
+    assert "`self.data.items.get`" in findings[5][4]
+    # stack is a parameter, it may not be a list
+    assert [finding[3] for finding in findings[6:8]] == ['low', 'low']
+
+
+def test_severity_of_known_lists_and_compiles():
+    code = '''
+import re
+
+def f(rows, patterns):
+    queue = []
+    for row in rows:
+        queue.pop(0)
+        row.pop(0)
+        re.compile(row)
+        re.compile("a+b")
+        re.IGNORECASE
+'''
+    assert [(lineno, rule, severity) for lineno, _, rule, severity, _ in lint_source(SourceFile("sample.py", code))] == [
+        (7, 'PERF105', 'high'), (8, 'PERF105', 'low'), (10, 'PERF104', 'medium'), (11, 'PERF103', 'low'),
+    ]
+
+
+def test_fast_code_is_not_reported():
+    assert codes(FAST) == []
+
+
+def test_lookups_are_only_reported_in_innermost_loops():
+    code = '''
+import math
+
+def f(rows):
+    for row in rows:
+        math.floor(row)
+        for cell in row:
+            math.ceil(cell)
+'''
+    assert codes(code) == [(8, 'PERF103')]
+
+
+def test_findings_are_cached(tmp_path):
+    path = tmp_path / "slow.py"
+    path.write_text(SLOW)
+    cache = ResultCache(tmp_path / "cache")
+    assert file_findings(path, cache) == file_findings(path, cache) == lint_source(SourceFile(path, SLOW))
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    assert file_findings(tmp_path / "broken.py", cache) is None
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli(tmp_path, jobs):
+    (tmp_path / "slow.py").write_text(SLOW)
+    (tmp_path / "fast.py").write_text(FAST)
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["--no-cache", "perf-lint", str(tmp_path), "-j", jobs])
+    assert result.exit_code == 1
+    lines = result.output.splitlines()
+    assert lines[0].split()[:5] == ["File", "Line", "Column", "Code", "Severity"]
+    assert lines[2].split()[:5] == ["slow.py", "13", "8", "PERF101", "medium"]
+    assert lines[-1] == "9 findings."
+
+    result = runner.invoke(cli, ["--no-cache", "perf-lint", str(tmp_path), "-j", jobs, "--min-severity", "high", "--format", "ndjson"])
+    assert result.exit_code == 1
+    rows = [json.loads(line) for line in result.output.splitlines()]
+    assert {row['code'] for row in rows} == {'PERF102'}
+    assert rows[0] == {**rows[0], 'file': 'slow.py', 'lineno': 14, 'severity': 'high'}
+
+    result = runner.invoke(cli, ["--no-cache", "perf-lint", str(tmp_path / "fast.py")])
+    assert result.exit_code == 0
+    assert result.output == "No performance issues found.\n"
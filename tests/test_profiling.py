@@ -0,0 +1,53 @@
+import time
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features import profiling
+
+
+def test_phase_is_noop_when_disabled():
+    profiling.disable()
+    with profiling.phase("parse", "a.py") as timed:
+        pass
+    assert timed is profiling.phase("read")
+    assert profiling.active() is None
+
+
+def test_nested_phases_are_exclusive():
+    profiler = profiling.enable()
+    try:
+        with profiling.phase("analyzer", "a.py"):
+            with profiling.phase("parse", "a.py"):
+                time.sleep(0.05)
+    finally:
+        profiling.disable()
+
+    calls, parse = profiler.phases["parse"]
+    assert calls == 1 and parse >= 0.05
+    assert profiler.phases["analyzer"][1] < 0.05
+    assert profiler.files["a.py"] >= 0.05
+
+
+def test_merge_worker_timings():
+    profiler = profiling.Profiler()
+    result, timings = profiling.profiled_call(len, "abc")
+    profiler.merge(({"parse": [2, 0.5]}, {"a.py": 0.5}))
+
+    assert result == 3 and timings == ({}, {})
+    assert profiler.phases["parse"] == [2, 0.5]
+    assert profiler.merged == 0.5
+
+
+def test_profile_cli(tmp_path):
+    path = tmp_path / "sample.py"
+    path.write_text("def f(x):\n    return x if x else 0\n")
+    output = tmp_path / "run.prof"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "--profile-output", str(output), "analyze", str(path)])
+
+    assert result.exit_code == 0, result.output
+    assert "f" in result.stdout
+    assert "Phase" not in result.stdout
+    for name in ("Phase", "parse", "read", "analyzer: metrics", str(path)):
+        assert name in result.stderr
+    assert output.stat().st_size > 0
+    assert profiling.active() is None
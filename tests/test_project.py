@@ -0,0 +1,56 @@
+import os
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.project import find_python_files, map_files
+
+
+@pytest.fixture
+def sample_project(tmp_path):
+    """Fixture that provides a small project tree for testing."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("def first(x):\n    if x:\n        return 1\n    return 0\n")
+    (tmp_path / "pkg" / "b.py").write_text("def second():\n    return 2\n")
+    (tmp_path / "pkg" / "broken.py").write_text("def broken(:\n    pass\n")
+    (tmp_path / "pkg" / "notes.txt").write_text("not python")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "skip.py").write_text("def skipped():\n    pass\n")
+    (tmp_path / "env").mkdir()
+    (tmp_path / "env" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (tmp_path / "env" / "lib.py").write_text("def skipped():\n    pass\n")
+    return tmp_path
+
+
+def test_find_python_files_directory(sample_project):
+    files = find_python_files(sample_project)
+    names = [os.path.relpath(f, sample_project) for f in files]
+    assert names == [os.path.join("pkg", "a.py"), os.path.join("pkg", "b.py"), os.path.join("pkg", "broken.py")]
+
+
+def test_find_python_files_single_file(sample_project):
+    path = str(sample_project / "pkg" / "a.py")
+    assert find_python_files(path) == [path]
+
+
+def test_map_files_keeps_order():
+    paths = [f"file_{i}.py" for i in range(50)]
+    assert list(map_files(len, paths, jobs=4)) == [len(p) for p in paths]
+    assert list(map_files(len, paths, jobs=1)) == [len(p) for p in paths]
+
+
+def test_analyze_directory(sample_project):
+    result = CliRunner().invoke(cli, ["--no-cache", "analyze", str(sample_project), "--jobs", "2"])
+    assert result.exit_code == 0
+    assert "first" in result.output
+    assert "second" in result.output
+    assert "skipped" not in result.output
+    assert os.path.join("pkg", "a.py") in result.output
+
+
+def test_maintainability_directory(sample_project):
+    result = CliRunner().invoke(cli, ["--no-cache", "maintainability", str(sample_project), "-j", "2"])
+    assert result.exit_code == 0
+    assert os.path.join("pkg", "a.py") in result.output
+    assert os.path.join("pkg", "b.py") in result.output
+    table = result.output[result.output.index("Halstead Volume"):]
+    assert "broken.py" not in table
@@ -0,0 +1,150 @@
+import os
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features.callgraph import build_project_call_graph
+from astrix.features.symbols import module_name_for
+
+
+@pytest.fixture
+def sample_package(tmp_path):
+    """Fixture that provides a small package with cross-module calls."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from .util import helper as exported_helper\n")
+    (package / "util.py").write_text('''
+def helper():
+    return 1
+
+def other():
+    return helper()
+''')
+    (package / "models.py").write_text('''
+import pkg.util
+from pkg import util
+from . import util as u
+from pkg import exported_helper
+
+
+class Base:
+    def save(self):
+        self.validate()
+
+    def validate(self):
+        return len([])
+
+
+class Child(Base):
+    def run(self):
+        self.save()
+        util.helper()
+        pkg.util.other()
+        exported_helper()
+        u.other()
+
+        def inner():
+            return nested()
+
+        def nested():
+            pass
+
+        inner()
+''')
+    (tmp_path / "script.py").write_text('''
+from pkg.models import Child
+
+def main():
+    Child().run()
+''')
+    return tmp_path
+
+
+def test_module_name_for(sample_package):
+    assert module_name_for(sample_package / "pkg" / "models.py") == "pkg.models"
+    assert module_name_for(sample_package / "pkg" / "__init__.py") == "pkg"
+    assert module_name_for(sample_package / "script.py") == "script"
+    assert module_name_for(sample_package / "pkg" / "models.py", sample_package / "pkg") == "pkg.models"
+    assert module_name_for(sample_package / "tools" / "util.py", sample_package) == "tools.util"
+    assert module_name_for(sample_package / "script.py", sample_package / "script.py") == "script"
+
+
+def test_namespace_subpackage_resolves(sample_package):
+    # No __init__.py in pkg/features, as in a PEP 420 namespace package
+    features = sample_package / "pkg" / "features"
+    features.mkdir()
+    (features / "source.py").write_text("def load():\n    pass\n")
+    (sample_package / "pkg" / "cli.py").write_text("from pkg.features.source import load\n\ndef run():\n    load()\n")
+
+    for root in (sample_package, sample_package / "pkg"):
+        graph = build_project_call_graph(root, jobs=1)
+        assert ("pkg.cli.run", "pkg.features.source.load") in graph.edges
+
+
+def test_src_layout_resolves_from_the_repository_root(tmp_path):
+    package = tmp_path / "src" / "pkg"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "util.py").write_text("class Base:\n    def run(self):\n        pass\n\ndef helper():\n    pass\n")
+    (package / "app.py").write_text("from pkg.util import helper, Base\n\nclass Child(Base):\n    def go(self):\n        self.run()\n        helper()\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_app.py").write_text("from pkg.app import Child\n\ndef test_go():\n    Child().go()\n")
+
+    assert module_name_for(package / "util.py", tmp_path) == "pkg.util"
+    assert module_name_for(tmp_path / "tests" / "test_app.py", tmp_path) == "tests.test_app"
+    for root in (tmp_path, tmp_path / "src"):
+        graph = build_project_call_graph(root, jobs=1)
+        assert {("pkg.app.Child.go", "pkg.util.Base.run"), ("pkg.app.Child.go", "pkg.util.helper")} <= set(graph.edges)
+    assert ("tests.test_app.test_go", "pkg.app.Child") in build_project_call_graph(tmp_path, jobs=1).edges
+
+
+def test_duplicate_basenames_do_not_collide(tmp_path, capsys):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "util.py").write_text(f"def {directory}_only():\n    pass\n\ndef shared():\n    {directory}_only()\n")
+    graph = build_project_call_graph(tmp_path, jobs=1)
+    assert {("a.util.shared", "a.util.a_only"), ("b.util.shared", "b.util.b_only")} <= set(graph.edges)
+    assert graph.nodes["b.util.shared"]["file"] == str(tmp_path / "b" / "util.py")
+
+    # A module next to a package of the same name is reported, not merged
+    (tmp_path / "a.py").write_text("def a_only():\n    pass\n")
+    (tmp_path / "a" / "__init__.py").write_text("def init_only():\n    pass\n")
+    graph = build_project_call_graph(tmp_path, jobs=1)
+    assert "a.a_only" in graph and "a.init_only" not in graph
+    assert f"{tmp_path / 'a' / '__init__.py'} is module 'a' too" in capsys.readouterr().err
+
+
+def test_project_call_graph_resolves_across_modules(sample_package):
+    graph = build_project_call_graph(sample_package, jobs=1)
+    edges = set(graph.edges)
+
+    assert ("pkg.util.other", "pkg.util.helper") in edges
+    assert ("pkg.models.Base.save", "pkg.models.Base.validate") in edges
+    assert ("pkg.models.Child.run", "pkg.models.Base.save") in edges
+    assert ("pkg.models.Child.run", "pkg.util.helper") in edges
+    assert ("pkg.models.Child.run", "pkg.util.other") in edges
+    assert ("pkg.models.Child.run", "pkg.models.Child.run.inner") in edges
+    assert ("pkg.models.Child.run.inner", "pkg.models.Child.run.nested") in edges
+    assert ("script.main", "pkg.models.Child") in edges
+    # Builtins are not part of the project
+    assert not any(callee == "len" for _, callee in edges)
+
+
+def test_project_call_graph_node_locations(sample_package):
+    graph = build_project_call_graph(sample_package, jobs=1)
+    data = graph.nodes["pkg.util.helper"]
+    assert data["file"].endswith(os.path.join("pkg", "util.py"))
+    assert data["lineno"] == 2
+
+
+def test_project_call_graph_parallel_matches_serial(sample_package):
+    serial = build_project_call_graph(sample_package, jobs=1)
+    parallel = build_project_call_graph(sample_package, jobs=2)
+    assert set(serial.edges) == set(parallel.edges)
+
+
+def test_callgraph_directory_cli(sample_package):
+    result = CliRunner().invoke(cli, ["--no-cache", "callgraph", str(sample_package), "-j", "1"])
+    assert result.exit_code == 0
+    output_path = os.path.normpath(str(sample_package)) + "_callgraph.png"
+    assert os.path.isfile(output_path)
+    os.remove(output_path)
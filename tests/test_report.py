@@ -0,0 +1,79 @@
+import json
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli
+from astrix.features import source
+from astrix.features.report import ProjectReport
+
+
+@pytest.fixture
+def sample_package(tmp_path):
+    """Fixture that provides a package with classes, calls and imports."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "util.py").write_text("import os\n\n\ndef helper(x):\n    return os.path.join(x) if x else None\n")
+    (package / "app.py").write_text(
+        "import json\nfrom pkg.util import helper\n\n\n"
+        "class Base:\n    pass\n\n\n"
+        "class App(Base):\n    def run(self):\n        return helper(json.dumps({}))\n"
+    )
+    (package / "broken.py").write_text("def broken(:\n")
+    return package
+
+
+def test_report_collects_every_analyzer(sample_package):
+    report = ProjectReport(sample_package)
+    report.load(jobs=1)
+
+    assert sorted(report.files.paths) == ["__init__.py", "app.py", "util.py"]
+    assert sorted(record.name for record in report.functions) == ["helper", "run"]
+    assert len(report.maintainability) == 3
+    # Modules of the project itself are not dependencies
+    assert sorted(report.imported_modules()) == ["json", "os"]
+
+
+def test_report_parses_every_file_once(sample_package, monkeypatch):
+    parsed = []
+    original = source.SourceFile.tree
+
+    def tree(self):
+        if self._tree is None:
+            parsed.append(self.path)
+        return original.fget(self)
+
+    monkeypatch.setattr(source.SourceFile, "tree", property(tree))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "report", str(sample_package), "--offline", "-j", "1"])
+    assert result.exit_code == 0, result.output
+    assert sorted(parsed) == sorted(str(path) for path in sample_package.glob("*.py"))
+
+
+def test_report_cli(sample_package):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "report", str(sample_package), "--graph-format", "json", "--offline", "-j", "1"])
+
+    assert result.exit_code == 0, result.output
+    for section in ("Functions", "Maintainability", "Dependencies"):
+        assert section in result.stdout
+    assert "helper" in result.stdout
+    assert "Inbuilt module of python" in result.stdout
+    assert "has Syntax Errors" in result.stderr
+
+    call_graph = json.loads((sample_package.parent / "pkg_callgraph.json").read_text())
+    assert {"source": "pkg.app.App.run", "target": "pkg.util.helper"} in call_graph["edges"]
+    class_graph = json.loads((sample_package.parent / "pkg_class_graph.json").read_text())
+    assert {"source": "pkg.app.Base", "target": "pkg.app.App"} in class_graph["edges"]
+
+
+def test_report_single_file(tmp_path):
+    path = tmp_path / "sample.py"
+    path.write_text("def f():\n    return g()\n\n\ndef g():\n    return 1\n")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "report", str(path), "--offline"])
+
+    assert result.exit_code == 0, result.output
+    assert "No dependencies found." in result.stdout
+    assert "No class definitions found." in result.stdout
+    assert (tmp_path / "sample_callgraph.dot").exists()
@@ -0,0 +1,64 @@
+import pytest
+from astrix.features import code_quality, segments, source
+from astrix.features.cache import ResultCache
+from astrix.features.metrics import combine_tree_metrics, raw_metrics, segment_tree_metrics, tree_metrics
+from astrix.features.source import SourceFile, load_source
+from astrix.features.symbols import combine_symbols, extract_symbols, module_symbols, segment_symbols
+from tests.test_metrics import SAMPLE
+
+
+@pytest.fixture
+def short_segments(monkeypatch):
+    """Fixture that splits files of any length into segments."""
+    monkeypatch.setattr(segments, "SEGMENT_MIN_LINES", 1)
+
+
+def test_split_segments(short_segments):
+    sample = SourceFile("sample.py", SAMPLE)
+    parts = segments.split_segments(sample)
+
+    assert "".join(segment.code for segment in parts) == SAMPLE
+    assert [segment.start for segment in parts] == [1, 5, 32, 35, 46, 50, 55, 57, 59, 63]
+    # Methods are segments of their own, the class keeps the statements before them
+    assert parts[2].code == "class Base:\n    attribute = [i for i in range(3) if i]\n\n"
+    assert [segment.owner.name for segment in parts[3:6]] == ["Base"] * 3
+    assert len(sample.tree.body[3].body) == 4
+    # The decorator belongs to the class it decorates
+    assert parts[6].code.startswith("@decorator")
+
+
+def test_segments_combine_to_the_whole_file(short_segments):
+    sample = SourceFile("sample.py", SAMPLE)
+    parts = segments.split_segments(sample)
+
+    metrics = combine_tree_metrics([(segment, segment_tree_metrics(segment)) for segment in parts])
+    assert metrics == tree_metrics(sample.tree)
+    assert tuple(map(sum, zip(*(raw_metrics(segment.code) for segment in parts)))) == raw_metrics(SAMPLE)
+    symbols = combine_symbols([(segment, segment_symbols(segment, "sample")) for segment in parts], sample, "sample")
+    assert symbols == extract_symbols(sample, "sample")
+
+
+def test_only_edited_segments_are_recomputed(tmp_path, short_segments, monkeypatch):
+    computed = []
+
+    def counting(segment):
+        computed.append(segment.start)
+        return segment_tree_metrics(segment)
+
+    monkeypatch.setattr(code_quality, "segment_tree_metrics", counting)
+    path = tmp_path / "sample.py"
+    path.write_text(SAMPLE)
+    cache = ResultCache(tmp_path / "cache")
+    code_quality.file_metrics(load_source(path), cache)
+    assert len(computed) == 10
+
+    # Edit a method of Base and shift every later segment down a line
+    edited = SAMPLE.replace("            value -= 1\n", "            value -= 2\n\n")
+    path.write_text(edited)
+    source._sources.clear()
+    computed.clear()
+    metrics = code_quality.file_metrics(load_source(path), cache)
+
+    assert computed == [35]
+    assert metrics == tree_metrics(SourceFile(path, edited).tree)
+    assert module_symbols(path, cache)['definitions'] == extract_symbols(SourceFile(path, edited), "sample")['definitions']
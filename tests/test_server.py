@@ -0,0 +1,101 @@
+import json
+import os
+import socket
+import threading
+import time
+import pytest
+from click.testing import CliRunner
+from astrix.cli import cli, FORWARDED_COMMANDS
+from astrix.features.server import AnalysisServer, send_request
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not available")
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Fixture that runs an analysis server in a background thread."""
+    analysis_server = AnalysisServer(tmp_path / "astrix.sock", cli, FORWARDED_COMMANDS)
+    thread = threading.Thread(target=analysis_server.serve_forever, daemon=True)
+    thread.start()
+    yield analysis_server
+    analysis_server.shutdown()
+    analysis_server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    path = tmp_path / "sample.py"
+    path.write_text("def f(x):\n    if x:\n        return 1\n    return 2\n")
+    return path
+
+
+def test_server_answers_like_the_cli(server, sample_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    args = [str(sample_file), "--format", "ndjson"]
+    response = send_request(server.socket_path, "analyze", args, str(tmp_path), cache_dir)
+    local = CliRunner().invoke(cli, ["--cache-dir", cache_dir, "analyze", *args])
+    assert response["exit_code"] == 0, response["stderr"]
+    assert response["stdout"] == local.stdout
+    assert json.loads(response["stdout"])["complexity"] == 2
+
+
+def test_relative_paths_use_the_client_directory(server, sample_file, tmp_path):
+    response = send_request(server.socket_path, "maintainability", ["sample.py", "--format", "csv"], str(tmp_path), no_cache=True)
+    assert response["exit_code"] == 0, response["stderr"]
+    assert response["stdout"].splitlines()[1].startswith("sample.py,")
+
+
+def test_errors_are_reported_with_exit_codes(server, tmp_path):
+    response = send_request(server.socket_path, "analyze", ["missing.py"], str(tmp_path), no_cache=True)
+    assert response["exit_code"] == 2
+    assert "does not exist" in response["stderr"]
+
+    broken = tmp_path / "broken.py"
+    broken.write_text("def broken(:\n")
+    response = send_request(server.socket_path, "analyze", [str(broken)], str(tmp_path), no_cache=True)
+    assert response["exit_code"] == 1
+    assert "Syntax Errors" in response["stderr"]
+
+    response = send_request(server.socket_path, "install", [], str(tmp_path))
+    assert response["exit_code"] == 2
+
+
+def test_warm_requests_are_fast(server, sample_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    send_request(server.socket_path, "analyze", [str(sample_file)], str(tmp_path), cache_dir)
+    start = time.perf_counter()
+    for _ in range(20):
+        response = send_request(server.socket_path, "analyze", [str(sample_file)], str(tmp_path), cache_dir)
+    assert response["exit_code"] == 0
+    assert (time.perf_counter() - start) / 20 < 0.05
+
+
+def test_cli_forwards_to_the_server(server, sample_file, tmp_path):
+    result = CliRunner().invoke(cli, ["--server", server.socket_path, "--no-cache", "analyze", str(sample_file), "-f", "csv"])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.splitlines()[1].split(",")[1] == "f"
+
+    result = CliRunner().invoke(cli, ["--server", server.socket_path, "analyze", str(tmp_path / "nope.py")])
+    assert result.exit_code == 2
+
+
+def test_cli_reports_unreachable_server(sample_file, tmp_path):
+    result = CliRunner().invoke(cli, ["--server", str(tmp_path / "none.sock"), "analyze", str(sample_file)])
+    assert result.exit_code == 1
+    assert "Unable to reach the Astrix server" in result.stderr
+
+
+def test_refuses_a_socket_in_use(server):
+    with pytest.raises(OSError):
+        AnalysisServer(server.socket_path, cli, FORWARDED_COMMANDS)
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    analysis_server = AnalysisServer(path, cli, FORWARDED_COMMANDS)
+    analysis_server.server_close()
+    assert not os.path.exists(path)
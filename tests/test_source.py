@@ -0,0 +1,76 @@
+import ast
+import os
+import pytest
+import click
+from astrix.features.source import load_source, clear_sources
+from astrix.features.code_quality import analyze_code_quality, analyze_maintainability_index
+from astrix.features.callgraph import generate_call_graph
+from astrix.features.class_heirarchy import generate_class_hierarchy
+from astrix.features.dependency import generate_dependency_info
+
+
+@pytest.fixture
+def sample_python_file(tmp_path):
+    """Fixture that provides a temporary Python file for testing."""
+    content = '''
+import os
+
+class Base:
+    def run(self):
+        return helper()
+
+def helper():
+    return os.getcwd()
+    '''
+    file_path = tmp_path / "sample_python_file.py"
+    file_path.write_text(content)
+    clear_sources()
+    return file_path
+
+
+def test_load_source_reads_once(sample_python_file):
+    first = load_source(sample_python_file)
+    assert load_source(sample_python_file) is first
+    assert first.tree is first.tree
+
+
+def test_load_source_reloads_modified_file(sample_python_file):
+    first = load_source(sample_python_file)
+    sample_python_file.write_text("def changed():\n    pass\n")
+    os.utime(sample_python_file, ns=(0, 0))
+
+    second = load_source(sample_python_file)
+    assert second is not first
+    assert "changed" in second.code
+
+
+def test_load_source_missing_file(tmp_path):
+    with pytest.raises(click.exceptions.Abort):
+        load_source(tmp_path / "missing.py")
+
+
+def test_load_source_honours_encoding_declaration(tmp_path):
+    file_path = tmp_path / "latin.py"
+    file_path.write_bytes("# -*- coding: latin-1 -*-\nname = 'caf\xe9'\n".encode("latin-1"))
+    assert "café" in load_source(file_path).code
+
+
+def test_all_analyzers_share_one_parse(sample_python_file, monkeypatch):
+    calls = []
+    original_parse = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        calls.append(args)
+        return original_parse(*args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", counting_parse)
+
+    analyze_code_quality(sample_python_file)
+    analyze_maintainability_index(sample_python_file, False)
+    generate_call_graph(sample_python_file)
+    generate_class_hierarchy(sample_python_file)
+    generate_dependency_info(sample_python_file)
+
+    assert len(calls) == 1
+    os.remove(str(sample_python_file).replace(".py", "_callgraph.png"))
+    os.remove(str(sample_python_file).replace(".py", "_class_graph.png"))
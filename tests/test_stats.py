@@ -0,0 +1,63 @@
+import json
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from radon.metrics import mi_visit
+from astrix.cli import cli
+from astrix.features.stats import MetricTable, ProjectStats, collect_stats, maintainability_index
+
+
+@pytest.fixture
+def sample_project(tmp_path):
+    """Fixture that provides a project with two packages."""
+    (tmp_path / "core").mkdir()
+    (tmp_path / "core" / "a.py").write_text("def simple():\n    return 1\n\n\ndef branchy(x):\n    if x and x > 1 or x < -1:\n        return 1\n    for i in range(x):\n        if i:\n            x += i\n    return x\n")
+    (tmp_path / "core" / "b.py").write_text("# comment\nclass K:\n    def m(self, y):\n        return y if y else 0\n")
+    (tmp_path / "main.py").write_text("import os\n\nprint(os.getcwd())\n")
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    return tmp_path
+
+
+def test_maintainability_index_matches_radon(sample_project):
+    table = collect_stats(sample_project, jobs=1)
+    stats = ProjectStats(table)
+    for file, mi in zip(table.files, stats.mi):
+        assert mi == pytest.approx(mi_visit((sample_project / file).read_text(), True))
+    assert maintainability_index([0.0], [1.0], [0.0], [0.0])[0] == 100.0
+
+
+def test_grouped_statistics():
+    table = MetricTable()
+    generator = np.random.default_rng(0)
+    expected = {}
+    for package in ("a", "b", "c"):
+        values = generator.integers(1, 40, size=57)
+        expected[package] = values
+        table.add(f"{package}/m.py", [(f"f{i}", i, None, int(value)) for i, value in enumerate(values)], (100.0, 5.0, 50, 10.0))
+    table.add("empty/m.py", [], (0.0, 1.0, 0, 0.0))
+
+    packages = {package['package']: package for package in ProjectStats(table).packages()}
+    for name, values in expected.items():
+        assert packages[name]['functions'] == len(values)
+        assert packages[name]['complexity_mean'] == pytest.approx(values.mean())
+        assert packages[name]['complexity_p90'] == pytest.approx(np.percentile(values, 90))
+        assert packages[name]['complexity_max'] == values.max()
+    assert packages['empty']['functions'] == 0 and packages['empty']['complexity_max'] is None
+    assert packages['empty']['mi_histogram']['80-100'] == 1
+
+
+def test_stats_cli(sample_project):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--no-cache", "stats", str(sample_project), "--format", "json", "--top", "2", "-j", "1"])
+
+    assert result.exit_code == 0, result.output
+    data = json.loads(result.stdout)
+    assert data['summary']['files'] == 3
+    assert data['summary']['functions'] == 3
+    assert [row['function'] for row in data['worst_functions']] == ["branchy", "K.m"]
+    assert [package['package'] for package in data['packages']] == [".", "core"]
+
+    result = runner.invoke(cli, ["--no-cache", "stats", str(sample_project), "-j", "1"])
+    assert result.exit_code == 0, result.output
+    for section in ("Summary", "Complexity per package", "Maintainability index per package", "Most complex functions"):
+        assert section in result.stdout
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import pytest
+from astrix.features.callgraph import build_project_call_graph
+from astrix.features.watch import InotifyWatcher, PollingWatcher, ProjectState, create_watcher
+
+
+@pytest.fixture
+def sample_package(tmp_path):
+    """Fixture that provides a package whose modules call each other."""
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from .util import helper\n")
+    (package / "util.py").write_text("def helper():\n    return 1\n\n\ndef other():\n    return helper()\n")
+    (package / "app.py").write_text("from pkg import helper\nfrom pkg.util import other\n\n\ndef main():\n    helper()\n    return other()\n")
+    return tmp_path
+
+
+def assert_matches_full_build(state, root):
+    graph = build_project_call_graph(root, jobs=1)
+    assert set(state.call_graph.edges) == set(graph.edges)
+    assert dict(state.call_graph.nodes(data=True)) == dict(graph.nodes(data=True))
+
+
+def touch(path, content):
+    path.write_text(content)
+    # Guarantee a new modification time even on coarse grained file systems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_body_edit_only_patches_the_module(sample_package):
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+    assert ("pkg.app.main", "pkg.util.helper") in state.call_graph.edges
+
+    app = sample_package / "pkg" / "app.py"
+    touch(app, "from pkg import helper\nfrom pkg.util import other\n\n\n\ndef main():\n    return other()\n")
+    assert state.update([str(app)]) == [str(app)]
+    assert ("pkg.app.main", "pkg.util.helper") not in state.call_graph.edges
+    assert state.call_graph.nodes["pkg.app.main"]["lineno"] == 6
+    assert_matches_full_build(state, sample_package)
+
+
+def test_renamed_definition_updates_dependents(sample_package):
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+
+    util = sample_package / "pkg" / "util.py"
+    touch(util, "def helper():\n    return 1\n\n\ndef renamed():\n    return helper()\n")
+    state.update([str(util)])
+    assert "pkg.util.other" not in state.call_graph
+    assert_matches_full_build(state, sample_package)
+
+    touch(util, "def helper():\n    return 1\n\n\ndef other():\n    return helper()\n")
+    state.update([str(util)])
+    # Re-added through the re-export in pkg/__init__.py and the direct import
+    assert ("pkg.app.main", "pkg.util.other") in state.call_graph.edges
+    assert_matches_full_build(state, sample_package)
+
+
+def test_changes_follow_renaming_re_exports(sample_package):
+    package = sample_package / "pkg"
+    (package / "__init__.py").write_text("from .util import helper as exported\n")
+    (package / "app.py").write_text("from pkg import exported\n\n\ndef main():\n    exported()\n")
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+    assert ("pkg.app.main", "pkg.util.helper") in state.call_graph.edges
+
+    util = package / "util.py"
+    touch(util, "def other():\n    return 1\n")
+    state.update([str(util)])
+    assert ("pkg.app.main", "pkg.util.helper") not in state.call_graph.edges
+    assert_matches_full_build(state, sample_package)
+
+    touch(util, "def helper():\n    return 1\n")
+    state.update([str(util)])
+    assert ("pkg.app.main", "pkg.util.helper") in state.call_graph.edges
+    assert_matches_full_build(state, sample_package)
+
+
+def test_class_changes_update_method_calls(sample_package):
+    package = sample_package / "pkg"
+    (package / "base.py").write_text("class Base:\n    def save(self):\n        pass\n")
+    (package / "child.py").write_text("from pkg.base import Base\n\n\nclass Child(Base):\n    def run(self):\n        self.save()\n")
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+    assert ("pkg.child.Child.run", "pkg.base.Base.save") in state.call_graph.edges
+
+    base = package / "base.py"
+    touch(base, "class Base:\n    def store(self):\n        pass\n")
+    state.update([str(base)])
+    assert_matches_full_build(state, sample_package)
+    touch(base, "class Base:\n    def save(self):\n        pass\n")
+    state.update([str(base)])
+    assert ("pkg.child.Child.run", "pkg.base.Base.save") in state.call_graph.edges
+    assert_matches_full_build(state, sample_package)
+
+
+def test_added_and_deleted_files(sample_package):
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+
+    extra = sample_package / "pkg" / "extra.py"
+    extra.write_text("class Extra:\n    pass\n")
+    state.update([str(extra)])
+    assert "pkg.extra.Extra" in state.class_index.classes
+
+    os.remove(extra)
+    assert state.update([str(extra)]) == [str(extra)]
+    assert "pkg.extra.Extra" not in state.class_index.classes
+    assert state.file_summary(str(extra)) == os.path.join("pkg", "extra.py") + ": removed"
+    assert_matches_full_build(state, sample_package)
+
+
+def test_syntax_error_keeps_last_results(sample_package):
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+    util = sample_package / "pkg" / "util.py"
+    touch(util, "def helper(:\n")
+    assert state.update([str(util)]) == []
+    assert len(state.functions[str(util)]) == 2
+
+
+def test_single_file_update_is_fast(tmp_path):
+    package = tmp_path / "big"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    for index in range(150):
+        calls = "\n".join(f"    f{index - 1}_{i}()" for i in range(10)) if index else "    pass"
+        imports = f"from big.m{index - 1} import *\n" if index else ""
+        functions = "\n\n".join(f"def f{index}_{i}():\n{calls}\n" for i in range(10))
+        (package / f"m{index}.py").write_text(imports + functions)
+    state = ProjectState(tmp_path)
+    state.load(jobs=1)
+
+    # Editing a body only resolves the calls of the edited module
+    module = package / "m75.py"
+    touch(module, module.read_text().replace("f74_0()", "f74_1()"))
+    start = time.perf_counter()
+    state.update([str(module)])
+    assert time.perf_counter() - start < 0.5
+
+    # A new definition is visible to the modules star importing it
+    touch(module, module.read_text() + "\n\ndef f75_extra():\n    f74_0()\n")
+    start = time.perf_counter()
+    state.update([str(module)])
+    assert time.perf_counter() - start < 1.0
+    assert ("big.m75.f75_extra", "big.m74.f74_0") in state.call_graph.edges
+    assert_matches_full_build(state, tmp_path)
+
+
+def test_polling_watcher_reports_changes(sample_package):
+    watcher = PollingWatcher(sample_package, interval=0.01)
+    util = sample_package / "pkg" / "util.py"
+    touch(util, "def helper():\n    return 2\n")
+    new = sample_package / "pkg" / "new.py"
+    new.write_text("")
+    os.remove(sample_package / "pkg" / "app.py")
+    assert watcher.wait(timeout=1) == {str(util), str(new), os.path.join(str(sample_package), "pkg", "app.py")}
+    assert watcher.wait(timeout=0.05) == set()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_changes(sample_package):
+    watcher = create_watcher(sample_package)
+    assert isinstance(watcher, InotifyWatcher)
+    try:
+        util = sample_package / "pkg" / "util.py"
+        util.write_text("def helper():\n    return 2\n")
+        assert watcher.wait(timeout=2) == {str(util)}
+
+        subpackage = sample_package / "pkg" / "sub"
+        subpackage.mkdir()
+        watcher.wait(timeout=0.2)
+        module = subpackage / "mod.py"
+        module.write_text("x = 1\n")
+        assert str(module) in watcher.wait(timeout=2)
+        assert watcher.wait(timeout=0.05) == set()
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_moved_away_directory(sample_package, tmp_path_factory):
+    subpackage = sample_package / "pkg" / "sub"
+    (subpackage / "deep").mkdir(parents=True)
+    (subpackage / "__init__.py").write_text("")
+    (subpackage / "mod.py").write_text("from pkg.util import helper\n\n\ndef run():\n    return helper()\n")
+    (subpackage / "deep" / "inner.py").write_text("class Inner:\n    pass\n")
+    state = ProjectState(sample_package)
+    state.load(jobs=1)
+    assert "pkg.sub.deep.inner.Inner" in state.project.class_modules
+    watcher = create_watcher(sample_package)
+    try:
+        outside = tmp_path_factory.mktemp("outside") / "sub"
+        os.rename(subpackage, outside)
+        paths = watcher.wait(timeout=2)
+        assert paths == {str(subpackage)}
+        assert sorted(state.update(paths)) == [str(subpackage / "__init__.py"), str(subpackage / "deep" / "inner.py"), str(subpackage / "mod.py")]
+        assert not any(path.startswith(str(subpackage)) for path in state.symbols)
+        assert "pkg.sub.deep.inner.Inner" not in state.project.class_modules
+        assert_matches_full_build(state, sample_package)
+
+        # The moved directories are no longer watched
+        assert all(not directory.startswith(str(subpackage)) for directory in watcher.watches.values())
+        (outside / "mod.py").write_text("x = 2\n")
+        assert watcher.wait(timeout=0.2) == set()
+    finally:
+        watcher.close()